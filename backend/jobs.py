@@ -0,0 +1,206 @@
+"""
+Background simulation jobs for the Yu-Gi-Oh Deck Simulator API
+
+A job runs a simulation stream (see streaming.stream_run) on a process pool
+shared by every job, so long simulations never occupy the web server's
+threads or its GIL. Each job has a light driver thread that only waits for
+shard results and keeps the latest progress, which clients poll. A job keeps
+its slot until its shards have left the pool, even after it was cancelled.
+
+Jobs live in memory: they are lost when the server restarts, and only the
+most recent finished jobs are kept.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional, Set
+
+
+# Active jobs accepted at once; further submissions are refused until one is done
+DEFAULT_MAX_ACTIVE_JOBS = 16
+# Finished jobs kept for polling before the oldest are dropped
+DEFAULT_KEEP_FINISHED = 100
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobLimitError(RuntimeError):
+    """Raised when too many jobs are already queued or running."""
+
+
+class Job:
+    """
+    State of one simulation job, updated by its driver thread. Status changes
+    go through update() and cancel(), so a cancelled job stays cancelled.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.created = time.time()
+        self.progress: Optional[Any] = None  # Latest streaming.Progress
+        self.result: Optional[Any] = None  # Converted final result
+        self.error: Optional[str] = None
+        self.cancel_requested = threading.Event()
+        self.shards: Set[Future] = set()  # Submitted shards not done yet
+        self._state_lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def update(self, status: str, **fields) -> bool:
+        """
+        Set the status and fields (e.g. progress=...) unless the job was cancelled
+        or already finished. Returns whether the update was applied.
+        """
+        with self._state_lock:
+            if self.cancel_requested.is_set() or self.finished:
+                return False
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.status = status
+            return True
+
+    def cancel(self):
+        """Mark the job cancelled; the driver stops at its next update."""
+        with self._state_lock:
+            if not self.finished:
+                self.cancel_requested.set()
+                self.status = CANCELLED
+
+    @property
+    def active(self) -> bool:
+        """Whether the job still occupies the pool (unfinished, or cancelled with shards still running)."""
+        return not self.finished or bool(self.shards)
+
+
+class _JobExecutor(Executor):
+    """The shared pool as seen by one job: tracks the job's shards until they are done."""
+
+    def __init__(self, executor: Executor, job: Job, lock: threading.Lock):
+        self._executor = executor
+        self._job = job
+        self._lock = lock
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = self._executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._job.shards.add(future)
+        # Runs right away if the shard is already done
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future):
+        with self._lock:
+            self._job.shards.discard(future)
+
+
+class JobManager:
+    """
+    Runs simulation jobs on a bounded process pool.
+
+    Args:
+        max_workers: Processes in the shared pool (None uses every core)
+        max_active_jobs: Active jobs (see Job.active) accepted at once
+        keep_finished: Finished jobs kept for polling
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_active_jobs: int = DEFAULT_MAX_ACTIVE_JOBS,
+                 keep_finished: int = DEFAULT_KEEP_FINISHED):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_active_jobs = max_active_jobs
+        self.keep_finished = keep_finished
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def submit(self, stream: Callable[[Executor], Iterator[Any]],
+               finish: Callable[[Any, float], Any]) -> Job:
+        """
+        Start a job.
+
+        Args:
+            stream: Called with the shared pool; returns the job's Progress iterator
+                    (the last item carries the result)
+            finish: Converts the final SimulationResult and the elapsed seconds into the stored result
+
+        Raises:
+            JobLimitError: If max_active_jobs jobs are already active
+        """
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.active)
+            if active >= self.max_active_jobs:
+                raise JobLimitError(f"Too many simulation jobs in progress ({active}), try again later")
+            job = Job()
+            self._jobs[job.id] = job
+            executor = _JobExecutor(self._pool(), job, self._lock)
+            self._prune()
+
+        threading.Thread(target=self._drive, args=(job, stream, finish, executor), daemon=True).start()
+        return job
+
+    def _drive(self, job: Job, stream: Callable[[Executor], Iterator[Any]],
+               finish: Callable[[Any, float], Any], executor: Executor):
+        """Driver thread: consume the job's stream and record its progress."""
+        start = time.time()
+        updates = stream(executor)
+        try:
+            for progress in updates:
+                if job.cancel_requested.is_set():
+                    break
+                if progress.result is not None:
+                    job.update(COMPLETED, result=finish(progress.result, time.time() - start))
+                elif not job.update(RUNNING, progress=progress):
+                    break
+        except Exception as e:
+            job.update(FAILED, error=str(e))
+        finally:
+            # Stops the stream and cancels its shards that have not started yet
+            updates.close()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Job by id (None if unknown or already dropped)."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job. Shards already running finish in the background, the rest
+        are never started; the job counts as active until its last shard is done.
+        Finished jobs are left as they are.
+        """
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond keep_finished (caller holds the lock)."""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        """Cancel every unfinished job and stop the process pool."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+            executor, self._executor = self._executor, None
+        for job in jobs:
+            self.cancel(job.id)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
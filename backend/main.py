@@ -1,15 +1,22 @@
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 try:
-    from .models import SimulationConfig, SimulationResult, CardEffectDefinition, HandRecord, ResolveCardsRequest, ResolveCardsResponse
+    from .models import SimulationConfig, SimulationResult, SimulationProgress, JobStatus, SweepConfig, SweepResult, SweepPoint, OptimizeConfig, OptimizeResult, OptimizedDeck, CompareConfig, CompareResult, ObjectiveResult, ObjectiveCount, ObjectiveCombination, BrickSummary, BrickHand, BrickProfile, HandHistograms, CardImpact, CardEffectDefinition, ResolveCardsRequest, ResolveCardsResponse
     from .ydk_deck_parser import parse_ydk_deck
     from .card_resolver import resolve_card_data, count_cards
+    from .jobs import JobManager, JobLimitError
+    from .result_cache import ResultCache, config_key
 except (ImportError, ValueError):
-    from models import SimulationConfig, SimulationResult, CardEffectDefinition, HandRecord, ResolveCardsRequest, ResolveCardsResponse
+    from models import SimulationConfig, SimulationResult, SimulationProgress, JobStatus, SweepConfig, SweepResult, SweepPoint, OptimizeConfig, OptimizeResult, OptimizedDeck, CompareConfig, CompareResult, ObjectiveResult, ObjectiveCount, ObjectiveCombination, BrickSummary, BrickHand, BrickProfile, HandHistograms, CardImpact, CardEffectDefinition, ResolveCardsRequest, ResolveCardsResponse
     from ydk_deck_parser import parse_ydk_deck
     from card_resolver import resolve_card_data, count_cards
+    from jobs import JobManager, JobLimitError
+    from result_cache import ResultCache, config_key
 import httpx
+import json
+from contextlib import asynccontextmanager
 import sys
 import os
 import time
@@ -32,14 +39,32 @@ sys.path.append(src_path)
 
 try:
     from deck_sim import Deck, Simulator, req, Rule, CompositeRule
+    from hand_records import RecordFilter as SimRecordFilter
+    from objectives import branch_objectives
+    from card_index import FILLER_CARD
     from card_effects import create_effect_from_definition
+    from streaming import stream_run
+    from sweep import SweepAxis as SimSweepAxis
+    from optimizer import CardLimit as SimCardLimit, DECK_SIZE
 except ImportError as e:
     # Print error but let it fail if imports are critical
     print(f"Error importing modules from {src_path}: {e}")
     # Fallback or re-raise
     raise
 
-app = FastAPI()
+# Background simulation jobs share one process pool (see /jobs)
+job_manager = JobManager()
+# Results of identical /simulate requests are served from here
+result_cache = ResultCache()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    job_manager.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 def health_check():
@@ -116,99 +141,489 @@ def build_rule(requirements):
     return current_rule
 
 
+def build_simulation(config: SimulationConfig):
+    """
+    Build the Simulator and success conditions for a SimulationConfig.
+
+    Returns:
+        Tuple of (simulator, conditions)
+
+    Raises:
+        HTTPException: 400 for invalid card effect definitions
+    """
+    # 1. Build Deck - support both old and new formats
+    if config.card_categories:
+        # New format: use card_categories with subcategories
+        deck_contents = {cat.name: cat.count for cat in config.card_categories}
+        deck = Deck(config.deck_size, deck_contents)
+        
+        # Build subcategory map: subcategory -> list of card names
+        subcategory_map = {}
+        for cat in config.card_categories:
+            for subcat in cat.subcategories:
+                if subcat not in subcategory_map:
+                    subcategory_map[subcat] = []
+                subcategory_map[subcat].append(cat.name)
+    else:
+        # Old format: use deck_contents (backward compatibility)
+        deck = Deck(config.deck_size, config.deck_contents)
+        subcategory_map = {}
+    
+    # 2. Build Rules
+    # config.rules is List[List[Requirement]] (OR logic of AND clauses)
+    # [[A], [B, C]] -> (Rule(A)) OR (Rule(B) & Rule(C))
+    sim_conditions = []
+    for condition_group in config.rules:
+        sim_conditions.append(build_rule(condition_group))
+        
+    if not sim_conditions:
+         # If no rules, assume everything is a success? Or failure? 
+         # Usually failure if no success condition defined.
+         # But let's handle empty case gracefully
+         pass 
+
+    # 3. Build Card Effects Registry
+    card_effects = {}
+    if config.card_effects:
+        for effect_def in config.card_effects:
+            try:
+                # Convert CardEffectDefinition to dict for factory function
+                effect_dict = {
+                    'effect_type': effect_def.effect_type,
+                    'parameters': effect_def.parameters
+                }
+                effect = create_effect_from_definition(effect_dict)
+                card_effects[effect_def.card_name] = effect
+            except Exception as e:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Invalid effect definition for '{effect_def.card_name}': {str(e)}"
+                )
+
+    sim = Simulator(deck, subcategory_map, card_effects, hand_cache_size=config.hand_cache_size)
+    return sim, sim_conditions
+
+
+def worker_count(config: SimulationConfig) -> int:
+    """Worker processes for a config, capped at the number of cores."""
+    return max(1, min(config.workers, os.cpu_count() or 1))
+
+
+def record_setting(config: SimulationConfig):
+    """The record_hands argument for a config: False, True or a hand_records.RecordFilter."""
+    if config.record_hands and config.record_filter is not None:
+        return SimRecordFilter(**config.record_filter.model_dump())
+    return config.record_hands
+
+
+def build_objectives(config: SimulationConfig, sim_conditions):
+    """The objectives argument for a config: branch counts and rule sets by name (None when neither is asked for)."""
+    objectives = branch_objectives(sim_conditions) if config.branch_counts else {}
+    for rule_set in config.rule_sets:
+        if rule_set.name in objectives:
+            raise ValueError(f"Duplicate objective name: {rule_set.name}")
+        objectives[rule_set.name] = [build_rule(condition_group) for condition_group in rule_set.rules]
+    return objectives or None
+
+
+def to_objective_model(objectives, total: int) -> ObjectiveResult:
+    """Convert objectives.ObjectiveCounts into the API model."""
+    return ObjectiveResult(
+        objectives=[ObjectiveCount(name=name, count=objectives.count(name),
+                                   rate=objectives.count(name) / total * 100.0)
+                    for name in objectives.names],
+        overlaps=objectives.overlaps(),
+        combinations=[ObjectiveCombination(names=names, count=count)
+                      for names, count in objectives.combinations()],
+    )
+
+
+def to_brick_summary_model(summary, size: int) -> BrickSummary:
+    """Convert a brick_summary.BrickSummary into the API model, listing `size` hands and profiles."""
+    cards, co_occurrence = summary.co_occurrence()
+    return BrickSummary(
+        bricks=summary.bricks,
+        error=max(summary.hands.error, summary.profiles.error),
+        hands=[BrickHand(cards=hand, count=count) for hand, count in summary.top_hands(size)],
+        profiles=[BrickProfile(subcategories=profile, count=count)
+                  for profile, count in summary.top_profiles(size)],
+        cards=cards,
+        co_occurrence=co_occurrence,
+    )
+
+
+def trim_bins(row):
+    """A histogram without its trailing empty bins."""
+    end = len(row)
+    while end > 1 and not row[end - 1]:
+        end -= 1
+    return row[:end]
+
+
+def to_histograms_model(histograms) -> HandHistograms:
+    """Convert histograms.HandHistograms into the API model, leaving out the filler cards."""
+    cards = [card_id for card_id, name in enumerate(histograms.names) if name != FILLER_CARD]
+
+    def rows(histogram_rows):
+        return [trim_bins(row) for row in histogram_rows]
+
+    def card_rows(histogram_rows):
+        return rows([histogram_rows[card_id] for card_id in cards])
+
+    return HandHistograms(
+        cards=[histograms.names[card_id] for card_id in cards],
+        subcategories=histograms.tags,
+        card_initial=card_rows(histograms.initial),
+        card_final=card_rows(histograms.final),
+        card_success=card_rows(histograms.success),
+        subcategory_initial=rows(histograms.tag_initial),
+        subcategory_final=rows(histograms.tag_final),
+        subcategory_success=rows(histograms.tag_success),
+        hand_size=trim_bins(histograms.hand_size),
+        cards_drawn=trim_bins(histograms.drawn),
+        cards_discarded=trim_bins(histograms.discarded),
+        card_drawn_total=[histograms.card_drawn[card_id] for card_id in cards],
+        card_discarded_total=[histograms.card_discarded[card_id] for card_id in cards],
+    )
+
+
+def to_result_model(config: SimulationConfig, result, elapsed: float) -> SimulationResult:
+    """Convert a deck_sim SimulationResult into the API response model."""
+    # Add warning if card counts exceed nominal deck size
+    warnings = list(result.warnings)
+    total_cards_defined = sum(cat.count for cat in config.card_categories) if config.card_categories else sum(config.deck_contents.values())
+    if total_cards_defined > config.deck_size:
+        warnings.insert(0, f"Defined cards ({total_cards_defined}) exceed deck size ({config.deck_size}). Simulation used {total_cards_defined} cards.")
+    
+    return SimulationResult(
+        success_rate=result.success_rate,
+        brick_rate=result.brick_rate,
+        success_count=result.success_count,
+        brick_count=result.brick_count,
+        time_taken=elapsed,
+        total_simulations=result.total_simulations,
+        ci_low=result.ci_low,
+        ci_high=result.ci_high,
+        confidence=result.confidence,
+        max_depth_reached_count=result.max_depth_reached_count,
+        warnings=warnings,
+        hand_record_columns=result.hand_records.to_columns() if len(result.hand_records) else None,
+        exact=result.exact,
+        seed=result.seed,
+        cache_hit_rate=result.cache_hit_rate,
+        variance_reduction=result.variance_reduction,
+        objectives=(to_objective_model(result.objectives, result.total_simulations)
+                    if result.objectives is not None else None),
+        brick_summary=(to_brick_summary_model(result.brick_summary, config.brick_summary_size)
+                       if result.brick_summary is not None else None),
+        histograms=to_histograms_model(result.histograms) if result.histograms is not None else None,
+        card_impact=([CardImpact(**vars(row)) for row in result.card_impact.table(config.confidence)]
+                     if result.card_impact is not None else None),
+    )
+
+
+def to_progress_model(progress) -> SimulationProgress:
+    """Convert a streaming.Progress into the API progress model."""
+    return SimulationProgress(
+        completed=progress.completed,
+        total=progress.total,
+        success_rate=progress.success_rate,
+        ci_low=progress.ci_low,
+        ci_high=progress.ci_high,
+        confidence=progress.confidence,
+        elapsed=progress.elapsed,
+        hands_per_second=progress.hands_per_second,
+    )
+
+
 @app.post("/simulate", response_model=SimulationResult)
 def run_simulation(config: SimulationConfig):
     try:
-        # 1. Build Deck - support both old and new formats
-        if config.card_categories:
-            # New format: use card_categories with subcategories
-            deck_contents = {cat.name: cat.count for cat in config.card_categories}
-            deck = Deck(config.deck_size, deck_contents)
-            
-            # Build subcategory map: subcategory -> list of card names
-            subcategory_map = {}
-            for cat in config.card_categories:
-                for subcat in cat.subcategories:
-                    if subcat not in subcategory_map:
-                        subcategory_map[subcat] = []
-                    subcategory_map[subcat].append(cat.name)
-        else:
-            # Old format: use deck_contents (backward compatibility)
-            deck = Deck(config.deck_size, config.deck_contents)
-            subcategory_map = {}
-        
-        # 2. Build Rules
-        # config.rules is List[List[Requirement]] (OR logic of AND clauses)
-        # [[A], [B, C]] -> (Rule(A)) OR (Rule(B) & Rule(C))
-        sim_conditions = []
-        for condition_group in config.rules:
-            sim_conditions.append(build_rule(condition_group))
-            
-        if not sim_conditions:
-             # If no rules, assume everything is a success? Or failure? 
-             # Usually failure if no success condition defined.
-             # But let's handle empty case gracefully
-             pass 
-
-        # 3. Build Card Effects Registry
-        card_effects = {}
-        if config.card_effects:
-            for effect_def in config.card_effects:
-                try:
-                    # Convert CardEffectDefinition to dict for factory function
-                    effect_dict = {
-                        'effect_type': effect_def.effect_type,
-                        'parameters': effect_def.parameters
-                    }
-                    effect = create_effect_from_definition(effect_dict)
-                    card_effects[effect_def.card_name] = effect
-                except Exception as e:
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"Invalid effect definition for '{effect_def.card_name}': {str(e)}"
-                    )
+        sim, sim_conditions = build_simulation(config)
+
+        cache_key = config_key(sim, sim_conditions, config) if config.use_cache else None
+        if cache_key is not None:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                return SimulationResult(**{**cached, 'cached': True})
 
         # 4. Run Simulation with subcategory and effect support
-        sim = Simulator(deck, subcategory_map, card_effects)
         start_time = time.time()
         result = sim.run(config.simulations, config.hand_size, sim_conditions,
-                         record_hands=config.record_hands)
+                         record_hands=record_setting(config), engine=config.engine,
+                         seed=config.seed, workers=worker_count(config),
+                         target_precision=config.target_precision, confidence=config.confidence,
+                         time_budget=config.time_budget, sampling=config.sampling,
+                         objectives=build_objectives(config, sim_conditions),
+                         brick_summary=config.brick_summary, histograms=config.histograms,
+                         card_impact=config.card_impact)
         elapsed = time.time() - start_time
         
-        # Add warning if card counts exceed nominal deck size
-        warnings = list(result.warnings)
-        total_cards_defined = sum(cat.count for cat in config.card_categories) if config.card_categories else sum(config.deck_contents.values())
-        if total_cards_defined > config.deck_size:
-            warnings.insert(0, f"Defined cards ({total_cards_defined}) exceed deck size ({config.deck_size}). Simulation used {total_cards_defined} cards.")
-        
-        pydantic_hand_records = [
-            HandRecord(
-                initial_hand=r.initial_hand,
-                final_hand=r.final_hand,
-                cards_drawn=r.cards_drawn,
-                cards_discarded=r.cards_discarded,
-                success=r.success,
-            )
-            for r in result.hand_records
-        ]
-
-        return SimulationResult(
-            success_rate=result.success_rate,
-            brick_rate=result.brick_rate,
-            success_count=result.success_count,
-            brick_count=result.brick_count,
+        response = to_result_model(config, result, elapsed)
+        if cache_key is not None:
+            result_cache.put(cache_key, response.model_dump())
+        return response
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/simulate/stream")
+def stream_simulation(config: SimulationConfig):
+    """
+    Run a simulation and stream progress as Server-Sent Events.
+
+    Emits a 'progress' event (SimulationProgress) every progress_interval hands,
+    then a 'result' event with the full SimulationResult. Errors during the run
+    are sent as an 'error' event. Closing the connection stops the run.
+    """
+    try:
+        if config.sampling != 'random':
+            raise ValueError(f"{config.sampling.capitalize()} sampling is only available on /simulate")
+        sim, sim_conditions = build_simulation(config)
+        objectives = build_objectives(config, sim_conditions)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def events():
+        start_time = time.time()
+        try:
+            for progress in stream_run(sim, config.simulations, config.hand_size, sim_conditions,
+                                       record_hands=record_setting(config), engine=config.engine,
+                                       seed=config.seed, workers=worker_count(config),
+                                       confidence=config.confidence,
+                                       target_precision=config.target_precision,
+                                       time_budget=config.time_budget,
+                                       interval=config.progress_interval,
+                                       objectives=objectives, brick_summary=config.brick_summary,
+                                       histograms=config.histograms, card_impact=config.card_impact):
+                if progress.result is None:
+                    yield sse_event("progress", to_progress_model(progress).model_dump())
+                else:
+                    final = to_result_model(config, progress.result, time.time() - start_time)
+                    yield sse_event("result", final.model_dump())
+        except ValueError as e:
+            yield sse_event("error", {"detail": str(e)})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Simulation failed: {str(e)}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/sweep", response_model=SweepResult)
+def run_sweep(config: SweepConfig):
+    """
+    Evaluate every combination of the sweep axes (card counts, hand size,
+    effect parameters) on common random numbers, so the differences between
+    variants are much less noisy than separate /simulate calls.
+    """
+    try:
+        sim, sim_conditions = build_simulation(config)
+        axes = [SimSweepAxis(kind=axis.kind, values=axis.values, card_name=axis.card_name,
+                             parameter=axis.parameter) for axis in config.axes]
+
+        start_time = time.time()
+        sweep = sim.sweep(config.simulations, config.hand_size, sim_conditions, axes,
+                          seed=config.seed, engine='exact' if config.engine == 'exact' else 'python',
+                          workers=worker_count(config), confidence=config.confidence)
+        elapsed = time.time() - start_time
+
+        return SweepResult(
+            points=[
+                SweepPoint(
+                    values=point.values,
+                    result=to_result_model(config, point.result, elapsed / len(sweep.points)),
+                    difference=point.difference,
+                    difference_low=point.difference_low,
+                    difference_high=point.difference_high,
+                )
+                for point in sweep.points
+            ],
+            seed=sweep.seed,
+            time_taken=elapsed,
+        )
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/optimize", response_model=OptimizeResult)
+def run_optimizer(config: OptimizeConfig):
+    """
+    Search the counts of the limited cards (and the deck size) with the highest
+    success rate. Decks are screened exactly or with cheap samples, and the best
+    ones are re-run with `simulations` hands against the starting deck.
+    """
+    try:
+        sim, sim_conditions = build_simulation(config)
+        limits = [SimCardLimit(limit.card_name, limit.min_copies, limit.max_copies)
+                  for limit in config.card_limits]
+
+        start_time = time.time()
+        optimization = sim.optimize(config.simulations, config.hand_size, sim_conditions, limits,
+                                    min_deck_size=config.min_deck_size, max_deck_size=config.max_deck_size,
+                                    seed=config.seed, workers=worker_count(config),
+                                    finalists=config.finalists,
+                                    screening_simulations=config.screening_simulations,
+                                    confidence=config.confidence)
+        elapsed = time.time() - start_time
+
+        return OptimizeResult(
+            decks=[
+                OptimizedDeck(
+                    card_counts={name: count for name, count in point.values.items() if name != DECK_SIZE},
+                    deck_size=point.values[DECK_SIZE],
+                    result=to_result_model(config, point.result, elapsed / len(optimization.decks)),
+                    difference=point.difference,
+                    difference_low=point.difference_low,
+                    difference_high=point.difference_high,
+                )
+                for point in optimization.decks
+            ],
+            evaluated=optimization.evaluated,
+            exact=optimization.exact,
+            seed=optimization.seed,
             time_taken=elapsed,
-            max_depth_reached_count=result.max_depth_reached_count,
-            warnings=warnings,
-            hand_records=pydantic_hand_records,
         )
 
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/compare", response_model=CompareResult)
+def compare_decks(config: CompareConfig):
+    """
+    Compare two decklists on the same shuffles. Stops as soon as one deck is
+    significantly better or both are within the tolerance of each other, and
+    reports the difference with the number of hands that were needed.
+    """
+    try:
+        first_sim, sim_conditions = build_simulation(config)
+        second = config.second_deck
+        second_config = config.model_copy(update={
+            'deck_size': second.deck_size,
+            'deck_contents': second.deck_contents,
+            'card_categories': second.card_categories,
+            'card_effects': second.card_effects,
+        })
+        second_sim, _ = build_simulation(second_config)
+
+        start_time = time.time()
+        comparison = first_sim.compare(second_sim, config.simulations, config.hand_size, sim_conditions,
+                                       tolerance=config.tolerance, confidence=config.confidence,
+                                       seed=config.seed,
+                                       engine='exact' if config.engine == 'exact' else 'python')
+        elapsed = time.time() - start_time
+
+        return CompareResult(
+            first=to_result_model(config, comparison.first, elapsed / 2),
+            second=to_result_model(second_config, comparison.second, elapsed / 2),
+            difference=comparison.difference,
+            difference_low=comparison.difference_low,
+            difference_high=comparison.difference_high,
+            simulations=comparison.simulations,
+            decision=comparison.decision,
+            seed=comparison.seed,
+            time_taken=elapsed,
+        )
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def to_job_status(job) -> JobStatus:
+    """Convert a jobs.Job into the API job model."""
+    return JobStatus(
+        id=job.id,
+        status=job.status,
+        progress=to_progress_model(job.progress) if job.progress is not None else None,
+        result=job.result,
+        error=job.error,
+    )
+
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+def create_job(config: SimulationConfig):
+    """
+    Start a simulation in the background and return its job id right away.
+
+    The job runs on the shared process pool; poll GET /jobs/{id} for progress
+    and the result, or DELETE /jobs/{id} to cancel it.
+    """
+    try:
+        if config.sampling != 'random':
+            raise ValueError(f"{config.sampling.capitalize()} sampling is only available on /simulate")
+        sim, sim_conditions = build_simulation(config)
+        objectives = build_objectives(config, sim_conditions)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    workers = min(worker_count(config), job_manager.max_workers)
+
+    def stream(executor):
+        return stream_run(sim, config.simulations, config.hand_size, sim_conditions,
+                          record_hands=record_setting(config), engine=config.engine,
+                          seed=config.seed, workers=workers, confidence=config.confidence,
+                          target_precision=config.target_precision,
+                          time_budget=config.time_budget,
+                          interval=config.progress_interval, executor=executor,
+                          objectives=objectives, brick_summary=config.brick_summary,
+                          histograms=config.histograms, card_impact=config.card_impact)
+
+    def finish(result, elapsed):
+        return to_result_model(config, result, elapsed)
+
+    try:
+        job = job_manager.submit(stream, finish)
+    except JobLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return to_job_status(job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    """Status, latest progress and (once completed) result of a simulation job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return to_job_status(job)
+
+
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+def cancel_job(job_id: str):
+    """Cancel a queued or running simulation job (finished jobs are left as they are)."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return to_job_status(job)
+
+
 @app.post("/api/import-deck")
 async def import_deck(file: UploadFile = File(...)):
     """
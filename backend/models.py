@@ -1,6 +1,6 @@
 
-from pydantic import BaseModel
-from typing import List, Dict, Optional, Any
+from pydantic import BaseModel, Field
+from typing import List, Dict, Optional, Any, Literal
 
 class Requirement(BaseModel):
     card_name: Optional[str] = None # Optional now, for groups
@@ -26,6 +26,17 @@ class CardEffectDefinition(BaseModel):
     effect_type: str  # "draw", "conditional_discard", etc.
     parameters: Dict[str, Any]  # Effect-specific parameters
 
+class RecordFilter(BaseModel):
+    """Which hands record_hands keeps (every set criterion must hold)."""
+    outcome: Optional[Literal['success', 'brick']] = None  # None records both
+    effects_only: bool = False  # Only hands where a card effect drew or discarded cards
+    card: Optional[str] = None  # Only opening hands holding this card or a card of this subcategory
+
+class RuleSet(BaseModel):
+    """A named question answered on the same hands as the run (conditions with OR logic, like rules)."""
+    name: str
+    rules: List[List[Requirement]]
+
 class SimulationConfig(BaseModel):
     deck_size: int
     deck_contents: Dict[str, int]  # Keep for backward compatibility
@@ -36,15 +47,111 @@ class SimulationConfig(BaseModel):
     # [[A], [B, C]] means (A) OR (B AND C)
     rules: List[List[Requirement]]
     card_effects: Optional[List[CardEffectDefinition]] = []  # Card effects definitions
-    record_hands: bool = False  # Opt-in: store individual hand records (capped at 10 000)
+    record_hands: bool = False  # Opt-in: store a uniform sample of up to 10 000 hands from the whole run
+    record_filter: Optional[RecordFilter] = None  # Only sample hands matching this filter (e.g. bricks)
+    engine: str = 'auto'  # 'python', 'batch' (vectorized NumPy), 'auto' (batch when supported) or 'exact' (closed form)
+    seed: Optional[int] = None  # Makes the run reproducible, independent of the number of workers
+    workers: int = 1  # Worker processes to spread the simulation over
+    target_precision: Optional[float] = None  # Stop once the CI half-width is at most this many percentage points
+    confidence: float = 0.95  # Confidence level of the reported interval
+    time_budget: Optional[float] = None  # Stop once this many seconds have been spent (simulations is then a maximum)
+    hand_cache_size: Optional[int] = None  # Distinct hands whose outcome is cached (None = automatic, 0 = off)
+    progress_interval: int = Field(100_000, ge=1000)  # Hands between progress events on /simulate/stream and /jobs
+    use_cache: bool = True  # Serve identical /simulate requests from the result cache
+    sampling: Literal['random', 'stratified', 'antithetic', 'importance'] = 'random'  # Variance reduction (/simulate only)
+    rule_sets: List[RuleSet] = []  # Extra questions counted on the same hands (see objectives)
+    branch_counts: bool = False  # Also count each rule (OR branch) on its own, as "Rule 1", "Rule 2", ...
+    brick_summary: bool = False  # Summarize the bricked hands: most common hands and profiles, card pair counts
+    brick_summary_size: int = 20  # Hands and profiles listed in the brick summary
+    histograms: bool = False  # Count cards and subcategories per hand, for charts without hand records
+    card_impact: bool = False  # Success rate with and without each card in the opening hand
+
+class HandRecordColumn(BaseModel):
+    """One card list of every recorded hand: hand i's cards are values[offsets[i]:offsets[i + 1]]."""
+    values: str   # Base64 card ids (little-endian, of HandRecordColumns.id_type), indexing cards
+    offsets: str  # Base64 uint32 offsets (little-endian), count + 1 of them
+
+class HandRecordColumns(BaseModel):
+    """Recorded hands in columnar form (see hand_records.HandRecordStore)."""
+    cards: List[str]  # Card names by id
+    count: int  # Recorded hands
+    matched: int = 0  # Hands that matched the record filter; the records are a uniform sample of them
+    id_type: Literal['uint8', 'uint16', 'uint32']
+    initial_hand: HandRecordColumn
+    final_hand: HandRecordColumn
+    cards_drawn: HandRecordColumn
+    cards_discarded: HandRecordColumn
+    success: str  # Base64 bitmap: hand i succeeded when bit i % 8 of byte i // 8 is set
+
+class ObjectiveCount(BaseModel):
+    """Hands meeting one objective (a rule set or a single rule)."""
+    name: str
+    count: int
+    rate: float  # %
 
-class HandRecord(BaseModel):
-    """Record of a single simulated hand - returned when record_hands=True."""
-    initial_hand: List[str]  # Cards as originally drawn
-    final_hand: List[str]    # Cards after effect resolution
-    cards_drawn: List[str]   # Cards added by effects
-    cards_discarded: List[str] # Cards removed by effects
-    success: bool            # Whether the hand met any success condition
+class ObjectiveCombination(BaseModel):
+    """Hands meeting exactly these objectives and no other."""
+    names: List[str]
+    count: int
+
+class ObjectiveResult(BaseModel):
+    """Per-objective counts of one run, all from the same hands."""
+    objectives: List[ObjectiveCount]  # Branches first ("Rule 1", ...), then rule_sets in request order
+    overlaps: List[List[int]]  # overlaps[i][j]: hands meeting objectives i and j (diagonal = counts)
+    combinations: List[ObjectiveCombination]  # Most frequent first
+
+class BrickHand(BaseModel):
+    """A bricked opening hand (as a card multiset) and how many bricks it accounts for."""
+    cards: List[str]
+    count: int  # At most BrickSummary.error below the true count
+
+class BrickProfile(BaseModel):
+    """Subcategory counts shared by bricked hands."""
+    subcategories: Dict[str, int]
+    count: int  # At most BrickSummary.error below the true count
+
+class BrickSummary(BaseModel):
+    """Why the deck bricks, from the whole run (see brick_summary)."""
+    bricks: int
+    error: int  # Most any listed count can be below the truth; anything more common than this is listed
+    hands: List[BrickHand]  # Most common first
+    profiles: List[BrickProfile]  # Most common first (empty without subcategories)
+    cards: List[str]  # Cards seen in bricked hands
+    co_occurrence: List[List[int]]  # co_occurrence[i][j]: bricks holding cards i and j (diagonal: card i)
+
+class HandHistograms(BaseModel):
+    """
+    Count histograms of every hand of the run (see histograms). Rows are indexed by
+    count (row[c]: hands with c copies) and end at the last non-zero bin.
+    """
+    cards: List[str]  # Every card except the deck filler ("_Generic_")
+    subcategories: List[str]
+    card_initial: List[List[int]]  # Per card: hands opening with 0, 1, 2, ... copies
+    card_final: List[List[int]]  # Per card: hands ending with 0, 1, 2, ... copies (after effects)
+    card_success: List[List[int]]  # Per card: successful hands among card_initial's
+    subcategory_initial: List[List[int]]  # The same three per subcategory
+    subcategory_final: List[List[int]]
+    subcategory_success: List[List[int]]
+    hand_size: List[int]  # Hands ending with 0, 1, 2, ... cards
+    cards_drawn: List[int]  # Hands where effects drew 0, 1, 2, ... cards
+    cards_discarded: List[int]  # Hands where effects discarded 0, 1, 2, ... cards
+    card_drawn_total: List[int]  # Copies of each card drawn by effects
+    card_discarded_total: List[int]  # Copies of each card discarded by effects
+
+class CardImpact(BaseModel):
+    """Success rate with and without a card in the opening hand (%, intervals at the run's confidence)."""
+    card: str
+    opened: int  # Hands opening at least one copy
+    opened_rate: float
+    success_if_opened: float
+    success_if_opened_low: float
+    success_if_opened_high: float
+    success_if_not_opened: float
+    success_if_not_opened_low: float
+    success_if_not_opened_high: float
+    impact: float  # success_if_opened - success_if_not_opened (percentage points)
+    impact_low: float
+    impact_high: float
 
 class SimulationResult(BaseModel):
     success_rate: float
@@ -52,9 +159,119 @@ class SimulationResult(BaseModel):
     success_count: int
     brick_count: int
     time_taken: float
+    total_simulations: int = 0  # Hands actually simulated (may be below the request with adaptive stopping)
+    ci_low: Optional[float] = None  # Lower bound of the success rate confidence interval (%)
+    ci_high: Optional[float] = None  # Upper bound of the success rate confidence interval (%)
+    confidence: Optional[float] = None  # Confidence level of the interval
     max_depth_reached_count: int = 0  # How many simulations hit max effect depth
     warnings: List[str] = []  # User-facing warnings
-    hand_records: List[HandRecord] = []  # Individual hand records (only when record_hands=True)
+    hand_record_columns: Optional[HandRecordColumns] = None  # Recorded hands (only when record_hands=True)
+    exact: bool = False  # True when computed in closed form (counts are over all distinct hands)
+    seed: Optional[int] = None  # Seed that reproduces this run (seeded/multi-worker runs only)
+    cache_hit_rate: Optional[float] = None  # Share of hands answered by the hand cache (%, None when unused)
+    cached: bool = False  # True when served from the result cache of an identical earlier request
+    variance_reduction: Optional[float] = None  # Plain sampling's variance over this run's (stratified/antithetic/importance)
+    objectives: Optional[ObjectiveResult] = None  # Rule set and branch counts (when requested)
+    brick_summary: Optional[BrickSummary] = None  # Most common bricks (when requested)
+    histograms: Optional[HandHistograms] = None  # Card and subcategory count histograms (when requested)
+    card_impact: Optional[List[CardImpact]] = None  # Per-card impact, highest first (when requested)
+
+class SimulationProgress(BaseModel):
+    """Running estimate sent by /simulate/stream while a simulation is in progress."""
+    completed: int  # Hands simulated so far
+    total: int  # Hands requested
+    success_rate: float
+    ci_low: float  # Success rate confidence interval (%)
+    ci_high: float
+    confidence: float
+    elapsed: float  # Seconds since the run started
+    hands_per_second: float
+
+class JobStatus(BaseModel):
+    """State of a background simulation job (see /jobs)."""
+    id: str
+    status: Literal['queued', 'running', 'completed', 'failed', 'cancelled']
+    progress: Optional[SimulationProgress] = None  # Latest running estimate
+    result: Optional[SimulationResult] = None  # Set once the job has completed
+    error: Optional[str] = None  # Set when the job has failed
+
+class SweepAxis(BaseModel):
+    """One dimension of a parameter sweep."""
+    kind: Literal['card_count', 'hand_size', 'effect_parameter']
+    values: List[Any]  # Values to try (card counts, hand sizes or effect parameter values)
+    card_name: Optional[str] = None  # Card whose count or effect is swept
+    parameter: Optional[str] = None  # Effect parameter, e.g. "draw_count"
+
+class SweepConfig(SimulationConfig):
+    """A base simulation plus the axes whose every combination is evaluated (see /sweep)."""
+    axes: List[SweepAxis]
+
+class SweepPoint(BaseModel):
+    values: Dict[str, Any]  # Axis label (card name, "hand_size" or "card.parameter") -> value
+    result: SimulationResult
+    difference: float  # Success rate minus the first (baseline) point's, in percentage points
+    difference_low: float  # Paired confidence interval of the difference
+    difference_high: float
+
+class SweepResult(BaseModel):
+    points: List[SweepPoint]  # Grid order, the last axis varying fastest
+    seed: Optional[int] = None  # Seed of the shared random stream
+    time_taken: float
+
+class CardLimit(BaseModel):
+    """Allowed copies of a card for the deck optimizer."""
+    card_name: str
+    min_copies: int = 0
+    max_copies: int = 3
+
+class OptimizeConfig(SimulationConfig):
+    """A starting deck plus the card counts the optimizer may change (see /optimize)."""
+    card_limits: List[CardLimit]
+    min_deck_size: Optional[int] = None  # Defaults to deck_size
+    max_deck_size: Optional[int] = None  # Defaults to deck_size
+    finalists: int = 5  # Best decks of the search re-run with `simulations` hands
+    screening_simulations: int = 2_000  # Hands per deck while searching (when not exact)
+
+class OptimizedDeck(BaseModel):
+    card_counts: Dict[str, int]  # Counts of the limited cards
+    deck_size: int
+    result: SimulationResult
+    difference: float  # Success rate minus the starting deck's, in percentage points
+    difference_low: float
+    difference_high: float
+
+class OptimizeResult(BaseModel):
+    decks: List[OptimizedDeck]  # Finalists and the starting deck, best first
+    evaluated: int  # Distinct decks scored during the search
+    exact: bool  # True when decks were scored with the exact engine
+    seed: Optional[int] = None
+    time_taken: float
+
+class DeckList(BaseModel):
+    """The deck part of a SimulationConfig, for the second deck of a comparison."""
+    deck_size: int
+    deck_contents: Dict[str, int] = {}
+    card_categories: Optional[List[CardCategory]] = None
+    card_effects: Optional[List[CardEffectDefinition]] = []
+
+class CompareConfig(SimulationConfig):
+    """
+    Compare the deck of this config with second_deck, using the same rules and hand size
+    (see /compare). simulations is the most hands played with each deck.
+    """
+    second_deck: DeckList
+    tolerance: float = 0.5  # Differences within +/- this many percentage points count as equivalent
+
+class CompareResult(BaseModel):
+    first: SimulationResult
+    second: SimulationResult
+    difference: float  # First minus second success rate, in percentage points
+    difference_low: float
+    difference_high: float
+    simulations: int  # Hands played with each deck before the comparison was decided
+    decision: Literal['first', 'second', 'equivalent', 'undecided']
+    seed: Optional[int] = None
+    time_taken: float
 
 class ResolveCardsRequest(BaseModel):
     passcodes: List[str]
@@ -0,0 +1,182 @@
+"""
+Content-addressed cache of simulation results for the Yu-Gi-Oh Deck Simulator API
+
+A request is keyed by a hash of what actually determines its result: the deck,
+the subcategories, the compiled success rules (see rule_compiler), the card
+effects and the run settings. Cosmetic differences, such as the order of rules
+or of the cards in a group, '=' vs '==', or the number of workers, map to the
+same key. The hand cache size never changes the success rate, but it is keyed
+because the result reports the hand cache's hit rate.
+
+Results are kept in a small in-memory LRU backed by a directory of JSON files,
+which is trimmed to a maximum size by dropping the least recently used files.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Callable, Optional
+
+
+# Bump when a simulator change makes stored results stale
+CACHE_VERSION = 1
+# Results kept in memory
+DEFAULT_MAX_ENTRIES = 256
+# Total size of the on-disk store before the least recently used results are dropped
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_DIRECTORY = os.environ.get(
+    "RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "yugioh-deck-simulator-results"))
+
+
+def config_key(simulator, conditions: List[Callable], config) -> Optional[str]:
+    """
+    Canonical hash of a simulation request.
+
+    Args:
+        simulator: Simulator built for the request (deck, subcategories and effects)
+        conditions: Success conditions built for the request
+        config: The SimulationConfig
+
+    Returns:
+        Hex digest, or None when the conditions cannot be compiled (not cacheable)
+    """
+    from rule_compiler import compile_rules, canonical_form, Node
+
+    deck_counts = Counter(simulator.deck.cards)
+    try:
+        program = compile_rules(conditions, simulator.subcategory_map, deck_counts=deck_counts, profile_hands=0)
+    except ValueError:
+        return None
+
+    if config.seed is None:
+        deck = sorted(deck_counts.items())
+    else:
+        # Card order decides which hands a seed draws
+        deck = list(deck_counts.items())
+
+    exact = config.engine == 'exact'
+    canonical = {
+        'version': CACHE_VERSION,
+        'deck_size': config.deck_size,
+        'deck': deck,
+        'subcategories': sorted((subcat, sorted(cards)) for subcat, cards in simulator.subcategory_map.items()),
+        'rules': canonical_form(Node('OR', tuple(program.branches))),
+        # Effects resolve in registration order, so their order is kept
+        'effects': [
+            [card, type(effect).__name__, sorted(vars(effect).items())]
+            for card, effect in simulator.card_effects.items()
+        ],
+        'hand_size': config.hand_size,
+        'engine': config.engine,
+        'confidence': config.confidence,
+        # The exact engine ignores the sampling settings
+        'simulations': None if exact else config.simulations,
+        'seed': None if exact else config.seed,
+        'record_hands': False if exact else config.record_hands,
+        'record_filter': (None if exact or not config.record_hands or config.record_filter is None
+                          else config.record_filter.model_dump()),
+        'target_precision': None if exact else config.target_precision,
+        'time_budget': None if exact else config.time_budget,
+        'sampling': 'random' if exact else config.sampling,
+        # Reported through cache_hit_rate
+        'hand_cache_size': None if exact else config.hand_cache_size,
+        # Objectives are named by the request, so they are keyed as sent; branch names follow the rule order
+        'rule_sets': [rule_set.model_dump() for rule_set in config.rule_sets],
+        'branch_counts': [[r.model_dump() for r in group] for group in config.rules] if config.branch_counts else None,
+        'brick_summary': config.brick_summary_size if config.brick_summary else None,
+        'histograms': config.histograms,
+        'card_impact': config.card_impact,
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    In-memory LRU of results backed by an on-disk store.
+
+    Args:
+        max_entries: Results kept in memory
+        directory: On-disk store (None keeps results in memory only)
+        max_bytes: Size of the on-disk store before the least recently used files are removed
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, directory: Optional[str] = DEFAULT_DIRECTORY,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # Measured on first write
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored result for a key, or None."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                return value
+
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError):
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a JSON-serializable result."""
+        self._remember(key, value)
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            data = json.dumps(value).encode()
+            # Write then rename, so readers never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+            self._trim(key, len(data))
+        except OSError:
+            pass  # The disk store is best effort
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _trim(self, key: str, added: int):
+        """Remove the least recently used files (never `key`, just written) once the store exceeds max_bytes."""
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += added
+                if self._disk_bytes <= self.max_bytes:
+                    return
+
+            files = []
+            for name in os.listdir(self.directory):
+                if name.endswith('.json') and name != f"{key}.json":
+                    stat = os.stat(os.path.join(self.directory, name))
+                    files.append((stat.st_mtime, stat.st_size, name))
+            total = added + sum(size for _, size, _ in files)
+            for _, size, name in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            self._disk_bytes = total
@@ -29,7 +29,37 @@ export interface SimulationConfig {
     simulations: number;
     rules: Requirement[][];
     card_effects?: CardEffectDefinition[];
-    record_hands?: boolean;  // Opt-in: store individual hand records (capped at 10 000)
+    record_hands?: boolean;  // Opt-in: store a uniform sample of up to 10 000 hands from the whole run
+    record_filter?: RecordFilter;  // Only sample hands matching this filter (e.g. bricks)
+    engine?: 'python' | 'batch' | 'auto' | 'exact';  // Simulation engine (backend defaults to 'auto')
+    seed?: number;  // Makes the run reproducible
+    workers?: number;  // Worker processes to spread the simulation over
+    target_precision?: number;  // Stop once the CI half-width is at most this many percentage points
+    confidence?: number;  // Confidence level of the reported interval (default 0.95)
+    time_budget?: number;  // Stop after this many seconds (simulations is then a maximum)
+    hand_cache_size?: number;  // Distinct hands whose outcome is cached (omit for automatic, 0 = off)
+    progress_interval?: number;  // Hands between progress events of runSimulationStream (at least 1000)
+    use_cache?: boolean;  // Serve identical requests from the result cache (default true)
+    sampling?: 'random' | 'stratified' | 'antithetic' | 'importance';  // Variance reduction (runSimulation only)
+    rule_sets?: RuleSet[];  // Extra questions counted on the same hands
+    branch_counts?: boolean;  // Also count each rule on its own, as "Rule 1", "Rule 2", ...
+    brick_summary?: boolean;  // Summarize the bricked hands (most common hands and profiles, card pairs)
+    brick_summary_size?: number;  // Hands and profiles listed in the brick summary (default 20)
+    histograms?: boolean;  // Count cards and subcategories per hand, for charts without hand records
+    card_impact?: boolean;  // Success rate with and without each card in the opening hand
+}
+
+// A named question answered on the same hands as the run (rules with OR logic)
+export interface RuleSet {
+    name: string;
+    rules: Requirement[][];
+}
+
+// Which hands record_hands keeps (every set criterion must hold)
+export interface RecordFilter {
+    outcome?: "success" | "brick" | null;
+    effects_only?: boolean;  // Only hands where a card effect drew or discarded cards
+    card?: string | null;  // Only opening hands holding this card or a card of this subcategory
 }
 
 export interface HandRecord {
@@ -40,21 +70,149 @@ export interface HandRecord {
     success: boolean;
 }
 
+// One card list of every recorded hand: hand i's cards are values[offsets[i]..offsets[i + 1]]
+export interface HandRecordColumn {
+    values: string;  // Base64 little-endian card ids (of HandRecordColumns.id_type)
+    offsets: string;  // Base64 little-endian uint32 offsets
+}
+
+export interface HandRecordColumns {
+    cards: string[];  // Card names by id
+    count: number;
+    matched: number;  // Hands that matched the record filter; the records are a uniform sample of them
+    id_type: "uint8" | "uint16" | "uint32";
+    initial_hand: HandRecordColumn;
+    final_hand: HandRecordColumn;
+    cards_drawn: HandRecordColumn;
+    cards_discarded: HandRecordColumn;
+    success: string;  // Base64 bitmap: bit i % 8 of byte i / 8 is hand i's outcome
+}
+
+// Per-objective counts of one run, all from the same hands
+export interface ObjectiveResult {
+    objectives: { name: string; count: number; rate: number }[];  // Branches first, then rule sets
+    overlaps: number[][];  // overlaps[i][j]: hands meeting objectives i and j (diagonal = counts)
+    combinations: { names: string[]; count: number }[];  // Hands meeting exactly these objectives, most frequent first
+}
+
+// Why the deck bricks, from the whole run
+export interface BrickSummary {
+    bricks: number;
+    error: number;  // Most any listed count can be below the truth; anything more common is listed
+    hands: { cards: string[]; count: number }[];  // Most common bricked hands first
+    profiles: { subcategories: Record<string, number>; count: number }[];  // Empty without subcategories
+    cards: string[];  // Cards seen in bricked hands
+    co_occurrence: number[][];  // co_occurrence[i][j]: bricks holding cards i and j (diagonal: card i)
+}
+
+// Count histograms of every hand of the run: row[c] is the number of hands with c copies
+// (rows end at their last non-zero bin)
+export interface HandHistograms {
+    cards: string[];
+    subcategories: string[];
+    card_initial: number[][];  // Per card, in the opening hand
+    card_final: number[][];  // Per card, after effects
+    card_success: number[][];  // Per card: successful hands among card_initial's
+    subcategory_initial: number[][];
+    subcategory_final: number[][];
+    subcategory_success: number[][];
+    hand_size: number[];  // Hands ending with 0, 1, 2, ... cards
+    cards_drawn: number[];  // Hands where effects drew 0, 1, 2, ... cards
+    cards_discarded: number[];
+    card_drawn_total: number[];  // Copies of each card drawn by effects
+    card_discarded_total: number[];
+}
+
+// Success rate with and without a card in the opening hand (%, intervals at the run's confidence)
+export interface CardImpact {
+    card: string;
+    opened: number;  // Hands opening at least one copy
+    opened_rate: number;
+    success_if_opened: number;
+    success_if_opened_low: number;
+    success_if_opened_high: number;
+    success_if_not_opened: number;
+    success_if_not_opened_low: number;
+    success_if_not_opened_high: number;
+    impact: number;  // success_if_opened - success_if_not_opened (percentage points)
+    impact_low: number;
+    impact_high: number;
+}
+
 export interface SimulationResult {
     success_rate: number;
     brick_rate: number;
     success_count: number;
     brick_count: number;
     time_taken: number;
+    total_simulations: number;  // Hands actually simulated
+    ci_low?: number | null;  // Success rate confidence interval (%)
+    ci_high?: number | null;
+    confidence?: number | null;
     max_depth_reached_count: number;
     warnings: string[];
-    hand_records: HandRecord[];
+    hand_records?: HandRecord[];  // Not sent by the API: filled from hand_record_columns by the functions below
+    hand_record_columns?: HandRecordColumns | null;
+    exact: boolean;  // Computed in closed form rather than sampled
+    seed?: number | null;  // Seed that reproduces this run
+    cache_hit_rate?: number | null;  // Share of hands answered by the hand cache (%)
+    cached?: boolean;  // Served from the result cache of an identical earlier request
+    variance_reduction?: number | null;  // Plain sampling's variance over this run's (stratified/antithetic/importance)
+    objectives?: ObjectiveResult | null;  // Rule set and branch counts (when requested)
+    brick_summary?: BrickSummary | null;  // Most common bricks (when requested)
+    histograms?: HandHistograms | null;  // Card and subcategory count histograms (when requested)
+    card_impact?: CardImpact[] | null;  // Per-card impact, highest first (when requested)
 }
 
 // Use environment variable for API URL or fallback to local
 const API_URL = import.meta.env.VITE_API_URL || "http://127.0.0.1:8000";
 export const PROXY_URL = `${API_URL}/api/proxy-image`;
 
+const ID_WIDTHS = { uint8: 1, uint16: 2, uint32: 4 };
+
+function readUints(data: string, width: number): number[] {
+    const binary = atob(data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    const view = new DataView(bytes.buffer);
+    const values: number[] = [];
+    for (let offset = 0; offset + width <= bytes.length; offset += width) {
+        values.push(width === 1 ? view.getUint8(offset)
+            : width === 2 ? view.getUint16(offset, true) : view.getUint32(offset, true));
+    }
+    return values;
+}
+
+// Expands a result's columnar hand records into hand_records.
+export function expandHandRecords(result: SimulationResult): SimulationResult {
+    const columns = result.hand_record_columns;
+    if (!columns) return result;
+
+    const width = ID_WIDTHS[columns.id_type];
+    const decode = (column: HandRecordColumn) => {
+        const values = readUints(column.values, width);
+        const offsets = readUints(column.offsets, 4);
+        return (i: number) => values.slice(offsets[i], offsets[i + 1]).map(id => columns.cards[id]);
+    };
+    const initial = decode(columns.initial_hand);
+    const final = decode(columns.final_hand);
+    const drawn = decode(columns.cards_drawn);
+    const discarded = decode(columns.cards_discarded);
+    const success = readUints(columns.success, 1);
+
+    result.hand_records = [];
+    for (let i = 0; i < columns.count; i++) {
+        result.hand_records.push({
+            initial_hand: initial(i),
+            final_hand: final(i),
+            cards_drawn: drawn(i),
+            cards_discarded: discarded(i),
+            success: ((success[i >> 3] >> (i & 7)) & 1) === 1,
+        });
+    }
+    return result;
+}
+
 export async function runSimulation(config: SimulationConfig): Promise<SimulationResult> {
     const response = await fetch(`${API_URL}/simulate`, {
         method: "POST",
@@ -72,6 +230,253 @@ export async function runSimulation(config: SimulationConfig): Promise<Simulatio
         throw new Error(errorMessage);
     }
 
+    return expandHandRecords(await response.json());
+}
+
+export interface SimulationProgress {
+    completed: number;  // Hands simulated so far
+    total: number;
+    success_rate: number;
+    ci_low: number;
+    ci_high: number;
+    confidence: number;
+    elapsed: number;  // Seconds
+    hands_per_second: number;
+}
+
+// Runs a simulation through the /simulate/stream endpoint (Server-Sent Events),
+// calling onProgress with each running estimate. Aborting the signal stops the run.
+export async function runSimulationStream(
+    config: SimulationConfig,
+    onProgress: (progress: SimulationProgress) => void,
+    signal?: AbortSignal,
+): Promise<SimulationResult> {
+    const response = await fetch(`${API_URL}/simulate/stream`, {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+        },
+        body: JSON.stringify(config),
+        signal,
+    });
+
+    if (!response.ok || !response.body) {
+        const error = await response.json();
+        const errorMessage = error.detail
+            ? (typeof error.detail === 'string' ? error.detail : JSON.stringify(error.detail))
+            : "Simulation failed";
+        throw new Error(errorMessage);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let end;
+        while ((end = buffer.indexOf("\n\n")) !== -1) {
+            const message = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+
+            let event = "message";
+            let data = "";
+            for (const line of message.split("\n")) {
+                if (line.startsWith("event: ")) event = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+            }
+
+            if (event === "progress") onProgress(JSON.parse(data));
+            else if (event === "result") return expandHandRecords(JSON.parse(data));
+            else if (event === "error") throw new Error(JSON.parse(data).detail);
+        }
+    }
+    throw new Error("Simulation stream ended without a result");
+}
+
+export interface SimulationJob {
+    id: string;
+    status: "queued" | "running" | "completed" | "failed" | "cancelled";
+    progress?: SimulationProgress | null;
+    result?: SimulationResult | null;
+    error?: string | null;
+}
+
+async function jobRequest(path: string, init?: RequestInit): Promise<SimulationJob> {
+    const response = await fetch(`${API_URL}${path}`, init);
+    if (!response.ok) {
+        const error = await response.json();
+        const errorMessage = error.detail
+            ? (typeof error.detail === 'string' ? error.detail : JSON.stringify(error.detail))
+            : "Simulation job request failed";
+        throw new Error(errorMessage);
+    }
+    const job: SimulationJob = await response.json();
+    if (job.result) expandHandRecords(job.result);
+    return job;
+}
+
+// Starts a simulation in the background; poll it with getSimulationJob.
+export function startSimulationJob(config: SimulationConfig): Promise<SimulationJob> {
+    return jobRequest("/jobs", {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+        },
+        body: JSON.stringify(config),
+    });
+}
+
+export function getSimulationJob(id: string): Promise<SimulationJob> {
+    return jobRequest(`/jobs/${id}`);
+}
+
+export function cancelSimulationJob(id: string): Promise<SimulationJob> {
+    return jobRequest(`/jobs/${id}`, { method: "DELETE" });
+}
+
+export interface SweepAxis {
+    kind: "card_count" | "hand_size" | "effect_parameter";
+    values: (number | string)[];
+    card_name?: string;
+    parameter?: string;  // Effect parameter, e.g. "draw_count"
+}
+
+export interface SweepConfig extends SimulationConfig {
+    axes: SweepAxis[];
+}
+
+export interface SweepPoint {
+    values: Record<string, number | string>;  // Axis label -> value
+    result: SimulationResult;
+    difference: number;  // Success rate minus the first point's (percentage points)
+    difference_low: number;
+    difference_high: number;
+}
+
+export interface SweepResult {
+    points: SweepPoint[];
+    seed?: number | null;
+    time_taken: number;
+}
+
+// Evaluates every combination of the axes on shared random draws.
+export async function runSweep(config: SweepConfig): Promise<SweepResult> {
+    const response = await fetch(`${API_URL}/sweep`, {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+        },
+        body: JSON.stringify(config),
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        const errorMessage = error.detail
+            ? (typeof error.detail === 'string' ? error.detail : JSON.stringify(error.detail))
+            : "Sweep failed";
+        throw new Error(errorMessage);
+    }
+
+    return response.json();
+}
+
+export interface CardLimit {
+    card_name: string;
+    min_copies: number;
+    max_copies: number;
+}
+
+export interface OptimizeConfig extends SimulationConfig {
+    card_limits: CardLimit[];
+    min_deck_size?: number;  // Defaults to deck_size
+    max_deck_size?: number;
+    finalists?: number;
+    screening_simulations?: number;
+}
+
+export interface OptimizedDeck {
+    card_counts: Record<string, number>;
+    deck_size: number;
+    result: SimulationResult;
+    difference: number;  // Success rate minus the starting deck's (percentage points)
+    difference_low: number;
+    difference_high: number;
+}
+
+export interface OptimizeResult {
+    decks: OptimizedDeck[];  // Best first, including the starting deck
+    evaluated: number;
+    exact: boolean;
+    seed?: number | null;
+    time_taken: number;
+}
+
+// Searches the card counts within the limits that give the highest success rate.
+export async function optimizeDeck(config: OptimizeConfig): Promise<OptimizeResult> {
+    const response = await fetch(`${API_URL}/optimize`, {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+        },
+        body: JSON.stringify(config),
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        const errorMessage = error.detail
+            ? (typeof error.detail === 'string' ? error.detail : JSON.stringify(error.detail))
+            : "Optimization failed";
+        throw new Error(errorMessage);
+    }
+
+    return response.json();
+}
+
+export interface DeckList {
+    deck_size: number;
+    deck_contents?: Record<string, number>;
+    card_categories?: CardCategory[];
+    card_effects?: CardEffectDefinition[];
+}
+
+export interface CompareConfig extends SimulationConfig {
+    second_deck: DeckList;
+    tolerance?: number;  // Differences within +/- this many percentage points count as equivalent
+}
+
+export interface CompareResult {
+    first: SimulationResult;
+    second: SimulationResult;
+    difference: number;  // First minus second (percentage points)
+    difference_low: number;
+    difference_high: number;
+    simulations: number;  // Hands per deck that were needed
+    decision: "first" | "second" | "equivalent" | "undecided";
+    seed?: number | null;
+    time_taken: number;
+}
+
+// Compares two decklists on the same shuffles, stopping once the difference is clear.
+export async function compareDecks(config: CompareConfig): Promise<CompareResult> {
+    const response = await fetch(`${API_URL}/compare`, {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+        },
+        body: JSON.stringify(config),
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        const errorMessage = error.detail
+            ? (typeof error.detail === 'string' ? error.detail : JSON.stringify(error.detail))
+            : "Comparison failed";
+        throw new Error(errorMessage);
+    }
+
     return response.json();
 }
 
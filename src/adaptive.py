@@ -0,0 +1,92 @@
+"""
+Adaptive stopping for Monte Carlo runs
+
+Instead of always running a fixed number of hands, the simulation proceeds in
+chunks and stops as soon as the confidence interval of the success rate is
+narrow enough, or a wall-clock budget is used up. The requested number of
+simulations becomes an upper bound.
+
+Chunk sizes are derived from the results so far (how many more hands the
+target precision needs), capped so the run never more than doubles between
+checks. With a seed, every chunk uses a seed-derived stream, so
+precision-driven runs are reproducible.
+"""
+
+import time
+from typing import List, Dict, Callable, Optional, Union
+
+from deck_sim import Simulator, SimulationResult
+from hand_records import RecordFilter
+from parallel import derive_seed, merge_results
+from confidence import wilson_interval, required_trials
+
+
+# Smallest chunk worth checking the stopping criteria for
+MIN_CHUNK_SIZE = 10_000
+
+
+def run_adaptive(simulator: Simulator, max_simulations: int, hand_size: int, conditions: List[Callable],
+                 record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000, engine: str = 'python',
+                 seed: Optional[int] = None, workers: Optional[int] = 1,
+                 target_precision: Optional[float] = None, confidence: float = 0.95,
+                 time_budget: Optional[float] = None,
+                 min_chunk_size: int = MIN_CHUNK_SIZE,
+                 objectives: Optional[Dict[str, List[Callable]]] = None,
+                 brick_summary: bool = False, histograms: bool = False,
+                 card_impact: bool = False) -> SimulationResult:
+    """
+    Run until the success rate is known precisely enough or time runs out.
+
+    Args:
+        max_simulations: Upper bound on the number of simulated hands
+        target_precision: Stop once the confidence interval half-width is at most
+                          this many percentage points (e.g. 0.1 for +/-0.1%)
+        confidence: Confidence level of the interval (e.g. 0.95)
+        time_budget: Stop once this many seconds have been spent
+
+    Returns:
+        The merged SimulationResult; total_simulations is the number of hands actually used
+    """
+    if target_precision is not None and target_precision <= 0:
+        raise ValueError("Target precision must be positive")
+    if time_budget is not None and time_budget <= 0:
+        raise ValueError("Time budget must be positive")
+
+    start = time.perf_counter()
+    results: List[SimulationResult] = []
+    done = 0
+    successes = 0
+    chunk = min(min_chunk_size, max_simulations)
+
+    while done < max_simulations:
+        chunk_seed = derive_seed(seed, len(results)) if seed is not None else None
+        result = simulator._run_fixed(chunk, hand_size, conditions,
+                                      record_hands=record_hands, max_hand_records=max_hand_records,
+                                      engine=engine, seed=chunk_seed, workers=workers, objectives=objectives,
+                                      brick_summary=brick_summary, histograms=histograms,
+                                      card_impact=card_impact)
+        results.append(result)
+        done += result.total_simulations
+        successes += result.success_count
+        elapsed = time.perf_counter() - start
+
+        if target_precision is not None:
+            low, high = wilson_interval(successes, done, confidence)
+            if (high - low) / 2 * 100.0 <= target_precision:
+                break
+        if time_budget is not None and elapsed >= time_budget:
+            break
+
+        # Size the next chunk: never past the cap, never more than double the run so far
+        chunk = min(max_simulations - done, max(done, min_chunk_size))
+        if target_precision is not None:
+            needed = required_trials(successes / done, target_precision / 100.0, confidence) - done
+            chunk = min(chunk, max(needed, min_chunk_size))
+        if time_budget is not None and elapsed > 0:
+            affordable = int(done / elapsed * (time_budget - elapsed))
+            chunk = min(chunk, max(affordable, min_chunk_size))
+        chunk = min(chunk, max_simulations - done)
+
+    merged = merge_results(results, max_hand_records, seed)
+    merged.seed = seed
+    return merged
@@ -0,0 +1,391 @@
+"""
+Vectorized (NumPy) simulation engine for the Yu-Gi-Oh Deck Simulator
+
+Instead of drawing one hand per loop iteration, this engine draws whole blocks
+of hands as an integer matrix (hands x hand_size card ids), turns them into a
+per-card count matrix and evaluates the Rule/CompositeRule tree once per block
+with array operations.
+
+It produces the same SimulationResult as the pure-Python path in
+Simulator.run. Conditions must be built from Rule/CompositeRule, and every
+card effect must provide a batch kernel (CardEffect.apply_batch): effects are
+then resolved for all failed hands of a block at once. Everything else stays
+on the Python loop.
+
+NumPy is an optional dependency. When it is not installed, is_available()
+returns False and the Simulator falls back to the pure-Python engine.
+"""
+
+from typing import List, Dict, Callable, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+from deck_sim import Deck, Rule, CompositeRule, SimulationResult
+from objectives import ObjectiveCounts
+from brick_summary import BrickSummary
+from histograms import HandHistograms
+from card_impact import ImpactCounts
+from hand_records import HandRecordStore, RecordFilter, Reservoir, record_filter, reservoir_store, sample_rng
+from card_index import CardIndex
+from card_effects import CardEffect, DrawEffect, EffectContext
+
+
+# Number of hands drawn and scored per block. Large enough to amortize the
+# per-block Python overhead, small enough to keep the shuffle buffer in cache.
+DEFAULT_BLOCK_SIZE = 32_768
+
+
+def is_available() -> bool:
+    """True when NumPy is installed and the batch engine can be used."""
+    return np is not None
+
+
+def is_vectorizable(condition: Callable) -> bool:
+    """Check whether a condition is a Rule tree the batch engine can evaluate."""
+    if isinstance(condition, Rule):
+        return True
+    if isinstance(condition, CompositeRule):
+        return is_vectorizable(condition.left) and is_vectorizable(condition.right)
+    return False
+
+
+def evaluate_rule_batch(rule, column: Callable[[str], "np.ndarray"]) -> "np.ndarray":
+    """
+    Evaluate a Rule/CompositeRule tree for a whole block of hands.
+
+    Args:
+        rule: Rule or CompositeRule to evaluate
+        column: Returns the per-hand count vector for a card or subcategory name
+
+    Returns:
+        Boolean array with one entry per hand
+    """
+    if isinstance(rule, CompositeRule):
+        left = evaluate_rule_batch(rule.left, column)
+        right = evaluate_rule_batch(rule.right, column)
+        if rule.operator == 'OR':
+            return left | right
+        return left & right
+
+    counts = column(rule.card_name)
+    if rule.comparison == '==':
+        return counts == rule.min_count
+    return counts >= rule.min_count
+
+
+def _ordered(cards: List[int], order: List[int]) -> List[int]:
+    """Arrange a hand's cards following `order` (drawn hand, then effect draws)."""
+    left = list(cards)
+    ordered = []
+    for card in order:
+        if card in left:
+            left.remove(card)
+            ordered.append(card)
+    return ordered
+
+
+def _add_bins(row: List[int], values: "np.ndarray"):
+    """Add the histogram of `values` (non-negative integers below len(row)) to a list of bins."""
+    for value, count in enumerate(np.bincount(values, minlength=len(row)).tolist()):
+        row[value] += count
+
+
+class BatchEngine:
+    """
+    Draws and scores blocks of hands with NumPy.
+
+    Cards are interned to integer ids with a CardIndex (in order of first
+    appearance in the deck), and every deck position maps to one of those ids.
+    Subcategory counts for a whole block come from one product of the count
+    matrix with the card x subcategory incidence matrix.
+    """
+
+    def __init__(self, deck: Deck, subcategory_map: Dict[str, List[str]] = None,
+                 block_size: int = DEFAULT_BLOCK_SIZE, card_effects: Dict[str, CardEffect] = None):
+        if np is None:
+            raise ValueError("The batch engine requires NumPy to be installed")
+
+        self.deck = deck
+        self.subcategory_map = subcategory_map or {}
+        self.block_size = block_size
+        self.card_effects = card_effects or {}
+        for name, effect in self.card_effects.items():
+            if not effect.batch_kernel:
+                raise ValueError(f"The effect of {name} has no batch kernel")
+
+        self.index = CardIndex(deck.cards, self.subcategory_map, self.card_effects)
+        self.card_names: List[str] = self.index.names
+        self.card_ids: Dict[str, int] = self.index.ids
+        self.tag_ids: Dict[str, int] = {tag: i for i, tag in enumerate(self.index.tags)}
+        # float32 so the per-block product runs through BLAS; counts are small integers, so it is exact
+        self.incidence = self.index.incidence_matrix().astype(np.float32)
+        self.position_ids = np.array([self.card_ids[card] for card in deck.cards], dtype=np.int16)
+        self.deck_vector = np.array(self.index.vector(deck.cards), dtype=np.int16)
+
+    def draw_block(self, n: int, hand_size: int, rng: "np.random.Generator") -> "np.ndarray":
+        """
+        Draw n hands without replacement using a vectorized partial Fisher-Yates shuffle.
+
+        Returns:
+            Matrix of shape (n, hand_size) holding card ids
+        """
+        deck_size = len(self.position_ids)
+        rows = np.arange(n)
+        positions = np.tile(np.arange(deck_size, dtype=np.int16), (n, 1))
+
+        for j in range(hand_size):
+            swap = j + (rng.random(n) * (deck_size - j)).astype(np.intp)
+            picked = positions[rows, swap]
+            positions[rows, swap] = positions[rows, j]
+            positions[rows, j] = picked
+
+        return self.position_ids[positions[:, :hand_size]]
+
+    def count_matrix(self, hands: "np.ndarray") -> "np.ndarray":
+        """Turn a (n, hand_size) id matrix into a (n, num_cards) count matrix."""
+        n = hands.shape[0]
+        rows = np.arange(n)
+        counts = np.zeros((n, len(self.card_names)), dtype=np.int16)
+        for j in range(hands.shape[1]):
+            counts[rows, hands[:, j]] += 1
+        return counts
+
+    def _column_lookup(self, counts: "np.ndarray") -> Callable[[str], "np.ndarray"]:
+        """Build a cached name -> count column accessor for one block."""
+        cache: Dict[Optional[str], "np.ndarray"] = {}
+        zeros = np.zeros(counts.shape[0], dtype=np.int16)
+        tag_counts = counts.astype(np.float32) @ self.incidence if self.tag_ids else None
+
+        def column(name: Optional[str]) -> "np.ndarray":
+            if name in cache:
+                return cache[name]
+            if name in self.tag_ids:
+                # Subcategory counts override a card of the same name, as in Simulator._evaluate_hand
+                values = tag_counts[:, self.tag_ids[name]]
+            elif name in self.card_ids:
+                values = counts[:, self.card_ids[name]]
+            else:
+                values = zeros
+            cache[name] = values
+            return values
+
+        return column
+
+    def evaluate_block(self, counts: "np.ndarray", conditions: List[Callable]) -> "np.ndarray":
+        """Evaluate the OR of all conditions for every hand in the block."""
+        success = np.zeros(counts.shape[0], dtype=bool)
+        column = self._column_lookup(counts)
+        for condition in conditions:
+            success |= evaluate_rule_batch(condition, column)
+        return success
+
+    def resolve_block(self, hands: "np.ndarray", conditions: List[Callable],
+                      rng: "np.random.Generator") -> tuple:
+        """
+        Resolve effects for a block of (failed) hands, mirroring Simulator.resolve_effects.
+
+        Draw effects resolve first, then the others, each in registration order. An
+        effect only fires for hands that started with its card and still hold it.
+
+        Returns:
+            Tuple of (final_hands, drawn, discarded) count matrices
+        """
+        starting = hands
+        current = hands.copy()
+        decks = self.deck_vector[None, :] - hands
+        drawn = np.zeros_like(hands)
+        discarded = np.zeros_like(hands)
+        context = EffectContext(
+            subcategory_map=self.subcategory_map,
+            success_conditions=conditions,
+            rng=rng,
+            card_index=self.index,
+            evaluate_batch=lambda counts: self.evaluate_block(counts, conditions)
+        )
+
+        for draw_phase in (True, False):
+            for name, effect in self.card_effects.items():
+                if isinstance(effect, DrawEffect) != draw_phase:
+                    continue
+                card_id = self.card_ids[name]
+                rows = np.flatnonzero((starting[:, card_id] > 0) & (current[:, card_id] > 0))
+                if len(rows) == 0:
+                    continue
+                rows = rows[effect.can_activate_batch(current[rows], decks[rows], context)]
+                if len(rows) == 0:
+                    continue
+
+                # Spend the activating card, then apply the kernel to every activating hand
+                spent = current[rows]
+                spent[:, card_id] -= 1
+                result = effect.apply_batch(spent, decks[rows], context)
+                result.hands[result.fully_reverted, card_id] += 1
+
+                current[rows] = result.hands
+                decks[rows] = result.remaining_decks
+                drawn[rows] += result.cards_drawn
+                discarded[rows] += result.cards_discarded
+
+        return current, drawn, discarded
+
+    def summarize_bricks(self, summary: BrickSummary, pairs: "np.ndarray", bricks: "np.ndarray"):
+        """Add a block of bricked opening hands (count rows) to a summary; pair counts go to `pairs`."""
+        if not len(bricks):
+            return
+        summary.bricks += len(bricks)
+        # Each distinct hand (and profile) is counted once with its multiplicity
+        rows, weights = np.unique(bricks, axis=0, return_counts=True)
+        for row, weight in zip(rows.tolist(), weights.tolist()):
+            summary.hands.add(tuple(self.index.expand_ids(row)), weight)
+        if summary.tags:
+            profiles = np.rint(bricks @ self.incidence).astype(np.int64)
+            rows, weights = np.unique(profiles, axis=0, return_counts=True)
+            for row, weight in zip(rows.tolist(), weights.tolist()):
+                summary.profiles.add(tuple(row), weight)
+        held = (bricks > 0).astype(np.int64)
+        pairs += held.T @ held
+
+    def histogram_block(self, histograms: HandHistograms, counts: "np.ndarray", final: "np.ndarray",
+                        success: "np.ndarray", failed: "np.ndarray",
+                        drawn: Optional["np.ndarray"], discarded: Optional["np.ndarray"]):
+        """Add a block to the histograms: opening and final count rows, outcomes and effect draws of failed rows."""
+        histograms.hands += len(counts)
+        histograms.successes += int(success.sum())
+        opening_tags = np.rint(counts @ self.incidence).astype(np.int64)
+        final_tags = np.rint(final @ self.incidence).astype(np.int64)
+        for rows, matrix in ((histograms.initial, counts), (histograms.final, final),
+                             (histograms.success, counts[success]), (histograms.tag_initial, opening_tags),
+                             (histograms.tag_final, final_tags), (histograms.tag_success, opening_tags[success])):
+            for column, row in enumerate(rows):
+                _add_bins(row, matrix[:, column])
+        _add_bins(histograms.hand_size, final.sum(axis=1))
+
+        for hist, totals, moved in ((histograms.drawn, histograms.card_drawn, drawn),
+                                    (histograms.discarded, histograms.card_discarded, discarded)):
+            per_hand = np.zeros(len(counts), dtype=np.int64)
+            if moved is not None:
+                per_hand[failed] = moved.sum(axis=1)
+                for card_id, count in enumerate(moved.sum(axis=0).tolist()):
+                    totals[card_id] += count
+            _add_bins(hist, per_hand)
+
+    def run(self, simulations: int, hand_size: int, conditions: List[Callable],
+            record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000,
+            seed: Optional[int] = None,
+            objectives: Optional[Dict[str, List[Callable]]] = None,
+            brick_summary: bool = False, histograms: bool = False,
+            card_impact: bool = False) -> SimulationResult:
+        """Run the simulation block by block. Mirrors Simulator.run for effect-free configs."""
+        if hand_size > len(self.position_ids):
+            raise ValueError("Sample larger than population or is negative")
+        rng = np.random.default_rng(seed)
+
+        successes = 0
+        recording = record_filter(record_hands)
+        reservoir = None
+        if recording is not None and max_hand_records > 0:
+            reservoir = Reservoir(max_hand_records, sample_rng(seed))
+            card_ids = recording.card_ids(self.index)
+        done = 0
+        remaining = simulations
+        failed_none = np.zeros(0, dtype=np.intp)
+        masks: Dict[int, int] = {}
+        summary = BrickSummary.for_index(self.index) if brick_summary else None
+        if summary is not None:
+            pairs = np.zeros((len(self.card_names), len(self.card_names)), dtype=np.int64)
+        tallies = HandHistograms.for_deck(self.index, self.deck_vector.tolist()) if histograms else None
+        impact = ImpactCounts(self.card_names, self.deck_vector.tolist()) if card_impact else None
+        if impact is not None:
+            opened = np.zeros(len(self.card_names), dtype=np.int64)
+            opened_successes = np.zeros(len(self.card_names), dtype=np.int64)
+
+        while remaining > 0:
+            n = min(self.block_size, remaining)
+            hands = self.draw_block(n, hand_size, rng)
+            counts = self.count_matrix(hands)
+            success = self.evaluate_block(counts, conditions)
+
+            # Effects only fire on hands that failed as drawn
+            failed = np.flatnonzero(~success) if self.card_effects else failed_none
+            if len(failed):
+                final, drawn, discarded = self.resolve_block(counts[failed], conditions, rng)
+                success[failed] = self.evaluate_block(final, conditions)
+
+            successes += int(success.sum())
+
+            if objectives or tallies is not None:
+                # Objectives and histograms see the hand after effects, like the success conditions
+                state = counts
+                if len(failed):
+                    state = counts.copy()
+                    state[failed] = final
+            if impact is not None:
+                held = counts > 0
+                opened += held.sum(axis=0)
+                opened_successes += held[success].sum(axis=0)
+
+            if tallies is not None:
+                self.histogram_block(tallies, counts, state, success, failed,
+                                     *((drawn, discarded) if len(failed) else (None, None)))
+
+            if objectives:
+                mask = np.zeros(n, dtype=np.int64)
+                for i, extra in enumerate(objectives.values()):
+                    mask |= self.evaluate_block(state, extra).astype(np.int64) << i
+                for value, hands in zip(*np.unique(mask, return_counts=True)):
+                    masks[int(value)] = masks.get(int(value), 0) + int(hands)
+
+            if summary is not None:
+                self.summarize_bricks(summary, pairs, counts[~success])
+
+            if reservoir is not None:
+                # Filter the block as a whole; only the sampled rows are turned into records
+                matching = np.ones(n, dtype=bool)
+                if recording.outcome is not None:
+                    matching &= success if recording.outcome == 'success' else ~success
+                if recording.effects_only:
+                    activated = np.zeros(n, dtype=bool)
+                    if len(failed):
+                        activated[failed] = drawn.any(axis=1) | discarded.any(axis=1)
+                    matching &= activated
+                if card_ids is not None:
+                    matching &= counts[:, sorted(card_ids)].sum(axis=1) > 0
+                rows = np.flatnonzero(matching)
+
+                for position, slot in reservoir.select(len(rows)):
+                    row = int(rows[position])
+                    hand = hands[row].tolist()
+                    final_hand, cards_drawn, cards_discarded = hand, [], []
+                    i = int(np.searchsorted(failed, row))
+                    if i < len(failed) and failed[i] == row:
+                        cards_drawn = self.index.expand_ids(drawn[i].tolist())
+                        cards_discarded = self.index.expand_ids(discarded[i].tolist())
+                        final_hand = _ordered(self.index.expand_ids(final[i].tolist()), hand + cards_drawn)
+                    reservoir.slots[slot] = (done + row, hand, final_hand, cards_drawn, cards_discarded,
+                                             bool(success[row]))
+
+            done += n
+            remaining -= n
+
+        if summary is not None:
+            summary.pairs = pairs.tolist()
+        if impact is not None:
+            impact.hands, impact.successes = simulations, successes
+            impact.opened, impact.opened_successes = opened.tolist(), opened_successes.tolist()
+
+        return SimulationResult(
+            total_simulations=simulations,
+            success_count=successes,
+            brick_count=simulations - successes,
+            success_rate=(successes / simulations) * 100.0,
+            brick_rate=((simulations - successes) / simulations) * 100.0,
+            hand_records=(reservoir_store(self.card_names, reservoir) if reservoir
+                          else HandRecordStore(self.card_names)),
+            objectives=ObjectiveCounts(list(objectives), masks) if objectives else None,
+            brick_summary=summary,
+            histograms=tallies,
+            card_impact=impact,
+        )
@@ -0,0 +1,135 @@
+"""
+Brick summaries for the Yu-Gi-Oh Deck Simulator
+
+Recording hands answers "why does this deck brick?" by shipping thousands of
+raw hands to the browser. A BrickSummary answers it while simulating, in a few
+kilobytes: the most common bricked opening hands (as card multisets), the most
+common subcategory profiles of bricked hands, and how often each pair of cards
+shows up together in a bricked hand.
+
+The distinct hands of a deck are far too many to count exactly, so hands and
+profiles go through FrequentItems, a Misra-Gries summary that keeps at most
+2 * capacity counters. Every reported count is a lower bound that is at most
+`error` below the true count, and error is at most bricks / (capacity + 1), so
+any hand or profile more common than that is guaranteed to be listed. Summaries
+of different shards merge by adding counters and compacting again, with the
+same guarantee.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Dict, Hashable, Iterable, Optional, Tuple
+
+from card_index import CardIndex
+
+
+# Counters each summary keeps after compaction (it holds up to twice as many in between)
+BRICK_SUMMARY_CAPACITY = 1000
+
+
+@dataclass
+class FrequentItems:
+    """Misra-Gries heavy-hitter summary: approximate counts of the most frequent keys of a stream."""
+    capacity: int = BRICK_SUMMARY_CAPACITY
+    counts: Dict[Hashable, int] = field(default_factory=dict)
+    error: int = 0  # Most any count can be below the truth (the total decremented so far)
+
+    def add(self, key: Hashable, weight: int = 1):
+        """Count `weight` occurrences of a key."""
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + weight
+        if len(counts) > 2 * self.capacity:
+            self._compact()
+
+    def merge(self, other: 'FrequentItems'):
+        """Add another summary's counts (the error bounds add up as well)."""
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.error += other.error
+        if len(self.counts) > self.capacity:
+            self._compact()
+
+    def _compact(self):
+        # Decrement every counter by the (capacity + 1)-th largest count and drop the ones left at zero
+        threshold = sorted(self.counts.values(), reverse=True)[self.capacity]
+        self.counts = {key: count - threshold for key, count in self.counts.items() if count > threshold}
+        self.error += threshold
+
+    def top(self, k: int) -> List[Tuple[Hashable, int]]:
+        """The k keys with the highest counts, most frequent first (ties in key order)."""
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:max(k, 0)]
+
+
+@dataclass
+class BrickSummary:
+    """Bounded-memory summary of the bricked opening hands of a run."""
+    names: List[str]  # Card names by id
+    tags: List[str]  # Subcategory names by tag id
+    card_tags: List[List[int]] = field(repr=False)  # Card id -> tag ids (see CardIndex)
+    bricks: int = 0
+    hands: FrequentItems = field(default_factory=FrequentItems)  # Sorted card id tuple -> bricks
+    profiles: FrequentItems = field(default_factory=FrequentItems)  # Tag count tuple -> bricks
+    pairs: List[List[int]] = None  # pairs[i][j]: bricks holding cards i and j (diagonal: holding card i)
+
+    def __post_init__(self):
+        if self.pairs is None:
+            self.pairs = [[0] * len(self.names) for _ in self.names]
+
+    @classmethod
+    def for_index(cls, index: CardIndex, capacity: int = BRICK_SUMMARY_CAPACITY) -> 'BrickSummary':
+        return cls(index.names, index.tags, index.card_tags,
+                   hands=FrequentItems(capacity), profiles=FrequentItems(capacity))
+
+    def add(self, card_ids: Iterable[int]):
+        """Count one bricked opening hand, given as card ids."""
+        card_ids = sorted(card_ids)
+        self.bricks += 1
+        self.hands.add(tuple(card_ids))
+        if self.tags:
+            tags = [0] * len(self.tags)
+            for card_id in card_ids:
+                for tag_id in self.card_tags[card_id]:
+                    tags[tag_id] += 1
+            self.profiles.add(tuple(tags))
+        held = set(card_ids)
+        for first in held:
+            row = self.pairs[first]
+            for second in held:
+                row[second] += 1
+
+    def merge(self, other: 'BrickSummary'):
+        """Add another run's summary of the same cards."""
+        if other.names != self.names:
+            raise ValueError("Cannot merge brick summaries of different decks")
+        self.bricks += other.bricks
+        self.hands.merge(other.hands)
+        self.profiles.merge(other.profiles)
+        for row, other_row in zip(self.pairs, other.pairs):
+            for card_id, count in enumerate(other_row):
+                row[card_id] += count
+
+    def top_hands(self, k: int) -> List[Tuple[List[str], int]]:
+        """The k most common bricked hands as (card names, count)."""
+        return [([self.names[card_id] for card_id in key], count) for key, count in self.hands.top(k)]
+
+    def top_profiles(self, k: int) -> List[Tuple[Dict[str, int], int]]:
+        """The k most common subcategory profiles of bricked hands as ({subcategory: cards}, count)."""
+        return [(dict(zip(self.tags, key)), count) for key, count in self.profiles.top(k)]
+
+    def co_occurrence(self) -> Tuple[List[str], List[List[int]]]:
+        """Card names seen in bricked hands and their pair counts (diagonal: bricks holding the card)."""
+        seen = [card_id for card_id in range(len(self.names)) if self.pairs[card_id][card_id]]
+        return ([self.names[card_id] for card_id in seen],
+                [[self.pairs[first][second] for second in seen] for first in seen])
+
+
+def merge_brick_summaries(parts: List[Optional[BrickSummary]]) -> Optional[BrickSummary]:
+    """Sum of several runs' summaries (None when no part has one)."""
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    first = parts[0]
+    merged = BrickSummary(first.names, first.tags, first.card_tags,
+                          hands=FrequentItems(first.hands.capacity), profiles=FrequentItems(first.profiles.capacity))
+    for part in parts:
+        merged.merge(part)
+    return merged
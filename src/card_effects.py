@@ -8,11 +8,20 @@ the game state during simulation.
 All cards are treated as once-per-turn (OPT) for simplicity.
 """
 
-from typing import List, Dict, Any, Optional
+import random
+from typing import List, Dict, Any, Optional, Callable
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 from collections import Counter
 
+from card_index import CardIndex
+from shuffled_deck import ShuffledDeck
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional (only needed for the batch kernels)
+    np = None
+
 
 @dataclass
 class EffectContext:
@@ -21,6 +30,12 @@ class EffectContext:
     success_conditions: List[Any]  # Success condition functions
     max_depth: int = 10  # Maximum effect resolution depth
     current_depth: int = 0  # Current recursion depth
+    rng: Optional[Any] = None  # Random source for draws: random.Random (defaults to the global random module), or a NumPy Generator for apply_batch
+    evaluate_hand: Optional[Callable[[List[str]], bool]] = None  # Compiled success check (see rule_compiler)
+    card_index: Optional[CardIndex] = None  # Card ids for the count-vector API (apply_counts)
+    evaluate_counts: Optional[Callable[[List[int]], bool]] = None  # Success check on a count vector
+    deck_buffer: Optional[ShuffledDeck] = None  # Deck being dealt by the simulation loop (apply_counts draws from it)
+    evaluate_batch: Optional[Callable[[Any], Any]] = None  # Success check on a (hands x cards) count matrix
 
 
 @dataclass
@@ -40,11 +55,24 @@ class EffectResult:
             self.cards_discarded = []
 
 
+@dataclass
+class BatchEffectResult:
+    """Result of applying a card effect to a block of hands (see CardEffect.apply_batch)"""
+    hands: Any  # (hands x cards) count matrix after the effect
+    remaining_decks: Any  # (hands x cards) count matrix of the decks after the effect
+    cards_drawn: Any  # (hands x cards) counts of the cards each hand drew
+    cards_discarded: Any  # (hands x cards) counts of the cards each hand discarded
+    fully_reverted: Any  # Boolean vector: the effect was rolled back for that hand
+
+
 class CardEffect(ABC):
     """
     Abstract base class for card effects.
     All cards are treated as once-per-turn (OPT) for simplicity.
     """
+
+    # True when the effect implements apply_batch (needed to run it in the batch engine)
+    batch_kernel = False
     
     @abstractmethod
     def apply(self, hand: List[str], remaining_deck: List[str], context: EffectContext) -> EffectResult:
@@ -75,12 +103,123 @@ class CardEffect(ABC):
         """
         return True
 
+    def can_activate_counts(self, hand: List[int], remaining_deck: List[int], context: EffectContext) -> bool:
+        """
+        Count-vector version of can_activate (vectors are indexed by context.card_index).
+        The default implementation converts to card lists and calls can_activate.
+        """
+        index = context.card_index
+        return self.can_activate(index.expand(hand), index.expand(remaining_deck))
+
+    def apply_counts(self, hand: List[int], remaining_deck: List[int], context: EffectContext) -> EffectResult:
+        """
+        Count-vector version of apply, used by the simulation loop.
+
+        Args:
+            hand: Count vector of the hand (indexed by context.card_index)
+            remaining_deck: Count vector of the cards still in the deck
+            context: Effect context
+
+        Returns:
+            EffectResult whose hand/remaining_deck are count vectors and whose
+            cards_drawn/cards_discarded are card ids. The default implementation
+            converts to card lists and calls apply.
+        """
+        index = context.card_index
+        result = self.apply(index.expand(hand), index.expand(remaining_deck), context)
+        drawn_ids = [index.ids[card] for card in result.cards_drawn]
+        if context.deck_buffer is not None and not result.fully_reverted:
+            # Keep the dealt deck in sync with the cards the list-based effect drew
+            context.deck_buffer.take(drawn_ids)
+        return EffectResult(
+            hand=index.vector(result.hand),
+            remaining_deck=index.vector(result.remaining_deck),
+            depth_exceeded=result.depth_exceeded,
+            cards_drawn=drawn_ids,
+            cards_discarded=[index.ids[card] for card in result.cards_discarded],
+            fully_reverted=result.fully_reverted
+        )
+
+    def can_activate_batch(self, hands, remaining_decks, context: EffectContext):
+        """Boolean vector: can_activate for every row of a block of count matrices."""
+        return np.ones(hands.shape[0], dtype=bool)
+
+    def apply_batch(self, hands, remaining_decks, context: EffectContext) -> BatchEffectResult:
+        """
+        Optional batch kernel: apply the effect to many hands at once. Only
+        called on effects whose class sets batch_kernel = True.
+
+        Args:
+            hands: (hands x cards) count matrix, activating card already spent
+            remaining_decks: (hands x cards) count matrix of the cards left in each deck
+            context: Effect context with card_index, a NumPy Generator as rng and evaluate_batch
+
+        Returns:
+            BatchEffectResult with the same semantics as apply, row by row
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no batch kernel")
+
+
+def draw_batch(hands, remaining_decks, count: int, rng) -> "np.ndarray":
+    """
+    Draw `count` random cards for every row of a block (in place, without replacement).
+
+    Args:
+        hands: (hands x cards) count matrix the drawn cards are added to
+        remaining_decks: (hands x cards) count matrix the cards are taken from
+        rng: NumPy Generator
+
+    Returns:
+        (hands x cards) counts of the drawn cards
+    """
+    rows = np.arange(hands.shape[0])
+    drawn = np.zeros_like(hands)
+    for _ in range(count):
+        totals = remaining_decks.sum(axis=1)
+        live = totals > 0
+        position = (rng.random(hands.shape[0]) * totals).astype(np.int64)
+        # Card whose cumulative count range holds the drawn position
+        card = (remaining_decks.cumsum(axis=1) <= position[:, None]).sum(axis=1)
+        card = np.minimum(card, hands.shape[1] - 1)
+        picked_rows, picked = rows[live], card[live]
+        remaining_decks[picked_rows, picked] -= 1
+        hands[picked_rows, picked] += 1
+        drawn[picked_rows, picked] += 1
+    return drawn
+
+
+def draw_counts(hand: List[int], remaining_deck: List[int], count: int, rng) -> List[int]:
+    """
+    Move `count` random cards from a deck count vector to a hand count vector (in place).
+
+    Picks the same cards as drawing from the deck as a list grouped by card id,
+    so both representations consume the random stream identically.
+
+    Returns:
+        Ids of the drawn cards, in draw order
+    """
+    total = sum(remaining_deck)
+    drawn = []
+    for _ in range(min(count, total)):
+        position = rng.randint(0, total - 1)
+        card_id = 0
+        while position >= remaining_deck[card_id]:
+            position -= remaining_deck[card_id]
+            card_id += 1
+        remaining_deck[card_id] -= 1
+        hand[card_id] += 1
+        total -= 1
+        drawn.append(card_id)
+    return drawn
+
 
 class DrawEffect(CardEffect):
     """
     Effect that draws a specified number of cards from the deck.
     Example: Pot of Greed (draw 2 cards)
     """
+
+    batch_kernel = True
     
     def __init__(self, count: int):
         """
@@ -120,12 +259,12 @@ class DrawEffect(CardEffect):
         new_hand = hand.copy()
         new_deck = remaining_deck.copy()
         drawn_cards = []
+        rng = context.rng or random
         
         for _ in range(self.count):
             if new_deck:
                 # Draw a random card (simulate drawing from shuffled deck)
-                import random
-                card_index = random.randint(0, len(new_deck) - 1)
+                card_index = rng.randint(0, len(new_deck) - 1)
                 drawn_card = new_deck.pop(card_index)
                 new_hand.append(drawn_card)
                 drawn_cards.append(drawn_card)
@@ -136,12 +275,56 @@ class DrawEffect(CardEffect):
             cards_drawn=drawn_cards
         )
 
+    def can_activate_counts(self, hand: List[int], remaining_deck: List[int], context: EffectContext) -> bool:
+        """Check if we have enough cards in deck to draw"""
+        return sum(remaining_deck) >= self.count
+
+    def apply_counts(self, hand: List[int], remaining_deck: List[int], context: EffectContext) -> EffectResult:
+        """Draw cards from a deck count vector into a hand count vector."""
+        new_hand = hand.copy()
+        new_deck = remaining_deck.copy()
+        if not self.can_activate_counts(hand, remaining_deck, context):
+            return EffectResult(hand=new_hand, remaining_deck=new_deck, cards_drawn=[])
+
+        if context.deck_buffer is not None:
+            # Deal the next cards of the shuffled deck
+            drawn_cards = context.deck_buffer.deal(self.count, context.rng)
+            for card_id in drawn_cards:
+                new_hand[card_id] += 1
+                new_deck[card_id] -= 1
+        else:
+            drawn_cards = draw_counts(new_hand, new_deck, self.count, context.rng or random)
+        return EffectResult(
+            hand=new_hand,
+            remaining_deck=new_deck,
+            cards_drawn=drawn_cards
+        )
+
+    def can_activate_batch(self, hands, remaining_decks, context: EffectContext):
+        """Check if we have enough cards in deck to draw, for every row"""
+        return remaining_decks.sum(axis=1) >= self.count
+
+    def apply_batch(self, hands, remaining_decks, context: EffectContext) -> BatchEffectResult:
+        """Draw cards for a whole block of hands."""
+        new_hands = hands.copy()
+        new_decks = remaining_decks.copy()
+        drawn = draw_batch(new_hands, new_decks, self.count, context.rng)
+        return BatchEffectResult(
+            hands=new_hands,
+            remaining_decks=new_decks,
+            cards_drawn=drawn,
+            cards_discarded=np.zeros_like(hands),
+            fully_reverted=np.zeros(hands.shape[0], dtype=bool)
+        )
+
 
 class ConditionalDiscardEffect(CardEffect):
     """
     Effect that draws cards and then discards cards matching a filter.
     Example: Vision of the Radiant Typhoon (draw 2, discard 1 Quick-Play Spell if drawn)
     """
+
+    batch_kernel = True
     
     def __init__(self, draw_count: int, discard_filter: str, discard_count: int = 1):
         """
@@ -190,6 +373,11 @@ class ConditionalDiscardEffect(CardEffect):
         # SMART DISCARD LOGIC: we want to discard cards that do NOT ruin our success conditions
         # Helper to check if a hand state is successful
         def _is_success(h: List[str]) -> bool:
+            if context.evaluate_hand is not None:
+                return context.evaluate_hand(h)
+            if context.card_index is not None:
+                counts = context.card_index.named_counts_of(h)
+                return any(cond(counts) for cond in context.success_conditions)
             counts = Counter(h)
             for subcat, card_names in context.subcategory_map.items():
                 counts[subcat] = sum(counts[c] for c in card_names)
@@ -198,6 +386,8 @@ class ConditionalDiscardEffect(CardEffect):
         # For each candidate card, simulate the hand without it
         # Cards that leave the hand as a success are prioritized for discard (True -> False)
         # So we sort: True (leaves success) comes before False (ruins success or was already brick)
+        # Ties are broken by card name so the choice depends only on the hand's contents,
+        # not on the order the cards were drawn in
         candidate_scores = []
         for card in matching_cards:
             test_hand = new_hand.copy()
@@ -205,7 +395,7 @@ class ConditionalDiscardEffect(CardEffect):
             leaves_success = _is_success(test_hand)
             candidate_scores.append((not leaves_success, card))  # sort prioritizes False (so not leaves_success)
             
-        candidate_scores.sort(key=lambda x: x[0])
+        candidate_scores.sort()
         sorted_matching_cards = [card for _, card in candidate_scores]
         
         # Discard up to discard_count matching cards using the prioritized list
@@ -236,6 +426,112 @@ class ConditionalDiscardEffect(CardEffect):
             cards_discarded=discarded_cards
         )
 
+    def can_activate_counts(self, hand: List[int], remaining_deck: List[int], context: EffectContext) -> bool:
+        """Check if we have enough cards in deck to draw"""
+        return sum(remaining_deck) >= self.draw_count
+
+    def apply_counts(self, hand: List[int], remaining_deck: List[int], context: EffectContext) -> EffectResult:
+        """
+        Count-vector version of apply: draw, then smart-discard cards matching the filter.
+        Makes the same choices as apply (see there for the discard priority).
+        """
+        index = context.card_index
+        mark = context.deck_buffer.mark() if context.deck_buffer is not None else None
+        draw_result = DrawEffect(self.draw_count).apply_counts(hand, remaining_deck, context)
+        new_hand = draw_result.hand
+
+        is_success = context.evaluate_counts
+        if is_success is None:
+            def is_success(counts: List[int]) -> bool:
+                names = index.named_counts(counts)
+                return any(cond(names) for cond in context.success_conditions)
+
+        # Score each distinct matching card once: every copy of it leaves the same hand
+        candidate_scores = []
+        for card_id in dict.fromkeys(index.subcategories.get(self.discard_filter, ())):
+            if new_hand[card_id]:
+                new_hand[card_id] -= 1
+                leaves_success = is_success(new_hand)
+                new_hand[card_id] += 1
+                candidate_scores.append((not leaves_success, index.names[card_id], card_id))
+        candidate_scores.sort()
+
+        discarded_cards = []
+        for _, _, card_id in candidate_scores:
+            take = min(new_hand[card_id], self.discard_count - len(discarded_cards))
+            new_hand[card_id] -= take
+            discarded_cards.extend([card_id] * take)
+            if len(discarded_cards) >= self.discard_count:
+                break
+
+        if len(discarded_cards) < self.discard_count:
+            if mark is not None:
+                # The drawn cards go back into the deck
+                context.deck_buffer.rewind(mark)
+            return EffectResult(
+                hand=hand.copy(),
+                remaining_deck=remaining_deck.copy(),
+                cards_drawn=draw_result.cards_drawn.copy(),
+                cards_discarded=[],
+                fully_reverted=True
+            )
+
+        return EffectResult(
+            hand=new_hand,
+            remaining_deck=draw_result.remaining_deck,
+            cards_drawn=draw_result.cards_drawn,
+            cards_discarded=discarded_cards
+        )
+
+    def can_activate_batch(self, hands, remaining_decks, context: EffectContext):
+        """Check if we have enough cards in deck to draw, for every row"""
+        return remaining_decks.sum(axis=1) >= self.draw_count
+
+    def apply_batch(self, hands, remaining_decks, context: EffectContext) -> BatchEffectResult:
+        """
+        Draw, smart-discard and revert for a whole block of hands.
+        Makes the same choice as apply for every row: matching cards whose
+        removal leaves a success go first, ties broken by card name.
+        """
+        index = context.card_index
+        new_hands = hands.copy()
+        new_decks = remaining_decks.copy()
+        drawn = draw_batch(new_hands, new_decks, self.draw_count, context.rng)
+
+        # Score every distinct matching card against the post-draw hands
+        candidates = sorted(dict.fromkeys(index.subcategories.get(self.discard_filter, ())),
+                            key=lambda card_id: index.names[card_id])
+        leaves_success = {}
+        for card_id in candidates:
+            held = new_hands[:, card_id] > 0
+            test = new_hands.copy()
+            test[held, card_id] -= 1
+            leaves_success[card_id] = held & context.evaluate_batch(test)
+
+        # Discard: first the cards that leave a success, then the rest, by name
+        needed = np.full(hands.shape[0], self.discard_count, dtype=new_hands.dtype)
+        discarded = np.zeros_like(hands)
+        for first_pass in (True, False):
+            for card_id in candidates:
+                eligible = leaves_success[card_id] if first_pass else ~leaves_success[card_id]
+                take = np.where(eligible, np.minimum(new_hands[:, card_id], needed), 0)
+                new_hands[:, card_id] -= take
+                discarded[:, card_id] += take
+                needed -= take
+
+        # Rows that could not pay the discard roll back (but still report what they drew)
+        reverted = needed > 0
+        new_hands[reverted] = hands[reverted]
+        new_decks[reverted] = remaining_decks[reverted]
+        discarded[reverted] = 0
+        return BatchEffectResult(
+            hands=new_hands,
+            remaining_decks=new_decks,
+            cards_drawn=drawn,
+            cards_discarded=discarded,
+            fully_reverted=reverted
+        )
+
 
 def create_effect_from_definition(effect_def: Dict[str, Any]) -> CardEffect:
     """
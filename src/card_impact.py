@@ -0,0 +1,112 @@
+"""
+Per-card impact for the Yu-Gi-Oh Deck Simulator
+
+Which cards carry the deck? For every card, the run counts the hands that
+opened at least one copy of it and how many of those succeeded. Together with
+the run's totals this gives, for every card at once, the success rate when the
+card is opened, the rate when it is not, and their difference (the card's
+impact), each with a confidence interval. Counting costs one pass over the
+distinct cards of each hand; shards merge by adding counters.
+
+Impact is an association, not a causal effect: a card that is only played
+alongside a starter looks good because the starter does.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Iterable, Optional
+
+from card_index import FILLER_CARD
+from confidence import wilson_interval, difference_interval
+
+
+@dataclass
+class CardImpact:
+    """Conditional success rates of one card (all rates in %)."""
+    card: str
+    opened: int  # Hands opening at least one copy
+    opened_rate: float  # Share of hands opening it
+    success_if_opened: float
+    success_if_opened_low: float
+    success_if_opened_high: float
+    success_if_not_opened: float
+    success_if_not_opened_low: float
+    success_if_not_opened_high: float
+    impact: float  # success_if_opened - success_if_not_opened (percentage points)
+    impact_low: float
+    impact_high: float
+
+
+@dataclass
+class ImpactCounts:
+    """Per-card counters of a run: hands opening each card, and the successes among them."""
+    names: List[str]  # Card names by id
+    deck_counts: List[int]  # Copies in the deck (cards without copies get no row)
+    hands: int = 0
+    successes: int = 0
+    opened: List[int] = field(default_factory=list)
+    opened_successes: List[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        if not self.opened:
+            self.opened = [0] * len(self.names)
+            self.opened_successes = [0] * len(self.names)
+
+    def add_hand(self, card_ids: Iterable[int], success: bool):
+        """Count one opening hand, given as card ids."""
+        self.hands += 1
+        if success:
+            self.successes += 1
+            for card_id in set(card_ids):
+                self.opened[card_id] += 1
+                self.opened_successes[card_id] += 1
+        else:
+            for card_id in set(card_ids):
+                self.opened[card_id] += 1
+
+    def add(self, other: 'ImpactCounts'):
+        """Add another run's counters for the same cards."""
+        if other.names != self.names:
+            raise ValueError("Cannot merge card impact of different decks")
+        self.hands += other.hands
+        self.successes += other.successes
+        for card_id in range(len(self.names)):
+            self.opened[card_id] += other.opened[card_id]
+            self.opened_successes[card_id] += other.opened_successes[card_id]
+
+    def table(self, confidence: float = 0.95) -> List[CardImpact]:
+        """Impact of every card in the deck (except the filler cards), highest impact first."""
+        rows = []
+        for card_id, name in enumerate(self.names):
+            if not self.deck_counts[card_id] or name == FILLER_CARD:
+                continue
+            opened, wins = self.opened[card_id], self.opened_successes[card_id]
+            missed, missed_wins = self.hands - opened, self.successes - wins
+            opened_low, opened_high = wilson_interval(wins, opened, confidence)
+            missed_low, missed_high = wilson_interval(missed_wins, missed, confidence)
+            impact, impact_low, impact_high = difference_interval(wins, opened, missed_wins, missed, confidence)
+            rows.append(CardImpact(
+                card=name,
+                opened=opened,
+                opened_rate=opened / self.hands * 100.0 if self.hands else 0.0,
+                success_if_opened=wins / opened * 100.0 if opened else 0.0,
+                success_if_opened_low=opened_low * 100.0,
+                success_if_opened_high=opened_high * 100.0,
+                success_if_not_opened=missed_wins / missed * 100.0 if missed else 0.0,
+                success_if_not_opened_low=missed_low * 100.0,
+                success_if_not_opened_high=missed_high * 100.0,
+                impact=impact * 100.0,
+                impact_low=impact_low * 100.0,
+                impact_high=impact_high * 100.0,
+            ))
+        return sorted(rows, key=lambda row: -row.impact)
+
+
+def merge_impact(parts: List[Optional[ImpactCounts]]) -> Optional[ImpactCounts]:
+    """Sum of several runs' counters (None when no part has them)."""
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    merged = ImpactCounts(parts[0].names, parts[0].deck_counts)
+    for part in parts:
+        merged.add(part)
+    return merged
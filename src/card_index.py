@@ -0,0 +1,136 @@
+"""
+Card interning for the Yu-Gi-Oh Deck Simulator
+
+The simulation loop works on small integer card ids instead of name strings.
+A hand or a remaining deck is a fixed-length count vector (a list with one
+entry per card id), so drawing, discarding and checking rules are plain list
+index operations with no hashing or Counter rebuilding. Names only come back
+when results are reported (HandRecord).
+
+Subcategories are interned too, as tag ids. Each card id lists the tags it
+belongs to (a sparse card -> subcategory incidence structure), so all
+subcategory counts of a hand are built in one pass over its cards, or with a
+single matrix product for a block of hands (see incidence_matrix).
+"""
+
+from collections import Counter
+from typing import List, Dict, Iterable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional (only needed for incidence_matrix)
+    np = None
+
+
+# Name Deck gives to the cards that fill up the deck
+FILLER_CARD = "_Generic_"
+
+
+class CardIndex:
+    """
+    Interns card names and subcategories to integer ids for one Simulator.
+
+    Cards are numbered in order of first appearance in the deck, followed by
+    any card that is only mentioned by a subcategory or a card effect (those
+    always have a count of 0).
+    """
+
+    def __init__(self, deck_cards: Iterable[str], subcategory_map: Dict[str, List[str]] = None,
+                 extra_names: Iterable[str] = ()):
+        subcategory_map = subcategory_map or {}
+        names = dict.fromkeys(deck_cards)
+        for card_names in subcategory_map.values():
+            names.update(dict.fromkeys(card_names))
+        names.update(dict.fromkeys(extra_names))
+
+        self.names: List[str] = list(names)
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        # Subcategory -> member card ids (repeated members count twice, as in the name-based rules)
+        self.subcategories: Dict[str, List[int]] = {
+            subcat: [self.ids[card] for card in card_names]
+            for subcat, card_names in subcategory_map.items()
+        }
+        # Tag id -> subcategory name, and card id -> tag ids (the incidence structure)
+        self.tags: List[str] = list(subcategory_map)
+        self.card_tags: List[List[int]] = [[] for _ in self.names]
+        for tag_id, member_ids in enumerate(self.subcategories.values()):
+            for card_id in member_ids:
+                self.card_tags[card_id].append(tag_id)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def vector(self, cards: Iterable[str]) -> List[int]:
+        """Count vector of a list of card names."""
+        counts = [0] * len(self.names)
+        for card in cards:
+            counts[self.ids[card]] += 1
+        return counts
+
+    def expand(self, counts: List[int]) -> List[str]:
+        """List of card names for a count vector (grouped by card id)."""
+        return self.names_of(self.expand_ids(counts))
+
+    def expand_ids(self, counts: List[int]) -> List[int]:
+        """List of card ids for a count vector (grouped by card id)."""
+        card_ids = []
+        for card_id, count in enumerate(counts):
+            if count:
+                card_ids.extend([card_id] * count)
+        return card_ids
+
+    def tag_counts(self, counts: List[int]) -> List[int]:
+        """Subcategory counts (indexed by tag id) of a count vector, in one pass over its cards."""
+        tags = [0] * len(self.tags)
+        card_tags = self.card_tags
+        for card_id, count in enumerate(counts):
+            if count:
+                for tag_id in card_tags[card_id]:
+                    tags[tag_id] += count
+        return tags
+
+    def tag_counts_of(self, cards: Iterable[str]) -> List[int]:
+        """Subcategory counts of a list of card names (unknown names belong to no subcategory)."""
+        tags = [0] * len(self.tags)
+        ids = self.ids
+        for card in cards:
+            card_id = ids.get(card)
+            if card_id is not None:
+                for tag_id in self.card_tags[card_id]:
+                    tags[tag_id] += 1
+        return tags
+
+    def named_counts(self, counts: List[int]) -> Counter:
+        """
+        Counter of card and subcategory names for a count vector, the input Rule
+        callables expect. Subcategory counts override a card of the same name.
+        """
+        named = Counter({self.names[card_id]: count for card_id, count in enumerate(counts) if count})
+        for tag, count in zip(self.tags, self.tag_counts(counts)):
+            named[tag] = count
+        return named
+
+    def named_counts_of(self, cards: Iterable[str]) -> Counter:
+        """named_counts for a list of card names (names outside the index are kept as they are)."""
+        cards = list(cards)
+        named = Counter(cards)
+        for tag, count in zip(self.tags, self.tag_counts_of(cards)):
+            named[tag] = count
+        return named
+
+    def incidence_matrix(self) -> "np.ndarray":
+        """
+        0/1 card x subcategory matrix (entries above 1 for cards listed twice).
+        counts @ incidence_matrix() gives the subcategory counts of a block of hands.
+        """
+        if np is None:
+            raise ValueError("The incidence matrix requires NumPy to be installed")
+        matrix = np.zeros((len(self.names), len(self.tags)), dtype=np.int16)
+        for card_id, tag_ids in enumerate(self.card_tags):
+            for tag_id in tag_ids:
+                matrix[card_id, tag_id] += 1
+        return matrix
+
+    def names_of(self, card_ids: Iterable[int]) -> List[str]:
+        """Names for a sequence of card ids."""
+        return [self.names[card_id] for card_id in card_ids]
@@ -0,0 +1,153 @@
+"""
+Paired deck comparison for the Yu-Gi-Oh Deck Simulator
+
+Two decklists are simulated on the same shuffles (common random numbers, see
+sweep), so every hand is played with both decks and only the hands where the
+decks disagree carry information about their difference. The paired
+difference is checked after each batch of hands, and the comparison stops as
+soon as it is decided (one deck is better at the requested confidence) or
+bounded (the decks are within the tolerance of each other).
+
+Batches double in size, so a run of n hands is checked about log2(n) times.
+Every check uses a confidence level corrected for the number of checks that
+can happen (Bonferroni), so stopping early does not inflate the error rate.
+"""
+
+import math
+import random
+from dataclasses import dataclass
+from typing import List, Callable, Optional
+
+from deck_sim import Simulator, SimulationResult
+from sweep import EFFECT_DRAW_BLOCK, aligned_decks
+from shuffled_deck import CommonRandomDeck
+from parallel import derive_seed, merge_results
+from confidence import wilson_interval, paired_difference_interval
+
+
+# Hands in the first batch (later batches double the total)
+MIN_BATCH_SIZE = 10_000
+
+FIRST = 'first'
+SECOND = 'second'
+EQUIVALENT = 'equivalent'
+UNDECIDED = 'undecided'
+
+
+@dataclass
+class ComparisonResult:
+    """Outcome of a paired comparison. Differences are first minus second, in percentage points."""
+    first: SimulationResult
+    second: SimulationResult
+    difference: float
+    difference_low: float
+    difference_high: float
+    simulations: int  # Hands played with each deck
+    decision: str  # FIRST or SECOND (better), EQUIVALENT (within tolerance) or UNDECIDED
+    confidence: float
+    seed: Optional[int] = None
+
+
+def _finish(result: SimulationResult, confidence: float, seed: Optional[int]) -> SimulationResult:
+    low, high = wilson_interval(result.success_count, result.total_simulations, confidence)
+    result.ci_low, result.ci_high, result.confidence = low * 100.0, high * 100.0, confidence
+    result.seed = seed
+    return result
+
+
+def _decide(low: float, high: float, tolerance: float) -> Optional[str]:
+    if low > 0:
+        return FIRST
+    if high < 0:
+        return SECOND
+    if -tolerance <= low and high <= tolerance:
+        return EQUIVALENT
+    return None
+
+
+def compare_decks(first: Simulator, second: Simulator, hand_size: int, conditions: List[Callable],
+                  max_simulations: int, tolerance: float = 0.5, confidence: float = 0.95,
+                  seed: Optional[int] = None, engine: str = 'python',
+                  min_batch_size: int = MIN_BATCH_SIZE) -> ComparisonResult:
+    """
+    Compare the success rates of two decks on common random numbers.
+
+    Args:
+        first, second: The decks (with their own subcategories and card effects)
+        max_simulations: Most hands to play with each deck
+        tolerance: Differences within +/- this many percentage points count as equivalent
+        confidence: Overall confidence of the decision
+        seed: Seed of the shared random stream (a random one is chosen and reported when None)
+        engine: 'python' (sampled, sequential) or 'exact' (both rates in closed form)
+
+    Returns:
+        ComparisonResult with the difference, the decision and the hands needed
+    """
+    if engine not in ('python', 'exact'):
+        raise ValueError("Comparisons support the 'python' and 'exact' engines")
+    if tolerance < 0:
+        raise ValueError("Tolerance must not be negative")
+    if max_simulations <= 0:
+        raise ValueError("The comparison needs at least one simulation")
+
+    if engine == 'exact':
+        first_result = _finish(first.calculate(hand_size, conditions), confidence, None)
+        second_result = _finish(second.calculate(hand_size, conditions), confidence, None)
+        difference = first_result.success_rate - second_result.success_rate
+        decision = _decide(difference, difference, tolerance) or EQUIVALENT
+        return ComparisonResult(first_result, second_result, difference, difference, difference,
+                                first_result.total_simulations, decision, confidence)
+
+    if seed is None:
+        seed = random.getrandbits(63)
+
+    # Same layout for both decks, each with its own subcategories and effects
+    decks = aligned_decks([first.deck.deck_size, second.deck.deck_size],
+                          [first.deck.contents, second.deck.contents])
+    simulators = [
+        Simulator(deck, sim.subcategory_map, sim.card_effects, hand_cache_size=sim.hand_cache_size)
+        for deck, sim in zip(decks, (first, second))
+    ]
+    block_size = hand_size + EFFECT_DRAW_BLOCK
+    buffers = [CommonRandomDeck(sim.deck_ids, seed, block_size, derive_seed(seed, index))
+               for index, sim in enumerate(simulators)]
+
+    # Bonferroni over every check the doubling schedule can make
+    checks = 1 + max(0, math.ceil(math.log2(max_simulations / min_batch_size)))
+    check_confidence = 1 - (1 - confidence) / checks
+
+    results = ([], [])
+    first_only = second_only = done = 0
+    decision = UNDECIDED
+    batch = 0
+    while done < max_simulations:
+        size = min(max(min_batch_size, done), max_simulations - done)
+        outcomes = (bytearray(), bytearray())
+        for sim, buffer, side_results, side_outcomes in zip(simulators, buffers, results, outcomes):
+            side_results.append(sim._run_engine(size, hand_size, conditions, engine='python',
+                                                seed=derive_seed(seed, batch), deck_buffer=buffer,
+                                                outcomes=side_outcomes))
+        first_only += sum(map(int.__gt__, *outcomes))
+        second_only += sum(map(int.__lt__, *outcomes))
+        done += size
+        batch += 1
+
+        _, low, high = paired_difference_interval(first_only, second_only, done, check_confidence)
+        decided = _decide(low * 100.0, high * 100.0, tolerance)
+        if decided is not None:
+            decision = decided
+            break
+
+    difference, low, high = (value * 100.0 for value in
+                             paired_difference_interval(first_only, second_only, done, check_confidence))
+    return ComparisonResult(
+        first=_finish(merge_results(results[0]), confidence, seed),
+        second=_finish(merge_results(results[1]), confidence, seed),
+        difference=difference,
+        difference_low=low,
+        difference_high=high,
+        simulations=done,
+        decision=decision,
+        confidence=confidence,
+        seed=seed,
+    )
@@ -0,0 +1,84 @@
+"""
+Confidence intervals for simulated success rates
+
+Monte Carlo estimates are binomial proportions. The Wilson score interval is
+used throughout because it stays well-behaved for rates close to 0% or 100%,
+which is common for consistent decks and for rare brick conditions.
+"""
+
+from statistics import NormalDist
+from typing import Tuple
+
+
+def z_score(confidence: float) -> float:
+    """Two-sided standard normal quantile for a confidence level (e.g. 0.95 -> 1.96)."""
+    if not 0 < confidence < 1:
+        raise ValueError(f"Confidence must be between 0 and 1, got {confidence}")
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson_interval(successes: int, trials: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    Wilson score interval for a binomial proportion.
+
+    Returns:
+        (low, high) as fractions between 0 and 1; (0, 1) when there are no trials
+    """
+    if trials <= 0:
+        return 0.0, 1.0
+    z = z_score(confidence)
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    half_width = z * ((p * (1 - p) / trials + z * z / (4 * trials * trials)) ** 0.5) / denominator
+    low = 0.0 if successes == 0 else max(0.0, center - half_width)
+    high = 1.0 if successes == trials else min(1.0, center + half_width)
+    return low, high
+
+
+def required_trials(rate: float, half_width: float, confidence: float = 0.95) -> int:
+    """Number of trials for a normal-approximation interval of the given half-width around rate."""
+    z = z_score(confidence)
+    variance = max(rate * (1 - rate), 1e-6)
+    return int(z * z * variance / (half_width * half_width)) + 1
+
+
+def paired_difference_interval(first_only: int, second_only: int, trials: int,
+                               confidence: float = 0.95) -> Tuple[float, float, float]:
+    """
+    Normal-approximation interval for the difference of two success rates
+    measured on the same hands (paired outcomes).
+
+    Args:
+        first_only: Hands that succeeded for the first variant only
+        second_only: Hands that succeeded for the second variant only
+        trials: Hands simulated for both
+
+    Returns:
+        (difference, low, high) of first minus second, as fractions
+    """
+    if trials <= 0:
+        return 0.0, -1.0, 1.0
+    difference = (first_only - second_only) / trials
+    variance = max(0.0, (first_only + second_only) / trials - difference * difference)
+    half_width = z_score(confidence) * (variance / trials) ** 0.5
+    return difference, max(-1.0, difference - half_width), min(1.0, difference + half_width)
+
+
+def difference_interval(first_successes: int, first_trials: int, second_successes: int, second_trials: int,
+                        confidence: float = 0.95) -> Tuple[float, float, float]:
+    """
+    Newcombe's interval for the difference of two independent success rates,
+    built from their Wilson intervals (so it stays valid near 0% and 100%).
+
+    Returns:
+        (difference, low, high) of first minus second, as fractions
+    """
+    first = first_successes / first_trials if first_trials > 0 else 0.0
+    second = second_successes / second_trials if second_trials > 0 else 0.0
+    first_low, first_high = wilson_interval(first_successes, first_trials, confidence)
+    second_low, second_high = wilson_interval(second_successes, second_trials, confidence)
+    difference = first - second
+    low = difference - ((first - first_low) ** 2 + (second_high - second) ** 2) ** 0.5
+    high = difference + ((first_high - first) ** 2 + (second - second_low) ** 2) ** 0.5
+    return difference, max(-1.0, low), min(1.0, high)
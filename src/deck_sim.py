@@ -1,18 +1,15 @@
-
 import random
-from typing import List, Dict, Callable, Any, Optional
+from typing import List, Dict, Callable, Any, Optional, Union
 from dataclasses import dataclass, field
 from collections import Counter
-from card_effects import CardEffect, EffectContext, create_effect_from_definition
-
-@dataclass
-class HandRecord:
-    """Record of a single simulated hand draw."""
-    initial_hand: List[str]    # Cards as originally drawn
-    final_hand: List[str]      # Cards after effect resolution
-    cards_drawn: List[str]     # Cards added by effects
-    cards_discarded: List[str] # Cards removed by effects
-    success: bool             # Whether the hand met any success condition
+from card_effects import CardEffect, DrawEffect, EffectContext, create_effect_from_definition
+from card_index import CardIndex, FILLER_CARD
+from shuffled_deck import ShuffledDeck
+from objectives import ObjectiveCounts
+from brick_summary import BrickSummary
+from histograms import HandHistograms
+from card_impact import ImpactCounts
+from hand_records import HandRecord, HandRecordStore, RecordFilter, Reservoir, record_filter, reservoir_store, sample_rng
 
 @dataclass
 class SimulationResult:
@@ -23,7 +20,18 @@ class SimulationResult:
     brick_rate: float
     max_depth_reached_count: int = 0  # How many simulations hit max effect depth
     warnings: List[str] = field(default_factory=list)  # User-facing warnings
-    hand_records: List[HandRecord] = field(default_factory=list)  # Optional per-hand records
+    hand_records: HandRecordStore = field(default_factory=HandRecordStore)  # Optional per-hand records (columnar)
+    exact: bool = False  # True when computed in closed form (counts are over all distinct hands)
+    seed: Optional[int] = None  # Seed that reproduces this run (seeded/sharded runs only)
+    ci_low: Optional[float] = None  # Lower bound of the success rate confidence interval (%)
+    ci_high: Optional[float] = None  # Upper bound of the success rate confidence interval (%)
+    confidence: Optional[float] = None  # Confidence level of the interval (e.g. 0.95)
+    cache_hit_rate: Optional[float] = None  # Share of hands answered by the hand cache (%, None when unused)
+    objectives: Optional[ObjectiveCounts] = None  # Hands meeting each objective and combination (see objectives)
+    brick_summary: Optional[BrickSummary] = None  # Most common bricked hands and card pairs (see brick_summary)
+    histograms: Optional[HandHistograms] = None  # Card and subcategory count histograms (see histograms)
+    card_impact: Optional[ImpactCounts] = None  # Success counts by opened card (see card_impact)
+    variance_reduction: Optional[float] = None  # Plain sampling's variance over this run's (variance-reduced sampling only)
 
 class Deck:
     def __init__(self, deck_size: int, contents: Dict[str, int]):
@@ -47,7 +55,7 @@ class Deck:
                 # For this sim, typically we care about named categories. 
                 # Anything not named is just "Other".
                 remaining = deck_size - len(self.cards)
-                self.cards.extend(["_Generic_"] * remaining)
+                self.cards.extend([FILLER_CARD] * remaining)
                 self.deck_size = deck_size
         else:
             self.deck_size = deck_size
@@ -58,9 +66,9 @@ class Deck:
             deck.extend([name] * count)
         return deck
 
-    def draw_hand(self, hand_size: int) -> List[str]:
+    def draw_hand(self, hand_size: int, rng: Optional[random.Random] = None) -> List[str]:
         """Draws a random hand of size n without replacement."""
-        return random.sample(self.cards, hand_size)
+        return (rng or random).sample(self.cards, hand_size)
 
 class Rule:
     """
@@ -118,13 +126,35 @@ class CompositeRule:
     def __or__(self, other):
         return CompositeRule(self, other, operator='OR')
 
+def _count_vector(card_ids: List[int], num_cards: int) -> List[int]:
+    """Count vector of a hand given as card ids."""
+    counts = [0] * num_cards
+    for card_id in card_ids:
+        counts[card_id] += 1
+    return counts
+
+def _ordered_ids(counts: List[int], order: List[int]) -> List[int]:
+    """Expand a count vector into card ids, following `order` (drawn hand, then effect draws)."""
+    left = list(counts)
+    ids = []
+    for card_id in order:
+        if left[card_id]:
+            left[card_id] -= 1
+            ids.append(card_id)
+    return ids
+
+# Simulation engines accepted by Simulator.run
+ENGINES = ('python', 'batch', 'auto', 'exact')
+# Sampling schemes accepted by Simulator.run (see variance_reduction)
+SAMPLING_MODES = ('random', 'stratified', 'antithetic', 'importance')
+
 def req(card_name: str) -> Rule:
     """Short helper to create a Rule."""
     return Rule(card_name)
 
 class Simulator:
     def __init__(self, deck: Deck, subcategory_map: Dict[str, List[str]] = None, 
-                 card_effects: Dict[str, CardEffect] = None):
+                 card_effects: Dict[str, CardEffect] = None, hand_cache_size: Optional[int] = None):
         """
         Initialize the simulator.
         
@@ -134,15 +164,36 @@ class Simulator:
                             e.g., {"Lunalight Monster": ["Lunalight Gold Leo", "Lunalight Tiger"]}
             card_effects: Maps card names to their effects
                          e.g., {"Pot of Greed": DrawEffect(count=2, once_per_turn=False)}
+            hand_cache_size: Distinct hands whose outcome is remembered (see hand_cache).
+                             None caches only when the conditions cannot be compiled
+                             (compiled rules are cheaper than a lookup); 0 disables it.
         """
         self.deck = deck
         self.subcategory_map = subcategory_map or {}
         self.card_effects = card_effects or {}
         # Pre-calculate deck counts for performance
         self.deck_counts = Counter(self.deck.cards)
+        # Integer card ids used by the simulation loop (hands are count vectors)
+        self.card_index = CardIndex(self.deck.cards, self.subcategory_map, self.card_effects)
+        self.deck_ids = [self.card_index.ids[card] for card in self.deck.cards]
+        self.deck_vector = self.card_index.vector(self.deck.cards)
+        # Compiled success checks, keyed by id(conditions) (see _hand_evaluator)
+        self._evaluators: Dict[tuple, tuple] = {}
+        self.hand_cache_size = hand_cache_size
+        self._hand_cache: Optional[tuple] = None  # (conditions, HandCache)
+
+    def __getstate__(self):
+        # Generated evaluators cannot be pickled (process pools); they are rebuilt on demand.
+        # The hand cache is per process too.
+        state = self.__dict__.copy()
+        state['_evaluators'] = {}
+        state['_hand_cache'] = None
+        return state
 
     def resolve_effects(self, hand: List[str], remaining_deck: List[str], 
-                        conditions: List[Callable[[Counter], bool]], max_depth: int = 10) -> tuple[List[str], bool, List[str], List[str]]:
+                        conditions: List[Callable[[Counter], bool]], max_depth: int = 10,
+                        rng: Optional[random.Random] = None,
+                        evaluate_hand: Optional[Callable[[List[str]], bool]] = None) -> tuple[List[str], bool, List[str], List[str]]:
         """
         Resolve all card effects in the starting hand (single pass only).
         Cards drawn by effects do NOT activate their effects.
@@ -159,12 +210,13 @@ class Simulator:
         # Track which cards have already activated (OPT)
         activated_cards = set()
         
-        # Find all cards with effects in the STARTING hand only
-        cards_with_effects = [card for card in hand if card in self.card_effects]
+        # Find all cards with effects in the STARTING hand only, in the order the
+        # effects were registered so resolution is deterministic for a given hand
+        cards_with_effects = [card for card in self.card_effects if card in hand]
         
         # PHASE 1: Apply all draw effects first (simultaneous resolution)
         # This ensures all cards are drawn before any conditional effects check the hand
-        for card_name in set(cards_with_effects):
+        for card_name in cards_with_effects:
             # Skip if already activated (OPT) or if card was discarded by a previous effect
             if card_name in activated_cards or card_name not in current_hand:
                 continue
@@ -172,7 +224,6 @@ class Simulator:
             effect = self.card_effects[card_name]
             
             # Only process DrawEffect in this phase
-            from card_effects import DrawEffect
             if not isinstance(effect, DrawEffect):
                 continue
             
@@ -189,7 +240,10 @@ class Simulator:
                 subcategory_map=self.subcategory_map,
                 success_conditions=conditions,
                 max_depth=max_depth,
-                current_depth=0
+                current_depth=0,
+                rng=rng,
+                evaluate_hand=evaluate_hand,
+                card_index=self.card_index
             )
             
             # Apply the draw effect
@@ -201,7 +255,7 @@ class Simulator:
         
         # PHASE 2: Apply all conditional/discard effects on the final hand
         # This ensures discards check the hand AFTER all draws are complete
-        for card_name in set(cards_with_effects):
+        for card_name in cards_with_effects:
             # Skip if already activated (OPT) or if card was discarded by a previous effect
             if card_name in activated_cards or card_name not in current_hand:
                 continue
@@ -209,7 +263,6 @@ class Simulator:
             effect = self.card_effects[card_name]
             
             # Only process non-DrawEffect in this phase
-            from card_effects import DrawEffect
             if isinstance(effect, DrawEffect):
                 continue
             
@@ -226,7 +279,10 @@ class Simulator:
                 subcategory_map=self.subcategory_map,
                 success_conditions=conditions,
                 max_depth=max_depth,
-                current_depth=0
+                current_depth=0,
+                rng=rng,
+                evaluate_hand=evaluate_hand,
+                card_index=self.card_index
             )
             
             # Apply the conditional effect
@@ -250,11 +306,121 @@ class Simulator:
         # Never exceed depth with single-pass resolution
         return current_hand, False, all_drawn, all_discarded
 
+    def _resolve_counts(self, hand: List[int], remaining_deck: List[int],
+                        context: EffectContext) -> tuple[List[int], bool, List[int], List[int]]:
+        """
+        Count-vector version of resolve_effects used by the simulation loop.
+
+        Args:
+            hand: Count vector of the starting hand (see card_index)
+            remaining_deck: Count vector of the cards left in the deck
+            context: Effect context with card_index and evaluate_counts set
+
+        Returns:
+            Tuple of (final_hand, depth_exceeded, drawn_ids, discarded_ids)
+        """
+        current_hand = hand.copy()
+        current_deck = remaining_deck.copy()
+        all_drawn = []
+        all_discarded = []
+
+        # Cards with effects in the STARTING hand, in registration order. Each one is
+        # visited once (draw effects in phase 1, the others in phase 2), so OPT holds.
+        ids = self.card_index.ids
+        starting = [(ids[name], effect) for name, effect in self.card_effects.items() if hand[ids[name]]]
+
+        for draw_phase in (True, False):
+            for card_id, effect in starting:
+                if isinstance(effect, DrawEffect) != draw_phase or not current_hand[card_id]:
+                    continue
+                if not effect.can_activate_counts(current_hand, current_deck, context):
+                    continue
+
+                # Consume activating card from hand (spent to activate — not a discard result)
+                current_hand[card_id] -= 1
+                result = effect.apply_counts(current_hand, current_deck, context)
+
+                current_hand = result.hand
+                current_deck = result.remaining_deck
+                all_drawn.extend(result.cards_drawn)
+                if result.fully_reverted:
+                    # Rolled back: restore the activating card so the hand is fully unchanged
+                    current_hand = current_hand.copy()
+                    current_hand[card_id] += 1
+                else:
+                    all_discarded.extend(result.cards_discarded)
+
+        return current_hand, False, all_drawn, all_discarded
+
     def _evaluate_hand(self, hand: List[str], conditions: List[Callable[[Counter], bool]]) -> bool:
         """Helper to evaluate if a specific hand state meets success conditions."""
-        hand_counts = Counter(hand)
-        for subcat, card_names in self.subcategory_map.items():
-            hand_counts[subcat] = sum(hand_counts[card] for card in card_names)
+        return self._hand_evaluator(conditions)(hand)
+
+    def _hand_evaluator(self, conditions: List[Callable[[Counter], bool]],
+                        counts: bool = False) -> Callable:
+        """
+        Get a compiled success check for `conditions` (see rule_compiler).
+
+        Args:
+            counts: Build the check for count vectors of hands drawn from this deck
+                    (see card_index) instead of lists of card names. Rules needing more
+                    copies than the deck holds are then folded away.
+        """
+        key = (id(conditions), counts)
+        cached = self._evaluators.get(key)
+        if cached is not None and cached[0] is conditions:
+            return cached[1]
+
+        from rule_compiler import compile_rules
+        try:
+            if counts:
+                program = compile_rules(conditions, self.subcategory_map, self.deck_counts,
+                                        card_ids=self.card_index.ids)
+            else:
+                program = compile_rules(conditions, self.subcategory_map)
+        except ValueError:
+            # Custom callables: evaluate the conditions one by one
+            if counts:
+                def evaluate(hand: List[int]) -> bool:
+                    hand_counts = self.card_index.named_counts(hand)
+                    return any(condition(hand_counts) for condition in conditions)
+            else:
+                def evaluate(hand: List[str]) -> bool:
+                    return self._evaluate_uncompiled(hand, conditions)
+        else:
+            if counts:
+                def evaluate(hand: List[int]) -> bool:
+                    return program.evaluate(hand)
+            else:
+                def evaluate(hand: List[str]) -> bool:
+                    return program.evaluate(Counter(hand))
+
+        if len(self._evaluators) >= 16:
+            self._evaluators.clear()
+        self._evaluators[key] = (conditions, evaluate)
+        return evaluate
+
+    def _hand_cache_for(self, conditions: List[Callable[[Counter], bool]], hand_size: int):
+        """Get the hand outcome cache for these conditions, or None when caching is off."""
+        from hand_cache import HandCache, DEFAULT_HAND_CACHE_SIZE
+        size = self.hand_cache_size
+        if size is None:
+            from rule_compiler import is_compilable
+            size = 0 if all(is_compilable(c) for c in conditions) else DEFAULT_HAND_CACHE_SIZE
+        if size <= 0:
+            return None
+
+        if self._hand_cache is not None:
+            cached_conditions, cache = self._hand_cache
+            if cached_conditions is conditions and cache.hand_size == hand_size and cache.max_size == size:
+                return cache
+        cache = HandCache(len(self.card_index), hand_size, size)
+        self._hand_cache = (conditions, cache)
+        return cache
+
+    def _evaluate_uncompiled(self, hand: List[str], conditions: List[Callable[[Counter], bool]]) -> bool:
+        """Evaluate conditions by calling them on a Counter that includes subcategory counts."""
+        hand_counts = self.card_index.named_counts_of(hand)
             
         for condition in conditions:
             if condition(hand_counts):
@@ -262,7 +428,8 @@ class Simulator:
         return False
 
     def check_success(self, hand: List[str], conditions: List[Callable[[Counter], bool]], 
-                     remaining_deck: Optional[List[str]] = None) -> tuple[bool, bool, List[str], List[str], List[str]]:
+                     remaining_deck: Optional[List[str]] = None,
+                     rng: Optional[random.Random] = None) -> tuple[bool, bool, List[str], List[str], List[str]]:
         """
         Checks if a hand meets ANY of the success conditions either BEFORE or AFTER effects.
         
@@ -271,11 +438,18 @@ class Simulator:
             conditions: A list of functions. Each function takes a Counter of the hand 
                         and returns True if that specific condition is met.
             remaining_deck: Cards still in deck (for effect resolution). If None, no effects are resolved.
+            rng: Random source for effect draws (defaults to the global random module)
         
         Returns:
             Tuple of (success, depth_exceeded, final_hand, cards_drawn, cards_discarded)
         """
-        initial_success = self._evaluate_hand(hand, conditions)
+        return self._check_hand(hand, conditions, remaining_deck, rng, self._hand_evaluator(conditions))
+
+    def _check_hand(self, hand: List[str], conditions: List[Callable[[Counter], bool]],
+                    remaining_deck: Optional[List[str]], rng: Optional[random.Random],
+                    evaluate: Callable[[List[str]], bool]) -> tuple[bool, bool, List[str], List[str], List[str]]:
+        """check_success with an explicit success check (see _hand_evaluator)."""
+        initial_success = evaluate(hand)
         
         depth_exceeded = False
         final_hand = list(hand)
@@ -285,53 +459,316 @@ class Simulator:
         # Only resolve effects when the hand is NOT already a success.
         # If the condition is already met, there is no need to fire any effect.
         if not initial_success and remaining_deck is not None and self.card_effects:
-            final_hand, depth_exceeded, cards_drawn, cards_discarded = self.resolve_effects(hand, remaining_deck, conditions)
+            final_hand, depth_exceeded, cards_drawn, cards_discarded = self.resolve_effects(
+                hand, remaining_deck, conditions, rng=rng, evaluate_hand=evaluate)
         
         final_success = False
         if final_hand != hand:
-            final_success = self._evaluate_hand(final_hand, conditions)
+            final_success = evaluate(final_hand)
         
         return (initial_success or final_success), depth_exceeded, final_hand, cards_drawn, cards_discarded
 
+    def calculate(self, hand_size: int, conditions: List[Callable[[Counter], bool]]) -> SimulationResult:
+        """
+        Compute the exact success probability instead of sampling it.
+        No sampling error; counts in the result are over all C(deck_size, hand_size) hands.
+
+        Raises:
+            ValueError: If the configuration has non-Rule conditions or unsupported effects
+        """
+        from exact_engine import exact_result
+        return exact_result(self.deck, self.subcategory_map, conditions, hand_size, self.card_effects)
+
+    def sweep(self, simulations: int, hand_size: int, conditions: List[Callable[[Counter], bool]],
+              axes: list, seed: Optional[int] = None, engine: str = 'python',
+              workers: Optional[int] = 1, confidence: float = 0.95):
+        """
+        Evaluate a grid of variants of this configuration (card counts, hand size,
+        effect parameters) on common random numbers. See sweep.run_sweep.
+
+        Returns:
+            sweep.SweepResult
+        """
+        from sweep import run_sweep
+        return run_sweep(self, simulations, hand_size, conditions, axes, seed=seed, engine=engine,
+                         workers=workers, confidence=confidence)
+
+    def optimize(self, simulations: int, hand_size: int, conditions: List[Callable[[Counter], bool]],
+                 card_limits: list, min_deck_size: Optional[int] = None, max_deck_size: Optional[int] = None,
+                 seed: Optional[int] = None, workers: Optional[int] = 1, **options):
+        """
+        Search the card counts of this deck with the highest success rate. See optimizer.optimize_deck.
+
+        Returns:
+            optimizer.OptimizationResult
+        """
+        from optimizer import optimize_deck
+        return optimize_deck(self, simulations, hand_size, conditions, card_limits,
+                             min_deck_size=min_deck_size, max_deck_size=max_deck_size,
+                             seed=seed, workers=workers, **options)
+
+    def compare(self, other: 'Simulator', simulations: int, hand_size: int,
+                conditions: List[Callable[[Counter], bool]], tolerance: float = 0.5,
+                confidence: float = 0.95, seed: Optional[int] = None, engine: str = 'python'):
+        """
+        Compare this deck with another on the same shuffles, stopping as soon as the
+        difference is decided or within the tolerance. See compare.compare_decks.
+
+        Returns:
+            compare.ComparisonResult (differences are this deck minus the other)
+        """
+        from compare import compare_decks
+        return compare_decks(self, other, hand_size, conditions, simulations, tolerance=tolerance,
+                             confidence=confidence, seed=seed, engine=engine)
+
+    def supports_batch(self, conditions: List[Callable[[Counter], bool]]) -> bool:
+        """Check whether the vectorized NumPy engine can run this configuration."""
+        from batch_engine import is_available, is_vectorizable
+        return (is_available()
+                and all(effect.batch_kernel for effect in self.card_effects.values())
+                and all(is_vectorizable(c) for c in conditions))
+
     def run(self, simulations: int, hand_size: int, conditions: List[Callable[[Counter], bool]],
-            record_hands: bool = False, max_hand_records: int = 10_000) -> SimulationResult:
+            record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000,
+            engine: str = 'python', seed: Optional[int] = None, workers: Optional[int] = 1,
+            target_precision: Optional[float] = None, confidence: float = 0.95,
+            time_budget: Optional[float] = None, sampling: str = 'random',
+            objectives: Optional[Dict[str, List[Callable]]] = None,
+            brick_summary: bool = False, histograms: bool = False,
+            card_impact: bool = False) -> SimulationResult:
+        """
+        Run the Monte Carlo simulation.
+
+        Args:
+            record_hands: True records hands, a RecordFilter records only the matching ones
+                          (e.g. bricks); the records are a uniform sample of max_hand_records
+                          of the matching hands over the whole run (see hand_records)
+            engine: 'python' (per-hand loop), 'batch' (vectorized NumPy engine; effects need
+                    batch kernels), 'auto' (batch when supported, python otherwise) or
+                    'exact' (closed-form probability, see calculate())
+            seed: Makes the run reproducible. Seeded runs are split into fixed-size shards,
+                  each with its own seed-derived random stream (see parallel.run_sharded)
+            workers: Number of processes to spread the shards over (None uses every core).
+                     The result for a given seed does not depend on this value.
+            target_precision: Stop early once the confidence interval half-width is at most
+                              this many percentage points; simulations becomes an upper bound
+            confidence: Confidence level of the reported interval
+            time_budget: Stop early once this many seconds have been spent
+            sampling: 'random', 'stratified' (hands allocated over the opening-hand
+                      compositions of the rule-relevant cards), 'antithetic' (mirrored
+                      pairs of shuffles) or 'importance' (hands tilted towards succeeding
+                      compositions and reweighted, for rare conditions); see
+                      variance_reduction. These modes run the Python engine in this process
+                      and need at least 4 simulations; antithetic pairs round an odd count
+                      up by one (total_simulations reports the hands actually run).
+            objectives: Named lists of conditions (OR logic) checked on every hand of the run
+                        as well; result.objectives counts the hands meeting each of them and
+                        each combination (see objectives.branch_objectives for per-branch ones)
+            brick_summary: Summarize the bricked opening hands in result.brick_summary
+                           (most common hands and subcategory profiles, card pair counts)
+            histograms: Count every card and subcategory in the opening and final hands,
+                        the final hand size and the cards effects drew and discarded, in
+                        result.histograms
+            card_impact: Count the hands opening each card and their successes in
+                         result.card_impact (see ImpactCounts.table for the rates)
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if sampling not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode: {sampling}")
+
+        if (objectives or brick_summary or histograms or card_impact) and (engine == 'exact' or sampling != 'random'):
+            raise ValueError("Objectives, brick summaries, histograms and card impact need plain random sampling "
+                             "with a sampled engine")
+
+        if engine == 'exact':
+            return self.calculate(hand_size, conditions)
+
+        if sampling != 'random':
+            if engine == 'batch':
+                raise ValueError(f"{sampling.capitalize()} sampling requires the Python engine")
+            if target_precision is not None or time_budget is not None:
+                raise ValueError(f"{sampling.capitalize()} sampling cannot stop early "
+                                 f"(target_precision or time_budget)")
+            from variance_reduction import run_stratified, run_antithetic, run_importance
+            run_sampled = {'stratified': run_stratified, 'antithetic': run_antithetic,
+                           'importance': run_importance}[sampling]
+            return run_sampled(self, simulations, hand_size, conditions, record_hands=record_hands,
+                               max_hand_records=max_hand_records, seed=seed, confidence=confidence)
+
+        if target_precision is not None or time_budget is not None:
+            from adaptive import run_adaptive
+            result = run_adaptive(self, simulations, hand_size, conditions,
+                                  record_hands=record_hands, max_hand_records=max_hand_records,
+                                  engine=engine, seed=seed, workers=workers,
+                                  target_precision=target_precision, confidence=confidence,
+                                  time_budget=time_budget, objectives=objectives, brick_summary=brick_summary,
+                                  histograms=histograms, card_impact=card_impact)
+        else:
+            result = self._run_fixed(simulations, hand_size, conditions, record_hands, max_hand_records,
+                                     engine, seed, workers, objectives, brick_summary, histograms, card_impact)
+
+        from confidence import wilson_interval
+        low, high = wilson_interval(result.success_count, result.total_simulations, confidence)
+        result.ci_low, result.ci_high, result.confidence = low * 100.0, high * 100.0, confidence
+        return result
+
+    def _run_fixed(self, simulations: int, hand_size: int, conditions: List[Callable[[Counter], bool]],
+                   record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000,
+                   engine: str = 'python', seed: Optional[int] = None,
+                   workers: Optional[int] = 1,
+                   objectives: Optional[Dict[str, List[Callable]]] = None,
+                   brick_summary: bool = False, histograms: bool = False,
+                   card_impact: bool = False) -> SimulationResult:
+        """Run exactly `simulations` hands, sharded when seeded or spread over workers."""
+        if seed is not None or workers != 1:
+            from parallel import run_sharded
+            return run_sharded(self, simulations, hand_size, conditions,
+                               record_hands=record_hands, max_hand_records=max_hand_records,
+                               engine=engine, seed=seed, workers=workers, objectives=objectives,
+                               brick_summary=brick_summary, histograms=histograms, card_impact=card_impact)
+
+        return self._run_engine(simulations, hand_size, conditions, record_hands, max_hand_records, engine,
+                                objectives=objectives, brick_summary=brick_summary, histograms=histograms,
+                                card_impact=card_impact)
+
+    def _run_engine(self, simulations: int, hand_size: int, conditions: List[Callable[[Counter], bool]],
+                    record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000,
+                    engine: str = 'python', seed: Optional[int] = None,
+                    deck_buffer: Optional[ShuffledDeck] = None,
+                    outcomes: Optional[bytearray] = None,
+                    objectives: Optional[Dict[str, List[Callable]]] = None,
+                    brick_summary: bool = False, histograms: bool = False,
+                    card_impact: bool = False) -> SimulationResult:
+        """
+        Run a single stream of simulations in this process. A seed makes it reproducible.
+
+        The Python engine also accepts the deck buffer to deal from (e.g. a
+        CommonRandomDeck) and a bytearray that receives every hand's outcome.
+        """
+        if engine != 'python':
+            batch_supported = self.supports_batch(
+                conditions + [c for extra in (objectives or {}).values() for c in extra])
+            if engine == 'batch' and not batch_supported:
+                raise ValueError("The batch engine requires NumPy, Rule-based conditions and "
+                                 "card effects with batch kernels")
+            if batch_supported:
+                from batch_engine import BatchEngine
+                return BatchEngine(self.deck, self.subcategory_map, card_effects=self.card_effects).run(
+                    simulations, hand_size, conditions,
+                    record_hands=record_hands, max_hand_records=max_hand_records, seed=seed,
+                    objectives=objectives, brick_summary=brick_summary, histograms=histograms,
+                    card_impact=card_impact)
+
+        if hand_size > len(self.deck_ids) or hand_size < 0:
+            raise ValueError("Sample larger than population or is negative")
+        rng = random.Random(seed) if seed is not None else None
+        # One reusable buffer: the hand is its first hand_size cards, effect draws deal the next ones
+        if deck_buffer is None:
+            deck_buffer = ShuffledDeck(self.deck_ids)
+        evaluate = self._hand_evaluator(conditions, counts=True)
+        index = self.card_index
+        deck_vector = self.deck_vector
+        num_cards = len(index)
+
+        context = None
+        if self.card_effects:
+            context = EffectContext(
+                subcategory_map=self.subcategory_map,
+                success_conditions=conditions,
+                rng=rng,
+                card_index=index,
+                evaluate_counts=evaluate,
+                deck_buffer=deck_buffer
+            )
+
+        cache = self._hand_cache_for(conditions, hand_size)
+        cache_hits = 0
+
+        # One bit per objective, checked on the hand each simulation ends with
+        objective_checks = None
+        if objectives:
+            objective_checks = [(1 << i, self._hand_evaluator(extra, counts=True))
+                                for i, extra in enumerate(objectives.values())]
+            masks: Dict[int, int] = {}
+        summary = BrickSummary.for_index(index) if brick_summary else None
+        tallies = HandHistograms.for_deck(index, deck_vector) if histograms else None
+        impact = ImpactCounts(index.names, deck_vector) if card_impact else None
+
         successes = 0
         max_depth_count = 0
-        hand_records: List[HandRecord] = []
+        # Uniform sample of the hands that match the record filter (see hand_records)
+        recording = record_filter(record_hands)
+        reservoir = None
+        if recording is not None and max_hand_records > 0:
+            reservoir = Reservoir(max_hand_records, sample_rng(seed))
+            matches = recording.matcher(index)
         
-        for _ in range(simulations):
-            hand = self.deck.draw_hand(hand_size)
-            
-            # Only calculate remaining deck if we actually have effects to resolve
-            remaining_deck = None
-            if self.card_effects:
-                # Calculate remaining deck correctly by subtracting hand counts
-                hand_counts = Counter(hand)
-                remaining_deck = []
-                for card, count in self.deck_counts.items():
-                    rem = count - hand_counts.get(card, 0)
-                    if rem > 0:
-                        remaining_deck.extend([card] * rem)
-            
-            # Check success with effect resolution
-            success, depth_exceeded, final_hand, drawn, discarded = self.check_success(hand, conditions, remaining_deck)
+        for hand_number in range(simulations):
+            deck_buffer.reset()
+            drawn_ids = deck_buffer.deal(hand_size, rng)
+            hand = None
+
+            if cache is not None:
+                key = cache.key(drawn_ids)
+                success = cache.get(key)
+                if success is None:
+                    hand = _count_vector(drawn_ids, num_cards)
+                    success = evaluate(hand)
+                    cache.put(key, success)
+                else:
+                    cache_hits += 1
+            else:
+                hand = _count_vector(drawn_ids, num_cards)
+                success = evaluate(hand)
+
+            final_hand, depth_exceeded, drawn, discarded = None, False, [], []
+
+            # Only resolve effects when the hand is NOT already a success
+            if not success and context is not None:
+                if hand is None:
+                    hand = _count_vector(drawn_ids, num_cards)
+                remaining_deck = [total - held for total, held in zip(deck_vector, hand)]
+                final_hand, depth_exceeded, drawn, discarded = self._resolve_counts(hand, remaining_deck, context)
+                if final_hand != hand:
+                    success = evaluate(final_hand)
             
             if success:
                 successes += 1
+            if outcomes is not None:
+                outcomes.append(success)
             
             if depth_exceeded:
                 max_depth_count += 1
+            if summary is not None and not success:
+                summary.add(drawn_ids)
+            if impact is not None:
+                impact.add_hand(drawn_ids, success)
+            if tallies is not None:
+                if hand is None:
+                    hand = _count_vector(drawn_ids, num_cards)
+                tallies.add(drawn_ids, hand, final_hand, drawn, discarded, success)
 
-            # Record hand if opt-in and still under cap
-            if record_hands and len(hand_records) < max_hand_records:
-                hand_records.append(HandRecord(
-                    initial_hand=list(hand),
-                    final_hand=list(final_hand),
-                    cards_drawn=list(drawn),
-                    cards_discarded=list(discarded),
-                    success=success,
-                ))
+            if objective_checks is not None:
+                if hand is None:
+                    hand = _count_vector(drawn_ids, num_cards)
+                state = hand if final_hand is None else final_hand
+                mask = 0
+                for bit, check in objective_checks:
+                    if check(state):
+                        mask |= bit
+                masks[mask] = masks.get(mask, 0) + 1
+
+            # Record hand if opt-in and sampled (kept as card ids, see hand_records)
+            if reservoir is not None and (matches is None or matches(drawn_ids, success, bool(drawn or discarded))):
+                slot = reservoir.offer()
+                if slot >= 0:
+                    final_ids = drawn_ids if final_hand is None else _ordered_ids(final_hand, drawn_ids + drawn)
+                    reservoir.slots[slot] = (hand_number, drawn_ids, final_ids, drawn, discarded, success)
         
+        if tallies is not None:
+            tallies.fill_zero_bins()
+
         # Build warnings
         warnings = []
         if max_depth_count > 0:
@@ -346,5 +783,10 @@ class Simulator:
             brick_rate=((simulations - successes) / simulations) * 100.0,
             max_depth_reached_count=max_depth_count,
             warnings=warnings,
-            hand_records=hand_records,
+            hand_records=reservoir_store(index.names, reservoir) if reservoir else HandRecordStore(index.names),
+            cache_hit_rate=(cache_hits / simulations) * 100.0 if cache is not None else None,
+            objectives=ObjectiveCounts(list(objectives), masks) if objective_checks is not None else None,
+            brick_summary=summary,
+            histograms=tallies,
+            card_impact=impact,
         )
@@ -0,0 +1,380 @@
+"""
+Exact (closed-form) probability engine for the Yu-Gi-Oh Deck Simulator
+
+For configurations without card effects, whether a hand succeeds depends only
+on how many cards of each rule-relevant name (card or subcategory) it holds.
+Those counts follow a multivariate hypergeometric distribution, so the success
+probability can be computed exactly instead of sampled.
+
+Cards that contribute identically to every name the rules mention are merged
+into one class. A dynamic program then walks the classes, tracking
+(cards drawn, capped count per rule name) -> number of hands, and finally
+evaluates the rules once per distinct count profile.
+
+DrawEffect and ConditionalDiscardEffect also only look at multisets, so
+configurations with those effects are solved exactly by EffectStateSolver:
+a memoized walk over (hand counts, remaining deck counts) states that follows
+the two-phase semantics of Simulator.resolve_effects.
+"""
+
+from typing import List, Dict, Callable, Optional, Tuple
+from collections import Counter
+from itertools import combinations_with_replacement
+from math import comb, prod
+
+from deck_sim import Deck, Rule, CompositeRule, SimulationResult
+from card_effects import CardEffect, DrawEffect, ConditionalDiscardEffect
+
+
+def collect_caps(condition, caps: Dict[Optional[str], int]) -> None:
+    """
+    Record, for every name in a Rule tree, the count above which its value no
+    longer changes any comparison: the threshold for '>=', one more for '=='.
+
+    Raises:
+        ValueError: If the condition is not built from Rule/CompositeRule
+    """
+    if isinstance(condition, CompositeRule):
+        collect_caps(condition.left, caps)
+        collect_caps(condition.right, caps)
+    elif isinstance(condition, Rule):
+        cap = condition.min_count + 1 if condition.comparison == '==' else condition.min_count
+        caps[condition.card_name] = max(caps.get(condition.card_name, 0), cap)
+    else:
+        raise ValueError("The exact engine only supports conditions built from Rule/CompositeRule")
+
+
+def card_signature(card: str, names: List[Optional[str]],
+                   subcategory_map: Dict[str, List[str]]) -> Tuple[int, ...]:
+    """
+    How many times one copy of a card is counted towards each rule name
+    (subcategories override a card of the same name, as in Simulator._evaluate_hand).
+    """
+    return tuple(
+        subcategory_map[name].count(card) if name in subcategory_map else int(name == card)
+        for name in names
+    )
+
+
+def card_classes(deck_counts: Dict[str, int], names: List[Optional[str]],
+                 subcategory_map: Dict[str, List[str]]) -> Dict[Tuple[int, ...], int]:
+    """
+    Group deck cards by how they contribute to each rule name.
+
+    Returns:
+        Mapping of card_signature -> number of cards in the deck with that signature
+    """
+    classes: Dict[Tuple[int, ...], int] = Counter()
+    for card, count in deck_counts.items():
+        classes[card_signature(card, names, subcategory_map)] += count
+    return classes
+
+
+def count_profiles(classes: Dict[Tuple[int, ...], int], caps: Tuple[int, ...],
+                   hand_size: int) -> Dict[Tuple[int, ...], int]:
+    """
+    Number of hands for every (capped) count profile over the rule names.
+
+    Counts are capped at caps[i] (see collect_caps): every value at or above
+    the cap behaves the same in the rules, which keeps the state space small.
+    Classes whose signature is all zeros are not tracked individually.
+
+    Returns:
+        Mapping of count profile -> number of distinct hands with that profile
+    """
+    # Cards that no rule looks at only matter through how many of them are drawn,
+    # so they are folded in with a single binomial factor at the end.
+    filler = sum(size for signature, size in classes.items() if not any(signature))
+
+    # State: (cards in hand so far, capped totals) -> number of ways
+    states: Dict[Tuple[int, Tuple[int, ...]], int] = {(0, tuple(0 for _ in caps)): 1}
+
+    for signature, size in classes.items():
+        touched = [(i, weight) for i, weight in enumerate(signature) if weight]
+        if not touched:
+            continue
+        next_states: Dict[Tuple[int, Tuple[int, ...]], int] = Counter()
+        for (drawn, totals), ways in states.items():
+            next_states[(drawn, totals)] += ways
+            for k in range(1, min(size, hand_size - drawn) + 1):
+                new_totals = list(totals)
+                for i, weight in touched:
+                    new_totals[i] = min(new_totals[i] + k * weight, caps[i])
+                next_states[(drawn + k, tuple(new_totals))] += ways * comb(size, k)
+        states = next_states
+
+    profiles: Dict[Tuple[int, ...], int] = Counter()
+    for (drawn, totals), ways in states.items():
+        if hand_size - drawn <= filler:
+            profiles[totals] += ways * comb(filler, hand_size - drawn)
+    return profiles
+
+
+class EffectStateSolver:
+    """
+    Exact success probability for configurations with draw/discard effects.
+
+    States are count vectors over card classes. Effect cards and cards that a
+    discard filter can pick keep a class of their own (their name matters for
+    activation and for the discard tie-break); every other card is merged with
+    the cards that contribute identically to the rules.
+
+    A transposition table keyed by (remaining effects, hand counts, deck counts)
+    makes sure shared sub-states are solved once.
+    """
+
+    def __init__(self, deck_counts: Dict[str, int], subcategory_map: Dict[str, List[str]],
+                 conditions: List[Callable[[Counter], bool]], card_effects: Dict[str, CardEffect]):
+        self.conditions = conditions
+        self.card_effects = card_effects
+
+        for card_name, effect in card_effects.items():
+            if not isinstance(effect, (DrawEffect, ConditionalDiscardEffect)):
+                raise ValueError(f"The exact engine does not support the effect of '{card_name}'")
+
+        name_caps: Dict[Optional[str], int] = {}
+        for condition in conditions:
+            collect_caps(condition, name_caps)
+        self.names = list(name_caps)
+
+        # Cards that can be picked by a discard filter
+        self.filter_members = {
+            effect.discard_filter: set(subcategory_map.get(effect.discard_filter, []))
+            for effect in card_effects.values() if isinstance(effect, ConditionalDiscardEffect)
+        }
+        own_class = set(card_effects).union(*self.filter_members.values())
+
+        # Build classes: key -> index, with per-class size, rule signature and card name
+        class_index: Dict[Tuple, int] = {}
+        self.class_sizes: List[int] = []
+        self.class_signatures: List[Tuple[int, ...]] = []
+        self.class_names: List[Optional[str]] = []
+        self.card_class: Dict[str, int] = {}
+        for card, count in deck_counts.items():
+            signature = card_signature(card, self.names, subcategory_map)
+            key = ('card', card) if card in own_class else ('rules', signature)
+            if key not in class_index:
+                class_index[key] = len(self.class_sizes)
+                self.class_sizes.append(0)
+                self.class_signatures.append(signature)
+                self.class_names.append(card if card in own_class else None)
+            self.class_sizes[class_index[key]] += count
+            self.card_class[card] = class_index[key]
+
+        # Sparse form of the signatures: (rule name index, weight) pairs
+        self.class_contributions = [
+            [(i, weight) for i, weight in enumerate(signature) if weight]
+            for signature in self.class_signatures
+        ]
+
+        self._success_memo: Dict[Tuple[int, ...], bool] = {}
+        self._discard_memo: Dict[Tuple, Optional[Tuple[int, ...]]] = {}
+        self._draw_memo: Dict[Tuple[Tuple[int, ...], int], List[Tuple[Tuple[int, ...], float]]] = {}
+        self._state_memo: Dict[Tuple, float] = {}
+
+    def is_success(self, hand: Tuple[int, ...]) -> bool:
+        """Evaluate the conditions on a hand given as class counts."""
+        if hand not in self._success_memo:
+            totals = [0] * len(self.names)
+            for count, contributions in zip(hand, self.class_contributions):
+                if count:
+                    for i, weight in contributions:
+                        totals[i] += count * weight
+            # Every rule name is present, so a plain dict works as the hand Counter
+            hand_counts = dict(zip(self.names, totals))
+            self._success_memo[hand] = any(condition(hand_counts) for condition in self.conditions)
+        return self._success_memo[hand]
+
+    def opening_hands(self, hand_size: int) -> List[Tuple[Tuple[int, ...], int]]:
+        """Every opening hand as class counts, with the number of distinct hands it stands for."""
+        hands = [((), 0, 1)]
+        for size in self.class_sizes:
+            hands = [
+                (hand + (k,), drawn + k, ways * comb(size, k))
+                for hand, drawn, ways in hands
+                for k in range(min(size, hand_size - drawn) + 1)
+            ]
+        return [(hand, ways) for hand, drawn, ways in hands if drawn == hand_size]
+
+    def draws(self, deck: Tuple[int, ...], count: int) -> List[Tuple[Tuple[Tuple[int, int], ...], float]]:
+        """
+        Multivariate hypergeometric distribution of drawing count cards from deck.
+
+        Returns:
+            List of (drawn, probability), where drawn is a sparse tuple of (class, copies)
+        """
+        key = (deck, count)
+        if key not in self._draw_memo:
+            denominator = comb(sum(deck), count)
+            available = [c for c, size in enumerate(deck) if size]
+            outcomes = []
+            for combo in combinations_with_replacement(available, count):
+                drawn = tuple(Counter(combo).items())
+                ways = prod(comb(deck[c], k) for c, k in drawn)
+                if ways:
+                    outcomes.append((drawn, ways / denominator))
+            self._draw_memo[key] = outcomes
+        return self._draw_memo[key]
+
+    def _discard(self, effect: ConditionalDiscardEffect, hand: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+        """
+        Smart discard of ConditionalDiscardEffect on class counts.
+
+        Returns:
+            The hand after discarding, or None when the effect has to revert
+        """
+        key = (effect.discard_filter, effect.discard_count, hand)
+        if key in self._discard_memo:
+            return self._discard_memo[key]
+
+        candidates = []
+        for card in self.filter_members.get(effect.discard_filter, ()):
+            c = self.card_class.get(card)
+            if c is not None and hand[c] > 0:
+                test_hand = list(hand)
+                test_hand[c] -= 1
+                candidates.append((not self.is_success(tuple(test_hand)), card, c))
+        candidates.sort()
+
+        result = None
+        new_hand = list(hand)
+        needed = effect.discard_count
+        for _, _, c in candidates:
+            take = min(new_hand[c], needed)
+            new_hand[c] -= take
+            needed -= take
+            if needed == 0:
+                result = tuple(new_hand)
+                break
+
+        self._discard_memo[key] = result
+        return result
+
+    def resolve(self, steps: Tuple[str, ...], hand: Tuple[int, ...], deck: Tuple[int, ...]) -> float:
+        """
+        Probability that resolving the remaining effect steps ends in a successful hand.
+
+        Args:
+            steps: Names of the effect cards still to resolve, in resolution order
+            hand: Current hand as class counts
+            deck: Remaining deck as class counts
+        """
+        if not steps:
+            return 1.0 if self.is_success(hand) else 0.0
+
+        key = (steps, hand, deck)
+        if key in self._state_memo:
+            return self._state_memo[key]
+
+        card_name, rest = steps[0], steps[1:]
+        effect = self.card_effects[card_name]
+        c = self.card_class[card_name]
+        draw_count = effect.count if isinstance(effect, DrawEffect) else effect.draw_count
+
+        if hand[c] == 0 or sum(deck) < draw_count:
+            probability = self.resolve(rest, hand, deck)
+        else:
+            probability = 0.0
+            reverted = 0.0
+            for drawn, weight in self.draws(deck, draw_count):
+                new_hand = list(hand)
+                new_hand[c] -= 1
+                new_deck = list(deck)
+                for d, k in drawn:
+                    new_hand[d] += k
+                    new_deck[d] -= k
+
+                new_hand = tuple(new_hand)
+                if isinstance(effect, ConditionalDiscardEffect):
+                    new_hand = self._discard(effect, new_hand)
+                    if new_hand is None:
+                        # Fully reverted: activating card back in hand, drawn cards back in deck
+                        reverted += weight
+                        continue
+
+                if rest:
+                    probability += weight * self.resolve(rest, new_hand, tuple(new_deck))
+                elif self.is_success(new_hand):
+                    probability += weight
+
+            if reverted:
+                probability += reverted * self.resolve(rest, hand, deck)
+
+        self._state_memo[key] = probability
+        return probability
+
+    def success_probability(self, hand: Tuple[int, ...]) -> float:
+        """Probability that an opening hand (class counts) ends up a success."""
+        if self.is_success(hand):
+            return 1.0
+
+        # Phase 1 (draw effects) then phase 2 (everything else), in registration order
+        present = [name for name in self.card_effects
+                   if name in self.card_class and hand[self.card_class[name]] > 0]
+        steps = tuple(
+            [name for name in present if isinstance(self.card_effects[name], DrawEffect)] +
+            [name for name in present if not isinstance(self.card_effects[name], DrawEffect)]
+        )
+        if not steps:
+            return 0.0
+
+        deck = tuple(size - count for size, count in zip(self.class_sizes, hand))
+        return self.resolve(steps, hand, deck)
+
+
+def exact_result(deck: Deck, subcategory_map: Dict[str, List[str]],
+                 conditions: List[Callable[[Counter], bool]], hand_size: int,
+                 card_effects: Optional[Dict[str, CardEffect]] = None) -> SimulationResult:
+    """
+    Compute the exact success probability of a configuration.
+
+    The result counts distinct opening hands: total_simulations is C(deck, hand)
+    and success_count is the number of those hands that meet any condition.
+    With card effects an opening hand can succeed with any probability, so
+    success_count is then the expected number of successful hands, rounded.
+
+    Raises:
+        ValueError: If the hand is larger than the deck, a condition is not a
+                    Rule tree or an effect type is not supported
+    """
+    deck_counts = Counter(deck.cards)
+    if hand_size < 0 or hand_size > deck.deck_size:
+        raise ValueError("Sample larger than population or is negative")
+
+    total = comb(deck.deck_size, hand_size)
+
+    if card_effects:
+        solver = EffectStateSolver(deck_counts, subcategory_map or {}, conditions, card_effects)
+        expected = sum(ways * solver.success_probability(hand) for hand, ways in solver.opening_hands(hand_size))
+        successes = round(expected)
+        return SimulationResult(
+            total_simulations=total,
+            success_count=successes,
+            brick_count=total - successes,
+            success_rate=(expected / total) * 100.0,
+            brick_rate=((total - expected) / total) * 100.0,
+            exact=True,
+        )
+
+    name_caps: Dict[Optional[str], int] = {}
+    for condition in conditions:
+        collect_caps(condition, name_caps)
+
+    names = list(name_caps)
+    caps = tuple(name_caps.values())
+    classes = card_classes(deck_counts, names, subcategory_map or {})
+
+    successes = 0
+    for totals, ways in count_profiles(classes, caps, hand_size).items():
+        hand_counts = Counter(dict(zip(names, totals)))
+        if any(condition(hand_counts) for condition in conditions):
+            successes += ways
+
+    return SimulationResult(
+        total_simulations=total,
+        success_count=successes,
+        brick_count=total - successes,
+        success_rate=(successes / total) * 100.0,
+        brick_rate=((total - successes) / total) * 100.0,
+        exact=True,
+    )
@@ -0,0 +1,53 @@
+"""
+Hand outcome cache for the Yu-Gi-Oh Deck Simulator
+
+Whether an opening hand meets the success conditions only depends on which
+cards it holds, not on their order. A deck of ~25 distinct cards has far
+fewer distinct 5-6 card multisets than a run has simulations, so the
+simulation loop can remember the outcome of every multiset it has already
+checked in a bounded LRU cache.
+"""
+
+from collections import OrderedDict
+from typing import List, Optional
+
+
+# Distinct hands remembered per Simulator
+DEFAULT_HAND_CACHE_SIZE = 65_536
+
+
+class HandCache:
+    """
+    Bounded LRU cache from a canonical hand key to its success outcome.
+
+    The key of a hand is the sum of weights[card_id] over its cards, with
+    weights[i] = (hand_size + 1) ** i. No card can appear more than hand_size
+    times, so the key is the hand's count vector written in base hand_size + 1
+    and two hands share a key exactly when they hold the same cards.
+    """
+
+    def __init__(self, num_cards: int, hand_size: int, max_size: int = DEFAULT_HAND_CACHE_SIZE):
+        self.hand_size = hand_size
+        self.max_size = max_size
+        self.weights: List[int] = [(hand_size + 1) ** i for i in range(num_cards)]
+        self._outcomes: "OrderedDict[int, bool]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._outcomes)
+
+    def key(self, card_ids: List[int]) -> int:
+        """Canonical key of a hand given as card ids (in any order)."""
+        return sum(map(self.weights.__getitem__, card_ids))
+
+    def get(self, key: int) -> Optional[bool]:
+        """Cached outcome for a hand key, or None when the hand has not been seen."""
+        outcome = self._outcomes.get(key)
+        if outcome is not None:
+            self._outcomes.move_to_end(key)
+        return outcome
+
+    def put(self, key: int, outcome: bool):
+        """Remember an outcome, evicting the least recently used hand when full."""
+        self._outcomes[key] = outcome
+        if len(self._outcomes) > self.max_size:
+            self._outcomes.popitem(last=False)
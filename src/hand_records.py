@@ -0,0 +1,382 @@
+"""
+Hand records for the Yu-Gi-Oh Deck Simulator
+
+Recording hands (record_hands=True) used to build one HandRecord with four
+lists of card names per hand. HandRecordStore keeps them in columns instead:
+each of the four card lists is one typed array of card ids (uint8 while the
+run has at most 256 distinct cards) with a uint32 offset array marking where
+each hand's cards start, and the outcomes are a bitmap. Ten thousand records
+take a few hundred kilobytes in a handful of objects, pickle cheaply between
+processes, and serialize to the API response as base64 columns without
+building per-hand objects (see to_columns).
+
+The store still behaves like a list of HandRecord for reading: len(), indexing,
+slicing and iteration build records on demand.
+
+Which hands are recorded is decided while simulating: a RecordFilter selects
+the matching hands (bricks, hands where an effect activated, hands holding a
+card, ...), and a Reservoir keeps a uniform sample of max_hand_records of them
+over the whole run in constant memory. Shards sample independently, and
+merge_samples combines their samples into a uniform sample of all matching
+hands.
+"""
+
+import base64
+import math
+import random
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import List, Dict, Iterable, Optional, Union, Any, Callable, Tuple
+
+
+@dataclass
+class HandRecord:
+    """Record of a single simulated hand draw."""
+    initial_hand: List[str]    # Cards as originally drawn
+    final_hand: List[str]      # Cards after effect resolution
+    cards_drawn: List[str]     # Cards added by effects
+    cards_discarded: List[str] # Cards removed by effects
+    success: bool             # Whether the hand met any success condition
+
+
+# Card list columns, in HandRecord field order
+COLUMNS = ('initial_hand', 'final_hand', 'cards_drawn', 'cards_discarded')
+
+# Array typecode for card ids, by the largest id it has to hold
+_ID_TYPES = (('B', 'uint8', 0xFF), ('H', 'uint16', 0xFFFF), ('I', 'uint32', 0xFFFFFFFF))
+
+
+def _id_type(num_cards: int):
+    for typecode, name, largest in _ID_TYPES:
+        if num_cards - 1 <= largest:
+            return typecode, name
+    raise ValueError(f"Too many distinct cards to record: {num_cards}")
+
+
+def _encode(values: array) -> str:
+    """Base64 of an array's items in little-endian order."""
+    if sys.byteorder != 'little' and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+
+def _decode(typecode: str, data: str) -> array:
+    values = array(typecode)
+    values.frombytes(base64.b64decode(data))
+    if sys.byteorder != 'little' and values.itemsize > 1:
+        values.byteswap()
+    return values
+
+
+class HandRecordStore:
+    """
+    Columnar store of hand records.
+
+    Args:
+        names: Card names, indexed by the card ids passed to append_ids
+               (usually the simulator's CardIndex.names)
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._start(names)
+
+    def _start(self, names: Iterable[str]):
+        """Empty the store and number the cards by `names`."""
+        self.names: List[str] = list(names)
+        self._ids: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self._typecode, _ = _id_type(max(1, len(self.names)))
+        self._values = {column: array(self._typecode) for column in COLUMNS}
+        self._offsets = {column: array('I', [0]) for column in COLUMNS}
+        self._success = bytearray()
+        self._count = 0
+        # Hands that matched the record filter; the store is a uniform sample of them
+        self.matched = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append_ids(self, initial_hand: List[int], final_hand: List[int], cards_drawn: List[int],
+                   cards_discarded: List[int], success: bool):
+        """Record one hand given as card ids."""
+        for column, card_ids in zip(COLUMNS, (initial_hand, final_hand, cards_drawn, cards_discarded)):
+            values = self._values[column]
+            values.extend(card_ids)
+            self._offsets[column].append(len(values))
+        index = self._count
+        if index % 8 == 0:
+            self._success.append(0)
+        if success:
+            self._success[index >> 3] |= 1 << (index & 7)
+        self._count += 1
+        self.matched += 1
+
+    def _intern(self, name: str) -> int:
+        card_id = self._ids.get(name)
+        if card_id is None:
+            card_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+            typecode, _ = _id_type(len(self.names))
+            if typecode != self._typecode:
+                self._typecode = typecode
+                self._values = {column: array(typecode, values) for column, values in self._values.items()}
+        return card_id
+
+    def append(self, record: HandRecord):
+        """Record one hand given by card names."""
+        intern = self._intern
+        self.append_ids([intern(name) for name in record.initial_hand],
+                        [intern(name) for name in record.final_hand],
+                        [intern(name) for name in record.cards_drawn],
+                        [intern(name) for name in record.cards_discarded],
+                        record.success)
+
+    def extend(self, records: Union['HandRecordStore', Iterable[HandRecord]], limit: Optional[int] = None):
+        """Append records (another store or HandRecords), stopping once this store holds `limit`."""
+        room = None if limit is None else max(0, limit - self._count)
+        if isinstance(records, HandRecordStore):
+            if not self.names and not self._count:
+                self._start(records.names)
+            if records.names == self.names[:len(records.names)]:
+                self._extend_columns(records, len(records) if room is None else min(room, len(records)))
+                return
+        for record in records:
+            if room is not None and room <= 0:
+                break
+            self.append(record)
+            if room is not None:
+                room -= 1
+
+    def _extend_columns(self, other: 'HandRecordStore', taken: int):
+        """Copy the first `taken` records of a store with the same card ids, column by column."""
+        for column in COLUMNS:
+            offsets, values = other._offsets[column], self._values[column]
+            base = len(values)
+            copied = other._values[column][:offsets[taken]]
+            values.extend(copied if copied.typecode == values.typecode else array(values.typecode, copied))
+            self._offsets[column].extend(base + offset for offset in offsets[1:taken + 1])
+        for i in range(taken):
+            index = self._count
+            if index % 8 == 0:
+                self._success.append(0)
+            if other._success[i >> 3] >> (i & 7) & 1:
+                self._success[index >> 3] |= 1 << (index & 7)
+            self._count += 1
+        self.matched += taken
+
+    def _take(self, other: 'HandRecordStore', indices: Iterable[int]):
+        """Append the given records of another store."""
+        if other.names == self.names[:len(other.names)]:
+            for i in indices:
+                self.append_ids(*other._row_ids(i))
+        else:
+            for i in indices:
+                self.append(other[i])
+
+    def _row_ids(self, index: int):
+        row = []
+        for column in COLUMNS:
+            offsets = self._offsets[column]
+            row.append(self._values[column][offsets[index]:offsets[index + 1]])
+        row.append(bool(self._success[index >> 3] >> (index & 7) & 1))
+        return row
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[HandRecord, List[HandRecord]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("hand record index out of range")
+        names = self.names
+        *card_lists, success = self._row_ids(index)
+        return HandRecord(*([names[card_id] for card_id in card_ids] for card_ids in card_lists), success)
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (HandRecordStore, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"HandRecordStore({self._count} records, {len(self.names)} cards)"
+
+    def to_columns(self) -> Dict[str, Any]:
+        """
+        Compact JSON form: card names, the id type, and per column the base64
+        little-endian card ids and uint32 offsets (hand i's cards are
+        values[offsets[i]:offsets[i + 1]]), plus the outcome bitmap (hand i is
+        bit i % 8 of byte i // 8).
+        """
+        _, id_type = _id_type(max(1, len(self.names)))
+        columns = {
+            column: {'values': _encode(self._values[column]), 'offsets': _encode(self._offsets[column])}
+            for column in COLUMNS
+        }
+        return {'cards': list(self.names), 'count': self._count, 'matched': self.matched, 'id_type': id_type,
+                'success': base64.b64encode(bytes(self._success)).decode('ascii'), **columns}
+
+    @classmethod
+    def from_columns(cls, data: Dict[str, Any]) -> 'HandRecordStore':
+        """Rebuild a store from to_columns output."""
+        store = cls(data['cards'])
+        for column in COLUMNS:
+            store._values[column] = _decode(store._typecode, data[column]['values'])
+            store._offsets[column] = _decode('I', data[column]['offsets'])
+        store._success = bytearray(base64.b64decode(data['success']))
+        store._count = data['count']
+        store.matched = data.get('matched', store._count)
+        return store
+
+
+@dataclass
+class RecordFilter:
+    """
+    Which hands to record. Every set criterion must hold; the default records
+    every hand.
+    """
+    outcome: Optional[str] = None  # 'success' or 'brick' (None records both)
+    effects_only: bool = False  # Only hands where a card effect drew or discarded cards
+    card: Optional[str] = None  # Only opening hands holding this card (or a card of this subcategory)
+
+    def __post_init__(self):
+        if self.outcome not in (None, 'success', 'brick'):
+            raise ValueError(f"Unknown record filter outcome: {self.outcome}")
+
+    def card_ids(self, card_index) -> Optional[set]:
+        """Card ids that satisfy `card`, or None when the filter does not look at cards."""
+        if self.card is None:
+            return None
+        if self.card in card_index.subcategories:
+            return set(card_index.subcategories[self.card])
+        if self.card in card_index.ids:
+            return {card_index.ids[self.card]}
+        return set()  # Not in the deck: no hand holds it
+
+    def matcher(self, card_index) -> Optional[Callable[[List[int], bool, bool], bool]]:
+        """Predicate on (opening hand ids, success, effect activated); None when every hand matches."""
+        if self.outcome is None and not self.effects_only and self.card is None:
+            return None
+        wanted = None if self.outcome is None else self.outcome == 'success'
+        effects_only = self.effects_only
+        card_ids = self.card_ids(card_index)
+
+        def matches(hand_ids: List[int], success: bool, activated: bool) -> bool:
+            if wanted is not None and bool(success) != wanted:
+                return False
+            if effects_only and not activated:
+                return False
+            return card_ids is None or not card_ids.isdisjoint(hand_ids)
+        return matches
+
+
+def record_filter(record_hands: Union[bool, RecordFilter, None]) -> Optional[RecordFilter]:
+    """The filter a record_hands argument asks for: None (off), every hand (True) or the given filter."""
+    if isinstance(record_hands, RecordFilter):
+        return record_hands
+    return RecordFilter() if record_hands else None
+
+
+class Reservoir:
+    """
+    Uniform sample of up to `size` items from a stream of unknown length
+    (Algorithm L): once full, the number of items to skip before the next
+    replacement is drawn directly, so the cost grows with the number of
+    replacements (about size * log(matched / size)), not with the stream.
+
+    The caller stores item `n` in slots[slot] for every (n, slot) that offer or
+    select returns.
+    """
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.rng = rng
+        self.slots: List[Any] = []
+        self.matched = 0  # Items offered so far
+        self._next = size - 1  # Index of the next item to keep once full
+        self._weight = 1.0
+
+    def _advance(self):
+        uniform = self.rng.random
+        self._weight *= math.exp(math.log(uniform() or 1e-300) / self.size)
+        self._next += int(math.log(uniform() or 1e-300) / math.log1p(-self._weight)) + 1
+
+    def offer(self) -> int:
+        """Count one more item; the slot to store it in, or -1 to skip it."""
+        n = self.matched
+        self.matched = n + 1
+        if n < self.size:
+            self.slots.append(None)
+            if n + 1 == self.size:
+                self._advance()
+            return n
+        if n < self._next:
+            return -1
+        self._advance()
+        return self.rng.randrange(self.size)
+
+    def select(self, count: int) -> List[Tuple[int, int]]:
+        """Count `count` more items; (position among them, slot) of those to keep, in order."""
+        start, end = self.matched, self.matched + count
+        picks = []
+        while self.matched < end and self.matched < self.size:
+            picks.append((self.matched - start, self.offer()))
+        while self._next < end:
+            self.matched = self._next
+            picks.append((self._next - start, self.offer()))
+        self.matched = end
+        return picks
+
+
+def sample_rng(seed: Optional[int]) -> random.Random:
+    """Random stream for choosing records, separate from the simulation's so recording never changes results."""
+    return random.Random(f"hand-records:{seed}") if seed is not None else random.Random()
+
+
+def reservoir_store(names: List[str], reservoir: Reservoir) -> HandRecordStore:
+    """Store of a reservoir whose slots hold (hand number, initial, final, drawn, discarded, success)."""
+    store = HandRecordStore(names)
+    for _, *row in sorted(reservoir.slots, key=lambda item: item[0]):
+        store.append_ids(*row)
+    store.matched = reservoir.matched
+    return store
+
+
+def merge_samples(samples: List[Union[HandRecordStore, List[HandRecord]]], size: int,
+                  rng: random.Random) -> HandRecordStore:
+    """
+    Combine uniform samples of disjoint groups of hands (e.g. shards) into a
+    uniform sample of `size` hands from all of them, keeping the samples' order.
+
+    How many records come from each sample follows the multivariate
+    hypergeometric distribution of drawing `size` hands from all matching hands
+    without replacement; each sample then contributes that many of its records,
+    chosen uniformly.
+    """
+    stores = []
+    for sample in samples:
+        if not isinstance(sample, HandRecordStore):
+            store = HandRecordStore()
+            store.extend(sample)
+            sample = store
+        stores.append(sample)
+
+    remaining = [store.matched for store in stores]
+    taken = [0] * len(stores)
+    for _ in range(min(size, sum(remaining))):
+        pick = rng.randrange(sum(remaining))
+        for i, count in enumerate(remaining):
+            if pick < count:
+                break
+            pick -= count
+        remaining[i] -= 1
+        taken[i] += 1
+
+    merged = HandRecordStore(stores[0].names if stores else ())
+    for store, count in zip(stores, taken):
+        merged._take(store, sorted(rng.sample(range(len(store)), min(count, len(store)))))
+    merged.matched = sum(store.matched for store in stores)
+    return merged
@@ -0,0 +1,164 @@
+"""
+Hand histograms for the Yu-Gi-Oh Deck Simulator
+
+Charts like "starters in the opening hand" or "hand size after effects" used
+to need the raw hand records. HandHistograms accumulates them while simulating
+instead, in arrays whose size only depends on the deck: for every card and
+subcategory, how many hands held 0, 1, 2, ... of it in the opening and in the
+final hand, and how many of those hands succeeded (the success rate split by
+e.g. starter count); plus the final hand size and the number of cards drawn and
+discarded by effects. Histograms of shards merge by adding them.
+
+The Python engine only touches the bins of the cards a hand holds and fills
+the zero bins once at the end (fill_zero_bins); the batch engine adds complete
+bincounts per block.
+"""
+
+import copy
+from dataclasses import dataclass
+from typing import List, Optional
+
+from card_index import CardIndex
+
+
+def _zeros(sizes: List[int]) -> List[List[int]]:
+    return [[0] * size for size in sizes]
+
+
+def _add_rows(rows: List[List[int]], other: List[List[int]]):
+    for row, other_row in zip(rows, other):
+        for i, count in enumerate(other_row):
+            row[i] += count
+
+
+@dataclass
+class HandHistograms:
+    """Per-card and per-subcategory count histograms of the hands of a run."""
+    names: List[str]  # Card names by id
+    tags: List[str]  # Subcategory names by tag id
+    card_tags: List[List[int]]  # Card id -> tag ids (see CardIndex)
+    initial: List[List[int]]  # initial[card][c]: hands opening with c copies of the card
+    final: List[List[int]]  # final[card][c]: hands ending with c copies (after effects)
+    success: List[List[int]]  # success[card][c]: successful hands among initial[card][c]
+    tag_initial: List[List[int]]  # The same three by subcategory
+    tag_final: List[List[int]]
+    tag_success: List[List[int]]
+    hand_size: List[int]  # hand_size[s]: hands ending with s cards
+    drawn: List[int]  # drawn[d]: hands where effects drew d cards
+    discarded: List[int]  # discarded[d]: hands where effects discarded d cards
+    card_drawn: List[int]  # Copies of each card drawn by effects over the run
+    card_discarded: List[int]  # Copies of each card discarded by effects over the run
+    hands: int = 0
+    successes: int = 0
+
+    @classmethod
+    def for_deck(cls, index: CardIndex, deck_vector: List[int]) -> 'HandHistograms':
+        """Empty histograms, with one bin per possible count of each card and subcategory in the deck."""
+        card_bins = [count + 1 for count in deck_vector]
+        tag_bins = [1] * len(index.tags)
+        for card_id, tag_ids in enumerate(index.card_tags):
+            for tag_id in tag_ids:
+                tag_bins[tag_id] += deck_vector[card_id]
+        deck_bins = sum(deck_vector) + 1
+        return cls(
+            names=index.names, tags=index.tags, card_tags=index.card_tags,
+            initial=_zeros(card_bins), final=_zeros(card_bins), success=_zeros(card_bins),
+            tag_initial=_zeros(tag_bins), tag_final=_zeros(tag_bins), tag_success=_zeros(tag_bins),
+            hand_size=[0] * deck_bins, drawn=[0] * deck_bins, discarded=[0] * deck_bins,
+            card_drawn=[0] * len(card_bins), card_discarded=[0] * len(card_bins),
+        )
+
+    def _tag_counts(self, counts: List[int], card_ids) -> List[int]:
+        tags = [0] * len(self.tags)
+        for card_id in card_ids:
+            for tag_id in self.card_tags[card_id]:
+                tags[tag_id] += counts[card_id]
+        return tags
+
+    def add(self, opening: List[int], hand: List[int], final: Optional[List[int]],
+            drawn: List[int], discarded: List[int], success: bool):
+        """
+        Count one hand (nonzero bins only, see fill_zero_bins).
+
+        Args:
+            opening: Card ids as drawn
+            hand: Count vector of the opening hand
+            final: Count vector after effects (None when no effect resolved)
+            drawn, discarded: Card ids drawn and discarded by effects
+        """
+        self.hands += 1
+        self.successes += success
+        held = set(opening)
+        for card_id in held:
+            count = hand[card_id]
+            self.initial[card_id][count] += 1
+            if success:
+                self.success[card_id][count] += 1
+        opening_tags = self._tag_counts(hand, held) if self.tags else []
+        for tag_id, count in enumerate(opening_tags):
+            if count:
+                self.tag_initial[tag_id][count] += 1
+                if success:
+                    self.tag_success[tag_id][count] += 1
+
+        if final is None or final == hand:
+            for card_id in held:
+                self.final[card_id][hand[card_id]] += 1
+            final_tags = opening_tags
+            self.hand_size[len(opening)] += 1
+        else:
+            held = [card_id for card_id, count in enumerate(final) if count]
+            for card_id in held:
+                self.final[card_id][final[card_id]] += 1
+            final_tags = self._tag_counts(final, held) if self.tags else []
+            self.hand_size[sum(final)] += 1
+        for tag_id, count in enumerate(final_tags):
+            if count:
+                self.tag_final[tag_id][count] += 1
+
+        self.drawn[len(drawn)] += 1
+        for card_id in drawn:
+            self.card_drawn[card_id] += 1
+        self.discarded[len(discarded)] += 1
+        for card_id in discarded:
+            self.card_discarded[card_id] += 1
+
+    def fill_zero_bins(self):
+        """Set the 0 bins of the per-card and per-subcategory histograms filled by add()."""
+        for rows, total in ((self.initial, self.hands), (self.final, self.hands), (self.success, self.successes),
+                            (self.tag_initial, self.hands), (self.tag_final, self.hands),
+                            (self.tag_success, self.successes)):
+            for row in rows:
+                row[0] = total - sum(row[1:])
+
+    def merge(self, other: 'HandHistograms'):
+        """Add another run's histograms of the same deck."""
+        if other.names != self.names:
+            raise ValueError("Cannot merge histograms of different decks")
+        for name in ('initial', 'final', 'success', 'tag_initial', 'tag_final', 'tag_success'):
+            _add_rows(getattr(self, name), getattr(other, name))
+        _add_rows([self.hand_size, self.drawn, self.discarded, self.card_drawn, self.card_discarded],
+                  [other.hand_size, other.drawn, other.discarded, other.card_drawn, other.card_discarded])
+        self.hands += other.hands
+        self.successes += other.successes
+
+    def success_rates(self, name: str) -> List[Optional[float]]:
+        """Success rate (%) by opening count of a card or subcategory (None for counts never seen)."""
+        if name in self.tags:
+            i = self.tags.index(name)
+            hands, successes = self.tag_initial[i], self.tag_success[i]
+        else:
+            i = self.names.index(name)
+            hands, successes = self.initial[i], self.success[i]
+        return [s / h * 100.0 if h else None for h, s in zip(hands, successes)]
+
+
+def merge_histograms(parts: List[Optional[HandHistograms]]) -> Optional[HandHistograms]:
+    """Sum of several runs' histograms (None when no part has them)."""
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    merged = copy.deepcopy(parts[0])
+    for part in parts[1:]:
+        merged.merge(part)
+    return merged
@@ -0,0 +1,71 @@
+"""
+Multi-objective evaluation for the Yu-Gi-Oh Deck Simulator
+
+A run answers one question by default: how often do the success conditions
+hold? Objectives let one run answer several: each objective is a named list of
+conditions (OR logic, like the success conditions), and every simulated hand is
+checked against all of them. A hand's outcome is recorded as a bitmask (bit i
+set when objective i holds), and the run counts hands per mask, so per-objective
+counts, pairwise overlaps and every exact combination come from the same draws.
+Counts from shards merge by adding them.
+
+Objectives are checked on the hand the run ends up with: the opening hand, or
+the hand after card effects when effects resolved (effects are played for the
+success conditions, not for each objective).
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Dict, Callable, Tuple
+
+
+@dataclass
+class ObjectiveCounts:
+    """Hands meeting each objective, and each combination of them, in one run."""
+    names: List[str]
+    masks: Dict[int, int] = field(default_factory=dict)  # Bit i set when names[i] holds -> hands
+
+    def _bit(self, name: str) -> int:
+        return 1 << self.names.index(name)
+
+    def count(self, name: str) -> int:
+        """Hands meeting an objective."""
+        bit = self._bit(name)
+        return sum(hands for mask, hands in self.masks.items() if mask & bit)
+
+    def overlap(self, first: str, second: str) -> int:
+        """Hands meeting both objectives."""
+        both = self._bit(first) | self._bit(second)
+        return sum(hands for mask, hands in self.masks.items() if mask & both == both)
+
+    def overlaps(self) -> List[List[int]]:
+        """Pairwise overlap counts, in names order (the diagonal holds each objective's count)."""
+        return [[self.overlap(first, second) for second in self.names] for first in self.names]
+
+    def combinations(self) -> List[Tuple[List[str], int]]:
+        """Hands meeting exactly each set of objectives (and no other), most frequent first."""
+        combinations = [([name for i, name in enumerate(self.names) if mask >> i & 1], hands)
+                        for mask, hands in self.masks.items()]
+        return sorted(combinations, key=lambda item: (-item[1], item[0]))
+
+    def add(self, other: 'ObjectiveCounts'):
+        """Add another run's counts for the same objectives."""
+        if other.names != self.names:
+            raise ValueError("Cannot merge counts of different objectives")
+        for mask, hands in other.masks.items():
+            self.masks[mask] = self.masks.get(mask, 0) + hands
+
+
+def branch_objectives(conditions: List[Callable], prefix: str = "Rule") -> Dict[str, List[Callable]]:
+    """One objective per success condition (OR branch), named '<prefix> 1', '<prefix> 2', ..."""
+    return {f"{prefix} {i}": [condition] for i, condition in enumerate(conditions, start=1)}
+
+
+def merge_objectives(parts: List['ObjectiveCounts']) -> 'ObjectiveCounts':
+    """Sum of several runs' counts (None when no part has any)."""
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    merged = ObjectiveCounts(list(parts[0].names))
+    for part in parts:
+        merged.add(part)
+    return merged
@@ -0,0 +1,219 @@
+"""
+Deck optimizer for the Yu-Gi-Oh Deck Simulator
+
+Searches the card counts (and deck size) with the highest success rate, which
+is the same as the lowest brick rate. Cards without limits keep their counts,
+and the rest of the deck is blank cards (see Deck).
+
+The search is a hill climb over single-copy moves: add or remove one copy of
+a card (in place of a blank card), swap one copy of a card for one of
+another, or grow or shrink the deck by one blank card. Each step scores the
+current deck and all its neighbours in one go, either with the exact engine
+or with a cheap sample on common random numbers (see sweep), and moves to the
+best neighbour only while it is clearly better.
+
+The best decks seen during the search become finalists. They are re-run at
+full precision on a fresh random stream, in parallel and on common random
+numbers, together with the starting deck. Re-running on fresh draws removes
+the optimism of picking the winners of the screening sample.
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import List, Dict, Callable, Optional, Tuple
+
+from deck_sim import Simulator
+from parallel import derive_seed
+from sweep import Variant, SweepPoint, run_variants
+
+
+# Hands per deck while searching (when the exact engine cannot be used)
+DEFAULT_SCREENING_SIMULATIONS = 2_000
+# Decks re-run at full precision
+DEFAULT_FINALISTS = 5
+# Hill-climbing steps before the search stops
+MAX_ITERATIONS = 50
+
+DECK_SIZE = 'deck_size'
+
+# Limited card counts (in card_limits order) and deck size
+State = Tuple[Tuple[int, ...], int]
+
+
+@dataclass
+class CardLimit:
+    """Allowed number of copies of one card."""
+    card_name: str
+    min_copies: int = 0
+    max_copies: int = 3
+
+
+@dataclass
+class OptimizationResult:
+    """
+    Finalists and the starting deck at full precision, best first. Each point's
+    values are the limited card counts and the deck size; its difference is
+    measured against the starting deck.
+    """
+    decks: List[SweepPoint] = field(default_factory=list)
+    evaluated: int = 0  # Distinct decks scored during the search
+    exact: bool = False  # Whether the search (and the final ranking) used the exact engine
+    seed: Optional[int] = None
+
+    @property
+    def best(self) -> SweepPoint:
+        return self.decks[0]
+
+
+class _Search:
+    """Deck states, their neighbours and their conversion to sweep variants."""
+
+    def __init__(self, simulator: Simulator, hand_size: int, limits: List[CardLimit],
+                 min_deck_size: int, max_deck_size: int):
+        self.simulator = simulator
+        self.hand_size = hand_size
+        self.limits = limits
+        self.min_deck_size = min_deck_size
+        self.max_deck_size = max_deck_size
+        limited = {limit.card_name for limit in limits}
+        self.fixed = {name: count for name, count in simulator.deck.contents.items() if name not in limited}
+        self.fixed_total = sum(self.fixed.values())
+
+    def fits(self, counts: Tuple[int, ...], deck_size: int) -> bool:
+        return (self.min_deck_size <= deck_size <= self.max_deck_size
+                and self.fixed_total + sum(counts) <= deck_size
+                and all(limit.min_copies <= count <= limit.max_copies
+                        for limit, count in zip(self.limits, counts)))
+
+    def start(self) -> State:
+        """The simulator's deck moved into the limits (dropping copies from the last cards if it does not fit)."""
+        contents = self.simulator.deck.contents
+        counts = [min(max(contents.get(limit.card_name, 0), limit.min_copies), limit.max_copies)
+                  for limit in self.limits]
+        deck_size = min(max(self.simulator.deck.deck_size, self.min_deck_size), self.max_deck_size)
+        deck_size = min(max(deck_size, self.fixed_total + sum(counts)), self.max_deck_size)
+        for i in reversed(range(len(counts))):
+            excess = self.fixed_total + sum(counts) - deck_size
+            if excess <= 0:
+                break
+            counts[i] -= min(excess, counts[i] - self.limits[i].min_copies)
+        if not self.fits(tuple(counts), deck_size):
+            raise ValueError("No deck satisfies the card limits within the deck size range")
+        return tuple(counts), deck_size
+
+    def neighbours(self, state: State) -> List[State]:
+        counts, deck_size = state
+        moves = []
+        for i in range(len(counts)):
+            for delta in (1, -1):
+                moved = list(counts)
+                moved[i] += delta
+                moves.append((tuple(moved), deck_size))
+            for j in range(len(counts)):
+                if j != i:
+                    moved = list(counts)
+                    moved[i] += 1
+                    moved[j] -= 1
+                    moves.append((tuple(moved), deck_size))
+        moves.append((counts, deck_size + 1))
+        moves.append((counts, deck_size - 1))
+        return [move for move in moves if self.fits(*move)]
+
+    def variant(self, state: State) -> Variant:
+        counts, deck_size = state
+        contents = dict(self.fixed)
+        values = {}
+        for limit, count in zip(self.limits, counts):
+            contents[limit.card_name] = count
+            values[limit.card_name] = count
+        values[DECK_SIZE] = deck_size
+        return Variant(values, contents, deck_size, self.hand_size, self.simulator.card_effects)
+
+
+def _validate(limits: List[CardLimit], min_deck_size: int, max_deck_size: int):
+    if not limits:
+        raise ValueError("The optimizer needs at least one card limit")
+    names = [limit.card_name for limit in limits]
+    if len(set(names)) != len(names):
+        raise ValueError("Each card can only have one limit")
+    for limit in limits:
+        if not 0 <= limit.min_copies <= limit.max_copies:
+            raise ValueError(f"Invalid copy limits for '{limit.card_name}': "
+                             f"{limit.min_copies} to {limit.max_copies}")
+    if not 0 < min_deck_size <= max_deck_size:
+        raise ValueError(f"Invalid deck size range: {min_deck_size} to {max_deck_size}")
+
+
+def optimize_deck(simulator: Simulator, simulations: int, hand_size: int, conditions: List[Callable],
+                  card_limits: List[CardLimit], min_deck_size: Optional[int] = None,
+                  max_deck_size: Optional[int] = None, finalists: int = DEFAULT_FINALISTS,
+                  screening_simulations: int = DEFAULT_SCREENING_SIMULATIONS,
+                  seed: Optional[int] = None, workers: Optional[int] = 1,
+                  confidence: float = 0.95, max_iterations: int = MAX_ITERATIONS) -> OptimizationResult:
+    """
+    Find the card counts with the highest success rate.
+
+    Args:
+        simulator: Starting deck, subcategories and card effects
+        simulations: Hands per finalist in the full-precision runs
+        card_limits: Cards whose counts may change, with their allowed copies
+        min_deck_size: Smallest deck to consider (default: the simulator's deck size)
+        max_deck_size: Largest deck to consider (default: the simulator's deck size)
+        finalists: Best decks of the search that are re-run at full precision
+        screening_simulations: Hands per deck during the search (sampled screening only)
+        seed: Makes the search and the final runs reproducible
+        workers: Processes to spread the decks of each step over (None uses every core)
+
+    Returns:
+        OptimizationResult, best deck first
+
+    Raises:
+        ValueError: For invalid limits, or when no deck satisfies them
+    """
+    min_deck_size = min_deck_size or simulator.deck.deck_size
+    max_deck_size = max_deck_size or simulator.deck.deck_size
+    _validate(card_limits, min_deck_size, max_deck_size)
+    if finalists < 1:
+        raise ValueError("At least one finalist is needed")
+    if seed is None:
+        seed = random.getrandbits(63)
+
+    search = _Search(simulator, hand_size, card_limits, min_deck_size, max_deck_size)
+    start = search.start()
+
+    # Use the exact engine whenever this configuration supports it
+    try:
+        run_variants(simulator, [search.variant(start)], 1, conditions, engine='exact')
+        engine, screening_simulations = 'exact', 1
+    except ValueError:
+        engine = 'python'
+
+    scores: Dict[State, float] = {}
+    current = start
+    for _ in range(max_iterations):
+        candidates = [current] + search.neighbours(current)
+        sweep = run_variants(simulator, [search.variant(state) for state in candidates],
+                             screening_simulations, conditions, seed=seed, engine=engine,
+                             workers=workers, confidence=confidence)
+        for state, point in zip(candidates, sweep.points):
+            scores[state] = point.result.success_rate
+        if len(candidates) == 1:
+            break
+
+        # Move only when the best neighbour is better beyond the screening noise
+        best = max(range(1, len(candidates)), key=lambda i: sweep.points[i].difference)
+        if sweep.points[best].difference_low <= 0 or sweep.points[best].difference <= 0:
+            break
+        current = candidates[best]
+
+    ranked = sorted(scores, key=lambda state: scores[state], reverse=True)
+    chosen = [start] + [state for state in ranked if state != start][:finalists]
+    final = run_variants(simulator, [search.variant(state) for state in chosen], simulations, conditions,
+                         seed=derive_seed(seed, 1), engine=engine, workers=workers, confidence=confidence)
+
+    return OptimizationResult(
+        decks=sorted(final.points, key=lambda point: point.result.success_rate, reverse=True),
+        evaluated=len(scores),
+        exact=engine == 'exact',
+        seed=seed,
+    )
@@ -0,0 +1,133 @@
+"""
+Multi-core sharded execution for the Yu-Gi-Oh Deck Simulator
+
+A run is split into fixed-size shards. Every shard gets its own random stream
+derived from the run seed and the shard index, and the shards are spread over
+a process pool. Because the shard layout only depends on the number of
+simulations, a seeded run gives exactly the same result with 1 or 16 workers.
+"""
+
+import os
+import random
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Callable, Optional, Union
+
+from deck_sim import Simulator, SimulationResult
+from hand_records import RecordFilter, merge_samples, sample_rng
+from objectives import merge_objectives
+from brick_summary import merge_brick_summaries
+from histograms import merge_histograms
+from card_impact import merge_impact
+
+
+# Simulations per shard. Fixed (not derived from the worker count) so that a
+# seeded run can be replayed exactly on any machine.
+DEFAULT_SHARD_SIZE = 100_000
+
+
+def derive_seed(seed: int, index: int) -> int:
+    """Derive an independent 64-bit seed for stream `index` of a run seeded with `seed`."""
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def shard_sizes(simulations: int, shard_size: int = DEFAULT_SHARD_SIZE) -> List[int]:
+    """Split a run into shards of shard_size simulations (the last one may be smaller)."""
+    full, rest = divmod(simulations, shard_size)
+    return [shard_size] * full + ([rest] if rest else [])
+
+
+def merge_results(results: List[SimulationResult], max_hand_records: int = 10_000,
+                  seed: Optional[int] = None) -> SimulationResult:
+    """
+    Merge partial results into one. The hand records become a uniform sample of
+    max_hand_records of all the shards' matching hands (see hand_records.merge_samples),
+    chosen reproducibly for a given seed.
+    """
+    simulations = sum(r.total_simulations for r in results)
+    successes = sum(r.success_count for r in results)
+    max_depth_count = sum(r.max_depth_reached_count for r in results)
+
+    hand_records = merge_samples([r.hand_records for r in results], max_hand_records, sample_rng(seed))
+
+    # Every simulated hand is one cache lookup, so shard hit rates weigh by size
+    cached = [r for r in results if r.cache_hit_rate is not None]
+    cache_hit_rate = None
+    if cached:
+        cache_hit_rate = (sum(r.cache_hit_rate * r.total_simulations for r in cached)
+                          / max(1, sum(r.total_simulations for r in cached)))
+
+    warnings = []
+    if max_depth_count > 0:
+        warnings.append(f"Max effect depth reached in {max_depth_count} simulation(s). "
+                        f"This may indicate infinite loops in your card effect definitions.")
+
+    return SimulationResult(
+        total_simulations=simulations,
+        success_count=successes,
+        brick_count=simulations - successes,
+        success_rate=(successes / simulations) * 100.0,
+        brick_rate=((simulations - successes) / simulations) * 100.0,
+        max_depth_reached_count=max_depth_count,
+        warnings=warnings,
+        hand_records=hand_records,
+        cache_hit_rate=cache_hit_rate,
+        objectives=merge_objectives([r.objectives for r in results]),
+        brick_summary=merge_brick_summaries([r.brick_summary for r in results]),
+        histograms=merge_histograms([r.histograms for r in results]),
+        card_impact=merge_impact([r.card_impact for r in results]),
+    )
+
+
+def _run_shard(simulator: Simulator, simulations: int, hand_size: int, conditions: List[Callable],
+               record_hands: Union[bool, RecordFilter], max_hand_records: int, engine: str, seed: int,
+               objectives: Optional[Dict[str, List[Callable]]] = None,
+               brick_summary: bool = False, histograms: bool = False,
+               card_impact: bool = False) -> SimulationResult:
+    """Process pool entry point: run one shard with its derived seed."""
+    return simulator._run_engine(simulations, hand_size, conditions, record_hands, max_hand_records, engine, seed,
+                                 objectives=objectives, brick_summary=brick_summary, histograms=histograms,
+                                 card_impact=card_impact)
+
+
+def run_sharded(simulator: Simulator, simulations: int, hand_size: int, conditions: List[Callable],
+                record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000, engine: str = 'python',
+                seed: Optional[int] = None, workers: Optional[int] = 1,
+                shard_size: int = DEFAULT_SHARD_SIZE,
+                objectives: Optional[Dict[str, List[Callable]]] = None,
+                brick_summary: bool = False, histograms: bool = False,
+                card_impact: bool = False) -> SimulationResult:
+    """
+    Run a simulation as independent shards, optionally across several processes.
+
+    Args:
+        simulator: Simulator to run (must be picklable when workers != 1)
+        seed: Run seed. A random one is chosen (and reported in the result) when None.
+        workers: Number of worker processes (None uses every core, 1 runs in-process)
+        shard_size: Simulations per shard
+
+    Returns:
+        The merged SimulationResult, with the seed that reproduces it
+    """
+    if seed is None:
+        seed = random.getrandbits(63)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    sizes = shard_sizes(simulations, shard_size)
+    tasks = [
+        (simulator, n, hand_size, conditions, record_hands, max_hand_records, engine, derive_seed(seed, index),
+         objectives, brick_summary, histograms, card_impact)
+        for index, n in enumerate(sizes)
+    ]
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            results = list(executor.map(_run_shard, *zip(*tasks)))
+    else:
+        results = [_run_shard(*task) for task in tasks]
+
+    merged = merge_results(results, max_hand_records, seed)
+    merged.seed = seed
+    return merged
@@ -0,0 +1,323 @@
+"""
+Rule compiler for the Yu-Gi-Oh Deck Simulator
+
+Success conditions are built as left-deep Rule/CompositeRule chains (see
+build_rule in backend/main.py), so evaluating a hand costs one Python call per
+node. This module lowers the conditions into a flat intermediate
+representation, simplifies it and generates a single specialized evaluator:
+
+  1. Flatten nested AND/OR chains into n-ary nodes; the conditions list itself
+     becomes one top-level OR.
+  2. Fold constants: always-true leaves such as the req(None) >= 0 placeholder
+     for empty groups, and leaves that can never hold (e.g. min_count above the
+     number of copies in the deck) are removed, collapsing their parents.
+  3. Eliminate common subexpressions: duplicate leaves and clauses are merged,
+     and every card/subcategory count is computed once per hand and shared by
+     all clauses that test it.
+  4. Order the top-level OR branches by observed hit rate, so the branch most
+     likely to succeed is tested first.
+
+The generated evaluator takes either a mapping of card name -> count (e.g. a
+Counter of the hand) or, when compiled with card ids, a count vector (see
+card_index). It resolves subcategory counts itself.
+"""
+
+from dataclasses import dataclass
+from typing import List, Dict, Callable, Optional, Set, Tuple, Union
+
+from deck_sim import Rule, CompositeRule
+
+
+# Number of evaluations profiled before the OR branches are reordered
+DEFAULT_PROFILE_HANDS = 1_000
+
+
+@dataclass(frozen=True)
+class Atom:
+    """Leaf test: count(name) >= value or count(name) == value."""
+    name: Optional[str]
+    op: str
+    value: int
+
+
+@dataclass(frozen=True)
+class Node:
+    """N-ary 'AND' / 'OR' over child nodes (Atom, Node or a bool constant)."""
+    op: str
+    children: Tuple
+
+
+Expr = Union[bool, Atom, Node]
+
+
+def is_compilable(condition: Callable) -> bool:
+    """Check whether a condition is a Rule/CompositeRule tree the compiler can lower."""
+    if isinstance(condition, Rule):
+        return True
+    if isinstance(condition, CompositeRule):
+        return is_compilable(condition.left) and is_compilable(condition.right)
+    return False
+
+
+def lower(condition: Callable) -> Expr:
+    """
+    Lower a Rule/CompositeRule tree into the IR, flattening same-operator chains.
+
+    Raises:
+        ValueError: If the condition is not built from Rule/CompositeRule
+    """
+    if isinstance(condition, Rule):
+        return Atom(condition.card_name, '==' if condition.comparison == '==' else '>=', condition.min_count)
+    if isinstance(condition, CompositeRule):
+        op = 'OR' if condition.operator == 'OR' else 'AND'
+        children = []
+        for side in (condition.left, condition.right):
+            child = lower(side)
+            if isinstance(child, Node) and child.op == op:
+                children.extend(child.children)
+            else:
+                children.append(child)
+        return Node(op, tuple(children))
+    raise ValueError("Only Rule/CompositeRule conditions can be compiled")
+
+
+def referenced_names(expr: Expr) -> Set[str]:
+    """Card and subcategory names tested anywhere in an IR expression."""
+    if isinstance(expr, bool):
+        return set()
+    if isinstance(expr, Atom):
+        return {expr.name} if expr.name is not None else set()
+    names = set()
+    for child in expr.children:
+        names |= referenced_names(child)
+    return names
+
+
+def _fold_atom(atom: Atom, bound: Optional[int]) -> Expr:
+    """Fold a leaf to a constant when its result does not depend on the hand."""
+    if atom.op == '>=':
+        if atom.value <= 0:
+            return True
+        if bound is not None and atom.value > bound:
+            return False
+    else:
+        if atom.value < 0 or (bound is not None and atom.value > bound):
+            return False
+        if bound == 0 and atom.value == 0:
+            return True
+    return atom
+
+
+def simplify(expr: Expr, bounds: Callable[[Optional[str]], Optional[int]]) -> Expr:
+    """
+    Constant-fold and deduplicate an IR expression.
+
+    Args:
+        expr: Expression to simplify
+        bounds: Returns the largest count a name can reach in a hand (None if unbounded)
+    """
+    if isinstance(expr, bool):
+        return expr
+    if isinstance(expr, Atom):
+        return _fold_atom(expr, bounds(expr.name))
+
+    absorbing = expr.op == 'OR'  # True absorbs an OR, False absorbs an AND
+    children: List[Expr] = []
+    thresholds: Dict[Optional[str], int] = {}
+    for child in expr.children:
+        child = simplify(child, bounds)
+        if isinstance(child, Node) and child.op == expr.op:
+            grandchildren = child.children
+        else:
+            grandchildren = (child,)
+        for item in grandchildren:
+            if item is absorbing:
+                return absorbing
+            if item is (not absorbing) or item in children:
+                continue
+            if isinstance(item, Atom) and item.op == '>=':
+                # Several '>=' tests on one name: an AND needs the largest, an OR the smallest
+                current = thresholds.get(item.name)
+                if current is not None:
+                    keep = min(current, item.value) if absorbing else max(current, item.value)
+                    if keep == current:
+                        continue
+                    children.remove(Atom(item.name, '>=', current))
+                thresholds[item.name] = item.value
+            children.append(item)
+
+    if not children:
+        return not absorbing
+    if len(children) == 1:
+        return children[0]
+    return Node(expr.op, tuple(children))
+
+
+def canonical_form(expr: Expr) -> str:
+    """
+    Order-independent text form of an IR expression: equivalent expressions
+    that only differ in the order of their children give the same string.
+    """
+    if isinstance(expr, bool):
+        return 'TRUE' if expr else 'FALSE'
+    if isinstance(expr, Atom):
+        return f"{expr.name!r}{expr.op}{expr.value}"
+    return f"{expr.op}({','.join(sorted(canonical_form(child) for child in expr.children))})"
+
+
+class RuleProgram:
+    """
+    A compiled set of success conditions.
+
+    Call `evaluate(counts)` with a card name -> count mapping, or with a count
+    vector when the program was compiled with `card_ids`. During the first
+    `profile_hands` calls every branch is evaluated to measure its hit rate;
+    afterwards the branches are reordered and `evaluate` is replaced by the
+    generated short-circuiting function.
+    """
+
+    def __init__(self, branches: List[Expr], subcategory_map: Dict[str, List[str]],
+                 profile_hands: int = DEFAULT_PROFILE_HANDS, card_ids: Optional[Dict[str, int]] = None):
+        self.branches = list(branches)
+        self.subcategory_map = subcategory_map
+        self.card_ids = card_ids
+        self.hits = [0] * len(self.branches)
+        self.profiled = 0
+        self.profile_hands = profile_hands
+        self._build(profile=profile_hands > 0)
+
+    def __getstate__(self):
+        # Generated functions cannot be pickled; they are rebuilt on load
+        return {key: value for key, value in self.__dict__.items()
+                if key not in ('evaluate', '_branch_functions', 'source')}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build(profile=self.profiled < self.profile_hands)
+
+    def _build(self, profile: bool):
+        self.source = generate_source(self.branches, self.subcategory_map, self.card_ids)
+        if profile and len(self.branches) > 1:
+            self._branch_functions = [
+                _compile_source(generate_source([branch], self.subcategory_map, self.card_ids))
+                for branch in self.branches
+            ]
+            self.evaluate = self._profile
+        else:
+            self.evaluate = _compile_source(self.source)
+
+    def _profile(self, counts) -> bool:
+        """Evaluate every branch, record hits, and switch to the fast path when done."""
+        hit = False
+        for index, branch in enumerate(self._branch_functions):
+            if branch(counts):
+                self.hits[index] += 1
+                hit = True
+        self.profiled += 1
+        if self.profiled >= self.profile_hands:
+            self.reorder()
+        return hit
+
+    def reorder(self):
+        """Order branches by observed hit rate (most frequent first) and regenerate the evaluator."""
+        order = sorted(range(len(self.branches)), key=lambda i: -self.hits[i])
+        self.branches = [self.branches[i] for i in order]
+        self.hits = [self.hits[i] for i in order]
+        self.profiled = self.profile_hands
+        self._build(profile=False)
+
+
+def _compile_source(source: str) -> Callable:
+    namespace: Dict[str, Callable] = {}
+    exec(source, namespace)
+    return namespace['evaluate']
+
+
+def generate_source(branches: List[Expr], subcategory_map: Dict[str, List[str]],
+                    card_ids: Optional[Dict[str, int]] = None) -> str:
+    """
+    Generate the Python source of an evaluator for the OR of `branches`.
+
+    Each name's count is loaded into a local right before the first branch
+    that needs it, and reused by every later test of that name.
+
+    Args:
+        card_ids: When given, the evaluator reads a count vector indexed by these ids
+                  instead of a name -> count mapping
+    """
+    variables: Dict[Optional[str], str] = {}
+    lines = ["def evaluate(counts):"]
+    if card_ids is None:
+        lines.append("    get = counts.get")
+
+    def card(name: str) -> str:
+        if card_ids is None:
+            return f"get({name!r}, 0)"
+        return f"counts[{card_ids[name]}]" if name in card_ids else "0"
+
+    def load(name: Optional[str]):
+        if name in variables:
+            return
+        variable = f"v{len(variables)}"
+        variables[name] = variable
+        if name is None:
+            value = "0"
+        elif name in subcategory_map:
+            # Subcategory counts override a card of the same name, as in Simulator._evaluate_hand
+            value = " + ".join(card(member) for member in subcategory_map[name]) or "0"
+        else:
+            value = card(name)
+        lines.append(f"    {variable} = {value}")
+
+    def emit(expr: Expr) -> str:
+        if isinstance(expr, bool):
+            return repr(expr)
+        if isinstance(expr, Atom):
+            load(expr.name)
+            return f"{variables[expr.name]} {expr.op} {expr.value!r}"
+        joiner = " or " if expr.op == 'OR' else " and "
+        return "(" + joiner.join(emit(child) for child in expr.children) + ")"
+
+    for branch in branches:
+        test = emit(branch)
+        lines.append(f"    if {test}: return True")
+    lines.append("    return False")
+    return "\n".join(lines) + "\n"
+
+
+def compile_rules(conditions: List[Callable], subcategory_map: Dict[str, List[str]] = None,
+                  deck_counts: Optional[Dict[str, int]] = None,
+                  profile_hands: int = DEFAULT_PROFILE_HANDS,
+                  card_ids: Optional[Dict[str, int]] = None) -> RuleProgram:
+    """
+    Compile success conditions (any one must hold) into a RuleProgram.
+
+    Args:
+        conditions: Rule/CompositeRule conditions
+        subcategory_map: Maps subcategory names to card names
+        deck_counts: Copies of each card in the deck. When given, leaves that need
+                     more copies than the deck holds are folded away, so the program
+                     is only valid for hands drawn from that deck.
+        profile_hands: Evaluations to profile before reordering branches (0 disables it)
+        card_ids: Card name -> id; the program then evaluates count vectors
+
+    Raises:
+        ValueError: If a condition is not built from Rule/CompositeRule
+    """
+    subcategory_map = subcategory_map or {}
+
+    def bounds(name: Optional[str]) -> Optional[int]:
+        if name is None:
+            return 0
+        if deck_counts is None:
+            return None
+        if name in subcategory_map:
+            return sum(deck_counts.get(card, 0) for card in subcategory_map[name])
+        return deck_counts.get(name, 0)
+
+    root = simplify(Node('OR', tuple(lower(condition) for condition in conditions)), bounds)
+    if isinstance(root, Node) and root.op == 'OR':
+        branches = list(root.children)
+    else:
+        branches = [root]
+    return RuleProgram(branches, subcategory_map, profile_hands, card_ids)
@@ -0,0 +1,142 @@
+"""
+Shuffle-prefix deck buffer for the Yu-Gi-Oh Deck Simulator
+
+Instead of sampling a hand and then rebuilding the remaining deck for every
+simulation, the simulation loop keeps one buffer of deck positions and runs a
+lazy (partial) Fisher-Yates shuffle on it: dealing a card swaps a random
+not-yet-dealt position to the cursor and advances it. The opening hand is the
+first hand_size positions, and effect draws simply deal the next ones.
+
+Because every deal picks uniformly among the cards that have not been dealt,
+the buffer never has to be reset between simulations, and rewinding the
+cursor returns cards to the deck with the right distribution: they are mixed
+back in by the next deal's random swap.
+"""
+
+import random
+from typing import List, Iterable
+
+
+class ShuffledDeck:
+    """A reusable buffer of card ids dealt by a lazy Fisher-Yates shuffle."""
+
+    def __init__(self, card_ids: Iterable[int]):
+        self.positions: List[int] = list(card_ids)
+        self.cursor = 0
+
+    def __len__(self) -> int:
+        """Number of cards not dealt yet."""
+        return len(self.positions) - self.cursor
+
+    def reset(self):
+        """Return every card to the deck (starts a new simulation)."""
+        self.cursor = 0
+
+    def deal(self, count: int, rng=None) -> List[int]:
+        """
+        Deal the next `count` cards (fewer if the deck runs out).
+
+        Args:
+            rng: Random source (defaults to the global random module)
+
+        Returns:
+            Ids of the dealt cards, in draw order
+        """
+        positions = self.positions
+        size = len(positions)
+        start = self.cursor
+        end = min(start + count, size)
+        uniform = (rng or random).random
+        for i in range(start, end):
+            j = i + int(uniform() * (size - i))
+            positions[i], positions[j] = positions[j], positions[i]
+        self.cursor = end
+        return positions[start:end]
+
+    def take(self, card_ids: Iterable[int]):
+        """Mark specific cards as dealt (cards drawn outside the buffer, e.g. by list-based effects)."""
+        positions = self.positions
+        for card_id in card_ids:
+            j = positions.index(card_id, self.cursor)
+            positions[self.cursor], positions[j] = positions[j], positions[self.cursor]
+            self.cursor += 1
+
+    def mark(self) -> int:
+        """Current cursor, to rewind to if the cards dealt after it are put back."""
+        return self.cursor
+
+    def rewind(self, mark: int):
+        """Put every card dealt since `mark` back into the deck."""
+        self.cursor = mark
+
+
+class CommonRandomDeck(ShuffledDeck):
+    """
+    A ShuffledDeck for common random numbers across deck variants (see sweep).
+
+    Every simulation starts from the same card layout and deals with the next
+    fixed-size block of a shared uniform stream, so two decks built with the
+    same seed and aligned layouts deal the same positions in every simulation,
+    no matter how many cards earlier simulations drew. Deals beyond the block
+    use a private stream.
+    """
+
+    def __init__(self, card_ids: Iterable[int], seed: int, block_size: int, spare_seed: int):
+        super().__init__(card_ids)
+        self.layout = list(self.positions)
+        self.block_size = block_size
+        self._stream = random.Random(seed)
+        self._spare = random.Random(spare_seed)
+        self._block: List[float] = []
+        self._used = 0
+
+    def reset(self):
+        """Start a new simulation from the initial layout and the next block of shared uniforms."""
+        self.cursor = 0
+        self.positions[:] = self.layout
+        uniform = self._stream.random
+        self._block = [uniform() for _ in range(self.block_size)]
+        self._used = 0
+
+    def deal(self, count: int, rng=None) -> List[int]:
+        """Deal like ShuffledDeck.deal, from this deck's own uniforms (`rng` is ignored)."""
+        positions = self.positions
+        size = len(positions)
+        start = self.cursor
+        end = min(start + count, size)
+        block = self._block
+        used = self._used
+        for i in range(start, end):
+            uniform = block[used] if used < self.block_size else self._spare.random()
+            used += 1
+            j = i + int(uniform * (size - i))
+            positions[i], positions[j] = positions[j], positions[i]
+        self._used = used
+        self.cursor = end
+        return positions[start:end]
+
+
+# Largest float below 1: mirrored uniforms stay in [0, 1)
+_BELOW_ONE = 1.0 - 2.0 ** -53
+
+
+class AntitheticDeck(CommonRandomDeck):
+    """
+    A CommonRandomDeck that deals simulations in antithetic pairs: the second
+    simulation of each pair uses the mirrored uniforms (1 - u) of the first,
+    so the pair's positions are negatively correlated.
+    """
+
+    def __init__(self, card_ids: Iterable[int], seed: int, block_size: int, spare_seed: int):
+        super().__init__(card_ids, seed, block_size, spare_seed)
+        self._mirror = False
+
+    def reset(self):
+        if not self._mirror:
+            super().reset()
+        else:
+            self.cursor = 0
+            self.positions[:] = self.layout
+            self._block = [_BELOW_ONE - uniform for uniform in self._block]
+            self._used = 0
+        self._mirror = not self._mirror
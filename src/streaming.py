@@ -0,0 +1,162 @@
+"""
+Progressive simulation runs for the Yu-Gi-Oh Deck Simulator
+
+stream_run runs a simulation shard by shard (see parallel) and yields a
+running estimate after every shard: hands completed, success rate, confidence
+interval and throughput. The last item carries the full SimulationResult.
+
+The shard layout and seeds are the same as in run_sharded, so with the default
+interval a seeded stream ends with exactly the result of Simulator.run(seed=...).
+Closing the generator early (e.g. when the client disconnects) stops the run
+after the shard in progress.
+"""
+
+import os
+import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Dict, Callable, Optional, Iterator, Union
+
+from deck_sim import Simulator, SimulationResult, ENGINES
+from hand_records import RecordFilter
+from parallel import DEFAULT_SHARD_SIZE, derive_seed, shard_sizes, merge_results, _run_shard
+from confidence import wilson_interval
+
+
+@dataclass
+class Progress:
+    """Running estimate of a streamed simulation."""
+    completed: int  # Hands simulated so far
+    total: int  # Hands requested
+    success_count: int
+    success_rate: float  # %
+    ci_low: float  # Confidence interval of the success rate (%)
+    ci_high: float
+    confidence: float
+    elapsed: float  # Seconds since the run started
+    hands_per_second: float
+    result: Optional[SimulationResult] = None  # Set on the final item only
+
+
+def _progress(successes: int, completed: int, total: int, confidence: float, elapsed: float) -> Progress:
+    low, high = wilson_interval(successes, completed, confidence)
+    return Progress(
+        completed=completed,
+        total=total,
+        success_count=successes,
+        success_rate=(successes / completed) * 100.0 if completed else 0.0,
+        ci_low=low * 100.0,
+        ci_high=high * 100.0,
+        confidence=confidence,
+        elapsed=elapsed,
+        hands_per_second=completed / elapsed if elapsed > 0 else 0.0,
+    )
+
+
+def stream_run(simulator: Simulator, simulations: int, hand_size: int, conditions: List[Callable],
+               record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000, engine: str = 'python',
+               seed: Optional[int] = None, workers: Optional[int] = 1, confidence: float = 0.95,
+               target_precision: Optional[float] = None, time_budget: Optional[float] = None,
+               interval: int = DEFAULT_SHARD_SIZE, executor: Optional[Executor] = None,
+               objectives: Optional[Dict[str, List[Callable]]] = None,
+               brick_summary: bool = False, histograms: bool = False,
+               card_impact: bool = False) -> Iterator[Progress]:
+    """
+    Run a simulation and yield a Progress after every `interval` hands.
+
+    Args:
+        seed: Run seed. A random one is chosen (and reported in the result) when None.
+        workers: Processes to run shards on (None uses every core); with several
+                 workers, progress arrives once per shard as each wave finishes
+        target_precision: Stop early once the CI half-width is at most this many percentage points
+        time_budget: Stop early once this many seconds have been spent
+        interval: Hands per shard, i.e. between two progress updates
+        executor: Shared process pool to run every shard on (`workers` shards at a time).
+                  Its pending shards are cancelled when the stream is closed, but it is
+                  not shut down.
+        objectives: Named condition lists counted on the same hands (see Simulator.run)
+        brick_summary: Summarize the bricked hands (see Simulator.run)
+        histograms: Count cards and subcategories per hand (see Simulator.run)
+        card_impact: Count successes by opened card (see Simulator.run)
+
+    Yields:
+        Progress items; the last one has `result` set
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if target_precision is not None and target_precision <= 0:
+        raise ValueError("Target precision must be positive")
+    if time_budget is not None and time_budget <= 0:
+        raise ValueError("Time budget must be positive")
+    if interval <= 0:
+        raise ValueError("Progress interval must be positive")
+    if (objectives or brick_summary or histograms or card_impact) and engine == 'exact':
+        raise ValueError("Objectives, brick summaries, histograms and card impact need plain random sampling "
+                         "with a sampled engine")
+
+    start = time.perf_counter()
+    if engine == 'exact':
+        result = simulator.calculate(hand_size, conditions)
+        progress = _progress(result.success_count, result.total_simulations, result.total_simulations,
+                             confidence, time.perf_counter() - start)
+        progress.result = result
+        yield progress
+        return
+
+    if seed is None:
+        seed = random.getrandbits(63)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    sizes = shard_sizes(simulations, interval)
+    tasks = [
+        (simulator, n, hand_size, conditions, record_hands, max_hand_records, engine, derive_seed(seed, index),
+         objectives, brick_summary, histograms, card_impact)
+        for index, n in enumerate(sizes)
+    ]
+
+    results: List[SimulationResult] = []
+    completed = 0
+    successes = 0
+    own_executor = None
+    if executor is None and workers > 1 and len(tasks) > 1:
+        executor = own_executor = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
+    futures = []
+    try:
+        wave = max(1, workers) if executor is not None else 1
+        for first in range(0, len(tasks), wave):
+            if executor is not None:
+                futures = [executor.submit(_run_shard, *task) for task in tasks[first:first + wave]]
+                wave_results = (future.result() for future in futures)
+            else:
+                wave_results = (_run_shard(*task) for task in tasks[first:first + wave])
+
+            stop = False
+            for result in wave_results:
+                results.append(result)
+                completed += result.total_simulations
+                successes += result.success_count
+                progress = _progress(successes, completed, simulations, confidence, time.perf_counter() - start)
+                yield progress
+
+                if target_precision is not None and (progress.ci_high - progress.ci_low) / 2 <= target_precision:
+                    stop = True
+                if time_budget is not None and progress.elapsed >= time_budget:
+                    stop = True
+            if stop:
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+        if own_executor is not None:
+            own_executor.shutdown(wait=False, cancel_futures=True)
+
+    merged = merge_results(results, max_hand_records, seed)
+    merged.seed = seed
+    low, high = wilson_interval(merged.success_count, merged.total_simulations, confidence)
+    merged.ci_low, merged.ci_high, merged.confidence = low * 100.0, high * 100.0, confidence
+
+    final = _progress(successes, completed, simulations, confidence, time.perf_counter() - start)
+    final.result = merged
+    yield final
@@ -0,0 +1,252 @@
+"""
+Parameter sweeps for the Yu-Gi-Oh Deck Simulator
+
+A sweep evaluates a grid of deck variants (card counts, hand size, effect
+parameters) in one call, using common random numbers: every variant deals
+from the same shared uniform stream (see shuffled_deck.CommonRandomDeck), and
+the variants' decks are laid out so that each card keeps its positions
+across the grid. Simulation i therefore deals the same deck positions for
+every variant, and two variants only see different cards where their decks
+actually differ (e.g. the slot of a third Tenki holds a blank card in the
+two-copy variant).
+
+Each variant's own rate is as accurate as an independent run, but the
+differences between variants are much less noisy: most hands succeed or fail
+for both, and only the hands that the change affects contribute to the
+difference. Every point reports its difference to the first (baseline) point
+with a paired confidence interval.
+"""
+
+import copy
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import product
+from typing import List, Dict, Callable, Optional, Any, Tuple
+
+from deck_sim import Deck, Simulator, SimulationResult
+from card_index import FILLER_CARD
+from shuffled_deck import CommonRandomDeck
+from parallel import derive_seed
+from confidence import wilson_interval, paired_difference_interval
+
+
+CARD_COUNT = 'card_count'
+HAND_SIZE = 'hand_size'
+EFFECT_PARAMETER = 'effect_parameter'
+AXIS_KINDS = (CARD_COUNT, HAND_SIZE, EFFECT_PARAMETER)
+
+# Largest grid evaluated in one sweep
+MAX_SWEEP_POINTS = 256
+# Shared uniforms per simulation beyond the largest hand, for effect draws
+EFFECT_DRAW_BLOCK = 16
+# Name Deck gives to the cards that fill up the deck
+BLANK_CARD = FILLER_CARD
+
+
+@dataclass
+class SweepAxis:
+    """One dimension of a sweep: the values to try for a card count, the hand size or an effect parameter."""
+    kind: str
+    values: List[Any]
+    card_name: Optional[str] = None
+    parameter: Optional[str] = None  # Effect attribute, for EFFECT_PARAMETER axes
+
+    @property
+    def label(self) -> str:
+        if self.kind == HAND_SIZE:
+            return HAND_SIZE
+        if self.kind == EFFECT_PARAMETER:
+            return f"{self.card_name}.{self.parameter}"
+        return self.card_name
+
+
+@dataclass
+class Variant:
+    """A complete configuration to evaluate: deck contents and size, hand size and card effects."""
+    values: Dict[str, Any]  # Labels reported with its result
+    contents: Dict[str, int]
+    deck_size: int
+    hand_size: int
+    card_effects: Dict[str, Any]
+
+
+@dataclass
+class SweepPoint:
+    """Result of one grid point."""
+    values: Dict[str, Any]  # Axis label -> value
+    result: SimulationResult
+    # Success rate minus the baseline's (first point), in percentage points, with its paired interval
+    difference: float = 0.0
+    difference_low: float = 0.0
+    difference_high: float = 0.0
+
+
+@dataclass
+class SweepResult:
+    """Results of a whole sweep, in grid order (the last axis varies fastest)."""
+    points: List[SweepPoint] = field(default_factory=list)
+    seed: Optional[int] = None
+    confidence: float = 0.95
+
+
+def _validate_axes(simulator: Simulator, axes: List[SweepAxis]):
+    for axis in axes:
+        if axis.kind not in AXIS_KINDS:
+            raise ValueError(f"Unknown sweep axis: {axis.kind}")
+        if not axis.values:
+            raise ValueError(f"Sweep axis '{axis.label}' has no values")
+        if axis.kind == CARD_COUNT:
+            if not axis.card_name:
+                raise ValueError("Card count axes need a card name")
+            if any(not isinstance(value, int) or value < 0 for value in axis.values):
+                raise ValueError(f"Card counts for '{axis.card_name}' must be non-negative integers")
+        elif axis.kind == HAND_SIZE:
+            if any(not isinstance(value, int) or value < 0 for value in axis.values):
+                raise ValueError("Hand sizes must be non-negative integers")
+        else:
+            effect = simulator.card_effects.get(axis.card_name)
+            if effect is None:
+                raise ValueError(f"'{axis.card_name}' has no card effect to sweep")
+            if axis.parameter not in vars(effect):
+                raise ValueError(f"{type(effect).__name__} has no parameter '{axis.parameter}'")
+
+
+def aligned_decks(deck_sizes: List[int], variants: List[Dict[str, int]]) -> List[Deck]:
+    """
+    Decks for several card-count variants with matching layouts: each card
+    name owns the same positions in every deck (as many as its largest count),
+    and a variant with fewer copies has blanks in the unused ones.
+    """
+    names = list(dict.fromkeys(name for contents in variants for name in contents))
+    most = {name: max(contents.get(name, 0) for contents in variants) for name in names}
+
+    decks = []
+    for deck_size, contents in zip(deck_sizes, variants):
+        deck = Deck(deck_size, contents)
+        cards = []
+        for name in names:
+            count = contents.get(name, 0)
+            cards.extend([name] * count + [BLANK_CARD] * (most[name] - count))
+        # Pad with blanks, or drop unused slots from the end to the deck's real size
+        cards.extend([BLANK_CARD] * (deck.deck_size - len(cards)))
+        for position in range(len(cards) - 1, -1, -1):
+            if len(cards) == deck.deck_size:
+                break
+            if cards[position] == BLANK_CARD:
+                del cards[position]
+        deck.cards = cards
+        decks.append(deck)
+    return decks
+
+
+def _run_variant(simulator: Simulator, simulations: int, hand_size: int, conditions: List[Callable],
+                 engine: str, seed: int, block_size: int, index: int) -> Tuple[SimulationResult, bytearray]:
+    """Process pool entry point: run one variant on the shared random stream."""
+    if engine == 'exact':
+        return simulator.calculate(hand_size, conditions), bytearray()
+    deck_buffer = CommonRandomDeck(simulator.deck_ids, seed, block_size, derive_seed(seed, index))
+    outcomes = bytearray()
+    result = simulator._run_engine(simulations, hand_size, conditions, engine='python', seed=seed,
+                                   deck_buffer=deck_buffer, outcomes=outcomes)
+    return result, outcomes
+
+
+def run_sweep(simulator: Simulator, simulations: int, hand_size: int, conditions: List[Callable],
+              axes: List[SweepAxis], seed: Optional[int] = None, engine: str = 'python',
+              workers: Optional[int] = 1, confidence: float = 0.95) -> SweepResult:
+    """
+    Evaluate every combination of the axes' values on common random numbers.
+
+    Args:
+        simulator: Base configuration; axes override its card counts, hand size or effect parameters
+        simulations: Hands per grid point
+        axes: Sweep dimensions
+        seed: Seed of the shared random stream (a random one is chosen and reported when None)
+        engine: 'python' (sampled) or 'exact'
+        workers: Processes to spread the grid points over (None uses every core)
+
+    Returns:
+        SweepResult with one point per combination, the first one being the baseline
+    """
+    if engine not in ('python', 'exact'):
+        raise ValueError("Sweeps support the 'python' and 'exact' engines")
+    _validate_axes(simulator, axes)
+    grid = list(product(*(axis.values for axis in axes)))
+    if len(grid) > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep has {len(grid)} points, the maximum is {MAX_SWEEP_POINTS}")
+
+    base_contents = dict(simulator.deck.contents)
+    variants = []
+    for combination in grid:
+        contents, size, effects = dict(base_contents), hand_size, dict(simulator.card_effects)
+        for axis, value in zip(axes, combination):
+            if axis.kind == CARD_COUNT:
+                contents[axis.card_name] = value
+            elif axis.kind == HAND_SIZE:
+                size = value
+            else:
+                effect = copy.copy(effects[axis.card_name])
+                setattr(effect, axis.parameter, value)
+                effects[axis.card_name] = effect
+        values = {axis.label: value for axis, value in zip(axes, combination)}
+        variants.append(Variant(values, contents, simulator.deck.deck_size, size, effects))
+
+    return run_variants(simulator, variants, simulations, conditions, seed=seed, engine=engine,
+                        workers=workers, confidence=confidence)
+
+
+def run_variants(simulator: Simulator, variants: List[Variant], simulations: int, conditions: List[Callable],
+                 seed: Optional[int] = None, engine: str = 'python', workers: Optional[int] = 1,
+                 confidence: float = 0.95) -> SweepResult:
+    """
+    Evaluate arbitrary variants of a configuration on common random numbers.
+
+    Args:
+        simulator: Base configuration (subcategories and hand cache settings)
+        variants: Configurations to evaluate; the first one is the baseline of the differences
+        seed: Seed of the shared random stream (a random one is chosen and reported when None)
+        engine: 'python' (sampled) or 'exact'
+        workers: Processes to spread the variants over (None uses every core)
+    """
+    if seed is None:
+        seed = random.getrandbits(63)
+
+    decks = aligned_decks([variant.deck_size for variant in variants],
+                          [variant.contents for variant in variants])
+    block_size = max(variant.hand_size for variant in variants) + EFFECT_DRAW_BLOCK
+    tasks = [
+        (Simulator(deck, simulator.subcategory_map, variant.card_effects, hand_cache_size=simulator.hand_cache_size),
+         simulations, variant.hand_size, conditions, engine, seed, block_size, index)
+        for index, (deck, variant) in enumerate(zip(decks, variants))
+    ]
+
+    if workers is None or workers > 1:
+        with ProcessPoolExecutor(max_workers=workers and min(workers, len(tasks))) as executor:
+            outputs = list(executor.map(_run_variant, *zip(*tasks)))
+    else:
+        outputs = [_run_variant(*task) for task in tasks]
+
+    sweep = SweepResult(seed=seed if engine != 'exact' else None, confidence=confidence)
+    baseline_result, baseline_outcomes = outputs[0]
+    for variant, (result, outcomes) in zip(variants, outputs):
+        low, high = wilson_interval(result.success_count, result.total_simulations, confidence)
+        result.ci_low, result.ci_high, result.confidence = low * 100.0, high * 100.0, confidence
+        if engine == 'exact':
+            difference = result.success_rate - baseline_result.success_rate
+            difference_low = difference_high = difference
+        else:
+            result.seed = seed
+            first_only = sum(map(int.__gt__, outcomes, baseline_outcomes))
+            baseline_only = sum(map(int.__lt__, outcomes, baseline_outcomes))
+            difference, difference_low, difference_high = (
+                value * 100.0 for value in
+                paired_difference_interval(first_only, baseline_only, simulations, confidence))
+        sweep.points.append(SweepPoint(
+            values=variant.values,
+            result=result,
+            difference=difference,
+            difference_low=difference_low,
+            difference_high=difference_high,
+        ))
+    return sweep
@@ -0,0 +1,377 @@
+"""
+Variance reduction for the Yu-Gi-Oh Deck Simulator
+
+Alternatives to plain random sampling in Simulator.run:
+
+Stratified sampling: cards are grouped into classes by the rule-relevant names
+they count towards (the card itself, its subcategories, effect cards and
+discard filters); copies in one class are interchangeable for every rule and
+effect. The number of cards of each class in the opening hand follows a known
+multivariate hypergeometric distribution, so every such composition (a
+stratum) gets its exact probability, hands are allocated to strata in
+proportion to it, and the strata's success rates are combined with those
+weights. A stratum whose outcome is fixed by its composition (no effect card
+in it, and no class left out of the strata) needs one hand and has no
+variance; every other stratum gets at least two, so its variance is measured.
+The run then has exactly `simulations` hands, and the number of strata is
+capped at half of them: classes are added largest first, and a class that
+would push the count past the cap is dropped and sampled with the rest of the
+deck. Only the effect draws and those dropped classes remain random, so decks
+without effects come out exact when all their classes fit.
+
+Antithetic sampling: simulations are dealt in pairs, the second one using the
+mirrored uniforms of the first (see shuffled_deck.AntitheticDeck), and the
+variance is estimated from the pair means.
+
+Importance sampling, for rare success conditions: a stratified pilot run
+estimates each stratum's success rate, and the main run draws strata from a
+proposal tilted towards the ones that succeed (in proportion to probability
+times the square root of the pilot's rate), mixed with a defensive share of
+the true probabilities. Each hand is weighted by its likelihood ratio (true
+over proposal probability of its stratum), which keeps the estimate unbiased
+and the weights bounded.
+
+All of them report the variance reduction factor: the variance plain sampling
+would have with as many hands, divided by the variance actually achieved.
+"""
+
+import random
+from math import comb
+from typing import List, Callable, Optional, Tuple, Union
+
+from deck_sim import Simulator, SimulationResult
+from hand_records import RecordFilter
+from shuffled_deck import ShuffledDeck, AntitheticDeck
+from parallel import derive_seed
+from confidence import z_score
+
+
+# Most strata to stratify on (classes that would exceed it are skipped, see strata)
+MAX_STRATA = 5_000
+# Fewest simulations a variance-reduced run measures its own variance from
+MIN_SIMULATIONS = 4
+# Shared uniforms per simulation beyond the hand, for effect draws (antithetic pairs)
+EFFECT_DRAW_BLOCK = 16
+# Share of the simulations spent on the importance sampling pilot
+PILOT_SHARE = 0.1
+# Share of the importance sampling proposal that follows the true stratum probabilities
+DEFENSIVE_SHARE = 0.1
+
+
+def card_classes(simulator: Simulator, conditions: List[Callable]) -> Tuple[List[List[int]], List[int]]:
+    """
+    Group the deck's cards by the rule-relevant names they count towards.
+
+    Returns:
+        (classes, rest): card ids (one entry per copy) of each relevant class,
+        largest first, and of the cards no rule or effect looks at
+    """
+    from rule_compiler import lower, referenced_names
+
+    index = simulator.card_index
+    try:
+        relevant = set()
+        for condition in conditions:
+            relevant |= referenced_names(lower(condition))
+    except ValueError:
+        # Custom conditions may look at anything
+        relevant = set(index.names) | set(index.tags)
+    for card, effect in simulator.card_effects.items():
+        relevant.add(card)
+        discard_filter = getattr(effect, 'discard_filter', None)
+        if discard_filter:
+            relevant.add(discard_filter)
+
+    classes = {}
+    rest = []
+    for card_id in simulator.deck_ids:
+        signature = frozenset(
+            ([index.names[card_id]] if index.names[card_id] in relevant else [])
+            + [index.tags[tag_id] for tag_id in index.card_tags[card_id] if index.tags[tag_id] in relevant])
+        if signature:
+            classes.setdefault(signature, []).append(card_id)
+        else:
+            rest.append(card_id)
+    return sorted(classes.values(), key=len, reverse=True), rest
+
+
+def _compositions(sizes: List[int], rest_size: int, hand_size: int, limit: Optional[int] = None):
+    """Hand compositions (cards per class) that fit the class sizes; None once more than `limit`."""
+    found = []
+
+    def extend(prefix, remaining):
+        if limit is not None and len(found) > limit:
+            return
+        if len(prefix) == len(sizes):
+            if remaining <= rest_size:
+                found.append(tuple(prefix))
+            return
+        for count in range(min(sizes[len(prefix)], remaining) + 1):
+            extend(prefix + [count], remaining - count)
+
+    extend([], hand_size)
+    return None if limit is not None and len(found) > limit else found
+
+
+def strata(simulator: Simulator, conditions: List[Callable], hand_size: int,
+           max_strata: int = MAX_STRATA) -> Tuple[List[List[int]], List[int], List[Tuple[int, ...]], List[float]]:
+    """
+    Choose the classes to stratify on and enumerate their strata. Classes are
+    tried largest first; one whose strata would exceed max_strata is skipped.
+
+    Returns:
+        (classes, rest, compositions, probabilities); cards of classes that were
+        dropped to stay within max_strata are part of rest
+    """
+    classes, rest = card_classes(simulator, conditions)
+    chosen: List[List[int]] = []
+    compositions = [()]
+    for card_ids in classes:
+        trial = _compositions([len(c) for c in chosen] + [len(card_ids)],
+                              len(rest) + sum(len(c) for c in classes) - sum(len(c) for c in chosen) - len(card_ids),
+                              hand_size, max_strata)
+        if trial is None:
+            continue
+        chosen.append(card_ids)
+        compositions = trial
+    rest = rest + [card_id for card_ids in classes if not any(card_ids is c for c in chosen) for card_id in card_ids]
+    if not chosen:
+        compositions = _compositions([], len(rest), hand_size)
+
+    total = comb(len(simulator.deck_ids), hand_size)
+    probabilities = []
+    for counts in compositions:
+        ways = comb(len(rest), hand_size - sum(counts))
+        for card_ids, count in zip(chosen, counts):
+            ways *= comb(len(card_ids), count)
+        probabilities.append(ways / total)
+    return chosen, rest, compositions, probabilities
+
+
+def fixed_strata(simulator: Simulator, conditions: List[Callable], classes: List[List[int]],
+                 rest: List[int], compositions: List[Tuple[int, ...]]) -> List[bool]:
+    """
+    Which strata have an outcome fixed by their composition: none when a
+    relevant class was dropped into rest, otherwise those without effect cards.
+    """
+    _, irrelevant = card_classes(simulator, conditions)
+    if len(rest) > len(irrelevant):
+        return [False] * len(compositions)
+    names = simulator.card_index.names
+    effect_classes = [i for i, card_ids in enumerate(classes)
+                      if any(names[card_id] in simulator.card_effects for card_id in card_ids)]
+    return [not any(counts[i] for i in effect_classes) for counts in compositions]
+
+
+def _check_size(simulations: int):
+    if simulations < MIN_SIMULATIONS:
+        raise ValueError(f"Variance-reduced sampling needs at least {MIN_SIMULATIONS} simulations")
+
+
+class StratifiedDeck(ShuffledDeck):
+    """
+    A ShuffledDeck whose opening hands follow a schedule of strata: each
+    simulation's hand holds exactly the stratum's number of cards from every
+    class (chosen uniformly within the class), and effect draws deal from the
+    rest of the deck as usual.
+    """
+
+    def __init__(self, classes: List[List[int]], rest: List[int], compositions: List[Tuple[int, ...]],
+                 schedule: List[int], hand_size: int, rng: random.Random):
+        super().__init__([card_id for card_ids in classes for card_id in card_ids] + rest)
+        self.layout = list(self.positions)
+        self.ranges = []
+        start = 0
+        for card_ids in classes + [rest]:
+            self.ranges.append((start, start + len(card_ids)))
+            start += len(card_ids)
+        self.compositions = compositions
+        self.schedule = schedule
+        self.hand_size = hand_size
+        self.rng = rng
+        self._next = 0
+
+    def reset(self):
+        """Deal the next scheduled stratum's hand to the front of the deck."""
+        counts = self.compositions[self.schedule[self._next]]
+        self._next += 1
+        counts = counts + (self.hand_size - sum(counts),)
+        layout = self.layout
+        uniform = self.rng.random
+        hand, remaining = [], []
+        for (start, end), count in zip(self.ranges, counts):
+            cards = layout[start:end]
+            size = len(cards)
+            for i in range(count):
+                j = i + int(uniform() * (size - i))
+                cards[i], cards[j] = cards[j], cards[i]
+            hand.extend(cards[:count])
+            remaining.extend(cards[count:])
+        self.positions[:] = hand + remaining
+        self.cursor = 0
+
+    def deal(self, count: int, rng=None) -> List[int]:
+        if self.cursor == 0 and count == self.hand_size:
+            self.cursor = count
+            return self.positions[:count]
+        return super().deal(count, rng)
+
+
+def _finish(result: SimulationResult, estimate: float, variance: float, simulations: int,
+            confidence: float, seed: int, exact: bool = False) -> SimulationResult:
+    """Replace the plain counts of a run by the variance-reduced estimate and its interval."""
+    result.success_rate = estimate * 100.0
+    result.brick_rate = (1 - estimate) * 100.0
+    result.success_count = round(estimate * simulations)
+    result.brick_count = simulations - result.success_count
+    half_width = z_score(confidence) * variance ** 0.5
+    result.ci_low = max(0.0, estimate - half_width) * 100.0
+    result.ci_high = min(1.0, estimate + half_width) * 100.0
+    result.confidence = confidence
+    result.seed = seed
+    if variance > 0:
+        result.variance_reduction = estimate * (1 - estimate) / simulations / variance
+    elif exact and 0 < estimate < 1:
+        result.warnings.append("The opening hand's card counts fully determine success, "
+                               "so this result has no sampling error.")
+    return result
+
+
+def _run_proportional(simulator: Simulator, simulations: int, hand_size: int, conditions: List[Callable],
+                      classes: List[List[int]], rest: List[int], compositions: List[Tuple[int, ...]],
+                      probabilities: List[float], fixed: List[bool], rng: random.Random, seed: int,
+                      record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000):
+    """
+    Run exactly `simulations` hands: one per fixed stratum and two per other
+    stratum, then the rest in proportion to the probabilities (largest remainders).
+    At most simulations // 2 strata are expected.
+
+    Returns:
+        (result, hands per stratum, successes per stratum)
+    """
+    allocation = [1 if is_fixed else 2 for is_fixed in fixed]
+    spare = simulations - sum(allocation)
+    shares = [spare * p for p in probabilities]
+    for s, share in enumerate(shares):
+        allocation[s] += int(share)
+    by_remainder = sorted(range(len(shares)), key=lambda s: shares[s] - int(shares[s]), reverse=True)
+    for s in by_remainder[:simulations - sum(allocation)]:
+        allocation[s] += 1
+    schedule = [s for s, n in enumerate(allocation) for _ in range(n)]
+    rng.shuffle(schedule)
+
+    deck_buffer = StratifiedDeck(classes, rest, compositions, schedule, hand_size, rng)
+    outcomes = bytearray()
+    result = simulator._run_engine(len(schedule), hand_size, conditions, record_hands, max_hand_records,
+                                   engine='python', seed=seed, deck_buffer=deck_buffer, outcomes=outcomes)
+
+    successes = [0] * len(compositions)
+    for s, outcome in zip(schedule, outcomes):
+        successes[s] += outcome
+    return result, allocation, successes
+
+
+def run_stratified(simulator: Simulator, simulations: int, hand_size: int, conditions: List[Callable],
+                   record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000,
+                   seed: Optional[int] = None, confidence: float = 0.95) -> SimulationResult:
+    """Run `simulations` hands with proportional stratified sampling (over at most simulations // 2 strata)."""
+    _check_size(simulations)
+    if hand_size > len(simulator.deck_ids) or hand_size < 0:
+        raise ValueError("Sample larger than population or is negative")
+    if seed is None:
+        seed = random.getrandbits(63)
+    rng = random.Random(seed)
+
+    classes, rest, compositions, probabilities = strata(simulator, conditions, hand_size,
+                                                        min(MAX_STRATA, simulations // 2))
+    fixed = fixed_strata(simulator, conditions, classes, rest, compositions)
+    result, allocation, successes = _run_proportional(
+        simulator, simulations, hand_size, conditions, classes, rest, compositions, probabilities,
+        fixed, rng, derive_seed(seed, 0), record_hands, max_hand_records)
+    estimate = sum(p * k / n for p, n, k in zip(probabilities, allocation, successes))
+    # The within-stratum variance is pooled over the strata that are not fixed: a stratum
+    # that never (or always) succeeded in its few hands borrows it from the others
+    measured = [(p, n, k) for p, n, k, is_fixed in zip(probabilities, allocation, successes, fixed) if not is_fixed]
+    degrees = sum(n - 1 for _, n, _ in measured)
+    pooled = sum(k * (n - k) / n for _, n, k in measured) / degrees if degrees else 0.0
+    variance = sum(p * p * pooled / n for p, n, _ in measured)
+    result = _finish(result, estimate, variance, simulations, confidence, seed, exact=not measured)
+    if measured and not pooled and 0 < estimate < 1:
+        result.warnings.append("No hand's outcome varied within a stratum, so the interval "
+                               "does not cover the effect draws' sampling error.")
+    return result
+
+
+def run_antithetic(simulator: Simulator, simulations: int, hand_size: int, conditions: List[Callable],
+                   record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000,
+                   seed: Optional[int] = None, confidence: float = 0.95) -> SimulationResult:
+    """Run `simulations` hands (rounded up to an even number) as antithetic pairs."""
+    _check_size(simulations)
+    if seed is None:
+        seed = random.getrandbits(63)
+    pairs = (simulations + 1) // 2
+    deck_buffer = AntitheticDeck(simulator.deck_ids, seed, hand_size + EFFECT_DRAW_BLOCK, derive_seed(seed, 1))
+    outcomes = bytearray()
+    result = simulator._run_engine(2 * pairs, hand_size, conditions, record_hands, max_hand_records,
+                                   engine='python', seed=derive_seed(seed, 0), deck_buffer=deck_buffer,
+                                   outcomes=outcomes)
+
+    means = [(outcomes[i] + outcomes[i + 1]) / 2 for i in range(0, 2 * pairs, 2)]
+    estimate = sum(means) / pairs
+    spread = sum((m - estimate) ** 2 for m in means) / (pairs - 1)
+    return _finish(result, estimate, spread / pairs, 2 * pairs, confidence, seed)
+
+
+def run_importance(simulator: Simulator, simulations: int, hand_size: int, conditions: List[Callable],
+                   record_hands: Union[bool, RecordFilter] = False, max_hand_records: int = 10_000,
+                   seed: Optional[int] = None, confidence: float = 0.95) -> SimulationResult:
+    """
+    Run `simulations` hands with importance sampling over the strata: a pilot
+    of PILOT_SHARE of the hands tunes the proposal, and the estimate comes from
+    the remaining hands alone (so it does not depend on the tuning). The pilot
+    still counts towards total_simulations and the variance reduction, since
+    its hands were spent on the run.
+    """
+    _check_size(simulations)
+    if hand_size > len(simulator.deck_ids) or hand_size < 0:
+        raise ValueError("Sample larger than population or is negative")
+    if seed is None:
+        seed = random.getrandbits(63)
+    rng = random.Random(seed)
+
+    pilot_size = max(2, int(simulations * PILOT_SHARE))
+    classes, rest, compositions, probabilities = strata(simulator, conditions, hand_size,
+                                                        min(MAX_STRATA, pilot_size // 2))
+    fixed = fixed_strata(simulator, conditions, classes, rest, compositions)
+    pilot, allocation, successes = _run_proportional(
+        simulator, pilot_size, hand_size, conditions, classes, rest, compositions, probabilities,
+        fixed, rng, derive_seed(seed, 1))
+
+    # Tilt towards strata that succeed; the shrunk rate keeps every stratum reachable
+    tilted = [p * ((k + 0.5) / (n + 1)) ** 0.5 for p, n, k in zip(probabilities, allocation, successes)]
+    total = sum(tilted)
+    proposal = [DEFENSIVE_SHARE * p + (1 - DEFENSIVE_SHARE) * t / total
+                for p, t in zip(probabilities, tilted)]
+    weights = [p / q for p, q in zip(probabilities, proposal)]
+
+    main_size = simulations - pilot_size
+    schedule = rng.choices(range(len(compositions)), weights=proposal, k=main_size)
+    deck_buffer = StratifiedDeck(classes, rest, compositions, schedule, hand_size, rng)
+    outcomes = bytearray()
+    result = simulator._run_engine(main_size, hand_size, conditions, record_hands, max_hand_records,
+                                   engine='python', seed=derive_seed(seed, 0), deck_buffer=deck_buffer,
+                                   outcomes=outcomes)
+
+    weighted = [weights[s] * outcome for s, outcome in zip(schedule, outcomes)]
+    estimate = sum(weighted) / main_size
+    spread = sum((w - estimate) ** 2 for w in weighted) / (main_size - 1)
+    result.total_simulations = simulations
+    result.max_depth_reached_count += pilot.max_depth_reached_count
+    result = _finish(result, min(estimate, 1.0), spread / main_size, simulations, confidence, seed)
+    if estimate == 0:
+        # Hands succeed under the proposal at least DEFENSIVE_SHARE times as often as under the
+        # true distribution, which bounds the rate when none of them did
+        upper = (1 - (1 - confidence) ** (1 / main_size)) / DEFENSIVE_SHARE
+        result.ci_high = min(1.0, upper) * 100.0
+        result.warnings.append("No simulated hand succeeded; the interval is an upper bound.")
+    return result
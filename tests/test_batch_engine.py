@@ -0,0 +1,150 @@
+"""
+Test suite for the vectorized NumPy batch engine
+
+Verifies that block draws are valid hands, that rule evaluation matches the
+pure-Python evaluator hand for hand, that the effect kernels agree with the
+exact engine, and that Simulator.run falls back correctly.
+"""
+
+import unittest
+import sys
+import os
+from collections import Counter
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from deck_sim import Deck, Simulator, Rule, req
+from card_effects import CardEffect, DrawEffect, ConditionalDiscardEffect, EffectContext, EffectResult
+import batch_engine
+from batch_engine import BatchEngine
+
+
+class ListOnlyEffect(CardEffect):
+    """Effect without a batch kernel"""
+
+    def apply(self, hand, remaining_deck, context):
+        return EffectResult(hand=list(hand), remaining_deck=list(remaining_deck))
+
+
+@unittest.skipUnless(batch_engine.is_available(), "NumPy is not installed")
+class TestBatchEngine(unittest.TestCase):
+    """Test the batch engine against the pure-Python path"""
+
+    def setUp(self):
+        import numpy as np
+        self.rng = np.random.default_rng(1234)
+        self.deck = Deck(40, {"Starter": 8, "Extender": 6, "Garnet": 2})
+        self.subcategory_map = {"Engine": ["Starter", "Extender"]}
+
+    def test_draw_block_is_valid_hand(self):
+        """Every drawn hand respects the deck's card counts"""
+        engine = BatchEngine(self.deck, self.subcategory_map)
+        hands = engine.draw_block(2000, 6, self.rng)
+        counts = engine.count_matrix(hands)
+
+        self.assertEqual(hands.shape, (2000, 6))
+        self.assertTrue((counts.sum(axis=1) == 6).all())
+        for name, copies in Counter(self.deck.cards).items():
+            self.assertLessEqual(int(counts[:, engine.card_ids[name]].max()), copies)
+
+    def test_evaluation_matches_python(self):
+        """Block evaluation agrees with Simulator._evaluate_hand on every hand"""
+        conditions = [
+            (req("Engine") >= 2) & Rule("Garnet", 0, '=='),
+            req("Starter") | (req("Extender") >= 2),
+            Rule("Missing", 0, '=='),
+        ]
+        sim = Simulator(self.deck, self.subcategory_map)
+        engine = BatchEngine(self.deck, self.subcategory_map)
+
+        hands = engine.draw_block(500, 5, self.rng)
+        success = engine.evaluate_block(engine.count_matrix(hands), conditions[:2])
+
+        for row in range(len(hands)):
+            hand = [engine.card_names[card] for card in hands[row]]
+            self.assertEqual(bool(success[row]), sim._evaluate_hand(hand, conditions[:2]))
+
+        # Rules on names not in the deck count zero copies
+        self.assertTrue(engine.evaluate_block(engine.count_matrix(hands), conditions[2:]).all())
+
+    def test_run_matches_python_rate(self):
+        """Batch and Python engines estimate the same success rate"""
+        sim = Simulator(self.deck, self.subcategory_map)
+        conditions = [req("Engine") >= 2]
+
+        python_result = sim.run(20000, 5, conditions, engine='python')
+        batch_result = sim.run(20000, 5, conditions, engine='batch')
+
+        self.assertEqual(batch_result.total_simulations, 20000)
+        self.assertEqual(batch_result.success_count + batch_result.brick_count, 20000)
+        self.assertAlmostEqual(batch_result.success_rate, python_result.success_rate, delta=2.0)
+
+    def test_hand_records(self):
+        """Batch runs record hands just like the Python engine"""
+        sim = Simulator(self.deck, self.subcategory_map)
+        result = sim.run(300, 5, [req("Starter")], record_hands=True, max_hand_records=100, engine='batch')
+
+        self.assertEqual(len(result.hand_records), 100)
+        for record in result.hand_records:
+            self.assertEqual(len(record.initial_hand), 5)
+            self.assertEqual(record.initial_hand, record.final_hand)
+            self.assertEqual(record.success, "Starter" in record.initial_hand)
+
+    def test_effect_kernels_match_exact_engine(self):
+        """Batched draw, smart discard and revert give the exact success rate"""
+        deck = Deck(20, {"Vision": 2, "Pot": 1, "Quick-Play": 4, "Starter": 2, "Leo": 3})
+        subcategory_map = {"quick play": ["Quick-Play", "Vision"], "luna": ["Leo"]}
+        card_effects = {
+            "Pot": DrawEffect(count=2),
+            "Vision": ConditionalDiscardEffect(draw_count=2, discard_filter="quick play", discard_count=1),
+        }
+        conditions = [req("Starter"), (req("luna") >= 2) & req("Quick-Play")]
+        sim = Simulator(deck, subcategory_map, card_effects)
+        self.assertTrue(sim.supports_batch(conditions))
+
+        exact = sim.calculate(5, conditions).success_rate / 100.0
+        simulated = sim.run(200000, 5, conditions, engine='batch', seed=11).success_rate / 100.0
+        standard_error = (exact * (1 - exact) / 200000) ** 0.5
+        self.assertLess(abs(simulated - exact), 5 * standard_error)
+
+    def test_discard_kernel_matches_apply(self):
+        """The batch kernel picks the same discard as the per-hand effect"""
+        import numpy as np
+        subcategory_map = {"quick play": ["QP B", "QP A"]}
+        deck = Deck(10, {"QP A": 3, "QP B": 3, "Blank": 4})
+        conditions = [req("QP A")]
+        engine = BatchEngine(deck, subcategory_map)
+        effect = ConditionalDiscardEffect(draw_count=0, discard_filter="quick play", discard_count=1)
+
+        hands = [["QP A", "QP B", "Blank"], ["QP A", "QP A", "QP B"], ["Blank", "Blank", "QP A"]]
+        counts = np.array([engine.index.vector(hand) for hand in hands], dtype=np.int16)
+        context = EffectContext(subcategory_map, conditions, rng=self.rng, card_index=engine.index,
+                                evaluate_batch=lambda block: engine.evaluate_block(block, conditions))
+        result = effect.apply_batch(counts, engine.deck_vector[None, :] - counts, context)
+
+        for row, hand in enumerate(hands):
+            expected = effect.apply(hand, [], EffectContext(subcategory_map, conditions))
+            self.assertEqual(engine.index.expand(result.cards_discarded[row].tolist()), expected.cards_discarded)
+            self.assertEqual(bool(result.fully_reverted[row]), expected.fully_reverted)
+
+    def test_auto_falls_back_with_effects(self):
+        """'auto' uses the Python loop for effects without a batch kernel, 'batch' refuses"""
+        sim = Simulator(self.deck, {}, {"Starter": ListOnlyEffect()})
+        self.assertFalse(sim.supports_batch([req("Extender")]))
+
+        result = sim.run(200, 5, [req("Extender")], engine='auto')
+        self.assertEqual(result.total_simulations, 200)
+
+        with self.assertRaises(ValueError):
+            sim.run(200, 5, [req("Extender")], engine='batch')
+
+    def test_unknown_engine(self):
+        """Unknown engine names are rejected"""
+        sim = Simulator(self.deck)
+        with self.assertRaises(ValueError):
+            sim.run(10, 5, [req("Starter")], engine='gpu')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Test suite for brick summaries
+"""
+
+import random
+import unittest
+import sys
+import os
+from collections import Counter
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect
+from brick_summary import FrequentItems
+
+
+class TestBrickSummary(unittest.TestCase):
+    """Test the heavy-hitter bounds, the summary against recorded bricks, merging and the API"""
+
+    def setUp(self):
+        self.deck = Deck(40, {"Starter": 8, "Extender": 6, "Ash": 3, "Pot": 2})
+        self.subcategories = {"Engine": ["Starter", "Extender"], "Hand traps": ["Ash"]}
+        self.conditions = [req("Starter") >= 1]
+
+    def test_frequent_items_bounds(self):
+        """Counts are at most `error` low, and error stays below total / (capacity + 1)"""
+        rng = random.Random(1)
+        stream = [min(int(rng.paretovariate(1.2)), 5000) for _ in range(50_000)]
+        items = FrequentItems(capacity=50)
+        for key in stream:
+            items.add(key)
+        truth = Counter(stream)
+
+        self.assertLessEqual(items.error, len(stream) / 51)
+        for key, count in items.counts.items():
+            self.assertLessEqual(count, truth[key])
+            self.assertGreaterEqual(count + items.error, truth[key])
+        for key, count in truth.items():
+            if count > items.error:
+                self.assertIn(key, items.counts)
+        self.assertEqual(items.top(1)[0][0], 1)
+
+        other = FrequentItems(capacity=50)
+        for key in stream[:1000]:
+            other.add(key)
+        items.merge(other)
+        self.assertLessEqual(len(items.counts), 50)
+
+    def test_matches_recorded_bricks(self):
+        """With few distinct hands the summary is exact: it agrees with recording every brick"""
+        deck = Deck(20, {"Starter": 4, "Ash": 3})
+        sim = Simulator(deck, {"Hand traps": ["Ash"]}, {"Ash": DrawEffect(count=1)})
+        result = sim.run(5000, 3, self.conditions, seed=2, brick_summary=True,
+                         record_hands=True, max_hand_records=5000)
+        summary = result.brick_summary
+
+        self.assertEqual(summary.bricks, result.brick_count)
+        self.assertEqual(summary.hands.error, 0)
+        recorded = Counter(tuple(sorted(r.initial_hand)) for r in result.hand_records if not r.success)
+        self.assertEqual({tuple(sorted(cards)): count for cards, count in summary.top_hands(100)}, dict(recorded))
+        profiles = Counter(r.initial_hand.count("Ash") for r in result.hand_records if not r.success)
+        self.assertEqual({p["Hand traps"]: count for p, count in summary.top_profiles(100)}, dict(profiles))
+        cards, pairs = summary.co_occurrence()
+        ash = cards.index("Ash")
+        self.assertEqual(pairs[ash][ash], sum(1 for r in result.hand_records if not r.success and "Ash" in r.initial_hand))
+
+    def test_shards_and_batch(self):
+        sim = Simulator(self.deck, self.subcategories, {"Pot": DrawEffect(count=2)})
+        serial = sim.run(20_000, 5, self.conditions, seed=4, brick_summary=True)
+        sharded = sim.run(20_000, 5, self.conditions, seed=4, workers=2, brick_summary=True)
+        self.assertEqual(sharded.brick_summary, serial.brick_summary)
+        self.assertEqual(serial.brick_summary.bricks, serial.brick_count)
+
+        from batch_engine import is_available
+        if not is_available():
+            self.skipTest("NumPy is not installed")
+        plain = Simulator(self.deck, self.subcategories)
+        batch = plain.run(20_000, 5, self.conditions, engine='batch', seed=4, brick_summary=True)
+        python = plain.run(20_000, 5, self.conditions, engine='python', seed=4, brick_summary=True)
+        for summary, result in ((batch.brick_summary, batch), (python.brick_summary, python)):
+            self.assertEqual(summary.bricks, result.brick_count)
+            self.assertEqual(summary.top_profiles(1)[0][0], {"Engine": 1, "Hand traps": 0})
+            cards, pairs = summary.co_occurrence()
+            self.assertNotIn("Starter", cards)
+            self.assertEqual(pairs, [list(row) for row in zip(*pairs)])
+
+    def test_invalid(self):
+        sim = Simulator(self.deck)
+        with self.assertRaises(ValueError):
+            sim.run(1000, 5, self.conditions, engine='exact', brick_summary=True)
+
+    def test_simulate_endpoint(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        client = TestClient(app)
+        response = client.post("/simulate", json={
+            "deck_size": 40,
+            "hand_size": 5,
+            "simulations": 5000,
+            "card_categories": [{"name": "Starter", "count": 8, "subcategories": ["Engine"]},
+                                {"name": "Ash", "count": 3, "subcategories": ["Hand traps"]}],
+            "deck_contents": {},
+            "rules": [[{"card_name": "Starter", "min_count": 1}]],
+            "brick_summary": True,
+            "brick_summary_size": 3,
+            "seed": 1,
+            "use_cache": False,
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+        summary = data['brick_summary']
+        self.assertEqual(summary['bricks'], data['brick_count'])
+        self.assertEqual(len(summary['hands']), 3)
+        self.assertEqual(summary['profiles'][0]['subcategories'], {"Engine": 0, "Hand traps": 0})
+        self.assertEqual(summary['cards'], ["Ash", "_Generic_"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -416,6 +416,17 @@ class TestCardEffects(unittest.TestCase):
 
         self.assertTrue(found_discard_case,
             "Expected Vision to discard a Quick-Play A in at least 1 of 300 trials")
+
+    def test_discard_tie_break_by_name(self):
+        """Equally good discard candidates are chosen by name, not by position in hand"""
+        subcategory_map = {"quick play": ["QP B", "QP A"]}
+        vision_effect = ConditionalDiscardEffect(draw_count=1, discard_filter="quick play", discard_count=1)
+        context = EffectContext(subcategory_map=subcategory_map, success_conditions=[])
+
+        for hand in (["QP B", "QP A", "Blank"], ["QP A", "QP B", "Blank"]):
+            result = vision_effect.apply(hand, ["Blank"], context)
+            self.assertEqual(result.cards_discarded, ["QP A"])
+
     def test_revert_returns_copies(self):
         """Test that the revert code path returns shallow copies of the original lists"""
         from deck_sim import Deck
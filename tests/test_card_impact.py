@@ -0,0 +1,92 @@
+"""
+Test suite for the per-card impact table
+"""
+
+import unittest
+import sys
+import os
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect
+
+
+class TestCardImpact(unittest.TestCase):
+    """Test the counters against per-card rules, the engines and the API"""
+
+    def setUp(self):
+        self.deck = Deck(40, {"Starter": 8, "Extender": 5, "Ash": 3, "Pot": 3})
+        self.conditions = [req("Starter") >= 1, req("Extender") >= 2]
+
+    def test_matches_per_card_rules(self):
+        """Each row agrees with counting a 'card opened' rule on the same hands"""
+        sim = Simulator(self.deck)
+        objectives = {"Success": self.conditions, "Ash": [req("Ash") >= 1], "Extender": [req("Extender") >= 1]}
+        result = sim.run(20_000, 5, self.conditions, seed=5, card_impact=True, objectives=objectives)
+        rows = {row.card: row for row in result.card_impact.table()}
+
+        for card in ("Ash", "Extender"):
+            opened = result.objectives.count(card)
+            wins = result.objectives.overlap(card, "Success")
+            row = rows[card]
+            self.assertEqual(row.opened, opened)
+            self.assertAlmostEqual(row.success_if_opened, wins / opened * 100.0)
+            self.assertAlmostEqual(row.success_if_not_opened,
+                                   (result.success_count - wins) / (20_000 - opened) * 100.0)
+            self.assertLessEqual(row.impact_low, row.impact)
+            self.assertGreaterEqual(row.impact_high, row.impact)
+        self.assertEqual(rows["Starter"].success_if_opened, 100.0)
+        # The cards filling up the deck are not a row
+        self.assertNotIn("_Generic_", rows)
+        self.assertEqual(result.card_impact.table()[0].card, "Starter")
+        self.assertNotIn("Pot", [row.card for row in Simulator(Deck(40, {"Starter": 8})).run(
+            100, 5, self.conditions, card_impact=True).card_impact.table()])
+
+    def test_effects_shards_and_batch(self):
+        sim = Simulator(self.deck, {}, {"Pot": DrawEffect(count=2)})
+        serial = sim.run(20_000, 5, self.conditions, seed=2, card_impact=True)
+        sharded = sim.run(20_000, 5, self.conditions, seed=2, workers=2, card_impact=True)
+        self.assertEqual(sharded.card_impact, serial.card_impact)
+        pot = next(row for row in serial.card_impact.table() if row.card == "Pot")
+        self.assertGreater(pot.impact_low, 0)
+
+        from batch_engine import is_available
+        if not is_available():
+            self.skipTest("NumPy is not installed")
+        plain = Simulator(self.deck)
+        batch = plain.run(20_000, 5, self.conditions, engine='batch', seed=2, card_impact=True)
+        python = plain.run(20_000, 5, self.conditions, engine='python', seed=2, card_impact=True)
+        for result in (batch, python):
+            ash = next(row for row in result.card_impact.table() if row.card == "Ash")
+            self.assertEqual(result.card_impact.successes, result.success_count)
+            self.assertLess(ash.impact_high, 0)
+            self.assertAlmostEqual(ash.opened_rate, 33.8, delta=1.5)
+
+    def test_simulate_endpoint(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        client = TestClient(app)
+        response = client.post("/simulate", json={
+            "deck_size": 40,
+            "hand_size": 5,
+            "simulations": 2000,
+            "deck_contents": {"Starter": 8, "Ash": 3},
+            "rules": [[{"card_name": "Starter", "min_count": 1}]],
+            "card_impact": True,
+            "seed": 1,
+            "use_cache": False,
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        rows = response.json()['card_impact']
+        self.assertEqual([row['card'] for row in rows][0], "Starter")
+        self.assertEqual([row['card'] for row in rows][1:], ["Ash"])
+        self.assertEqual(rows[0]['success_if_opened'], 100.0)
+        self.assertEqual(rows[0]['success_if_not_opened'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Test suite for card interning and the count-vector effect API
+
+The count-vector engine must make exactly the same choices as the
+list-based API it replaces in the simulation loop.
+"""
+
+import unittest
+import sys
+import os
+import random
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from deck_sim import Deck, Simulator, Rule, req
+from card_index import CardIndex
+import batch_engine
+from card_effects import CardEffect, DrawEffect, ConditionalDiscardEffect, EffectContext, EffectResult
+
+
+class DiscardFirstEffect(CardEffect):
+    """List-only effect: discards the first card of the hand"""
+
+    def apply(self, hand, remaining_deck, context):
+        return EffectResult(hand=hand[1:], remaining_deck=list(remaining_deck), cards_discarded=hand[:1])
+
+
+class TestCardIndex(unittest.TestCase):
+    """Test interning and count vectors"""
+
+    def test_ids_and_vectors(self):
+        """Deck cards come first; cards only named by subcategories or effects follow"""
+        index = CardIndex(["A", "B", "A"], {"group": ["B", "C"]}, ["D"])
+        self.assertEqual(index.names, ["A", "B", "C", "D"])
+        self.assertEqual(index.subcategories, {"group": [1, 2]})
+        self.assertEqual(index.vector(["A", "B", "A"]), [2, 1, 0, 0])
+        self.assertEqual(index.expand([2, 1, 0, 0]), ["A", "A", "B"])
+
+    def test_subcategory_incidence(self):
+        """Subcategory counts come from the card -> tag lists in one pass"""
+        index = CardIndex(["Leo", "Tiger", "Poly"], {"Luna": ["Leo", "Tiger"], "Leo": ["Leo", "Poly"]})
+        self.assertEqual(index.card_tags, [[0, 1], [0], [1]])
+        self.assertEqual(index.tag_counts(index.vector(["Leo", "Leo", "Tiger"])), [3, 2])
+
+        # A subcategory overrides a card of the same name, and unknown cards are kept as they are
+        named = index.named_counts_of(["Leo", "Poly", "Other"])
+        self.assertEqual((named["Luna"], named["Leo"], named["Other"]), (1, 2, 1))
+
+    @unittest.skipUnless(batch_engine.is_available(), "NumPy is not installed")
+    def test_incidence_matrix_product(self):
+        """counts @ incidence gives every subcategory count of a block at once"""
+        import numpy as np
+        index = CardIndex(["A", "B", "C"], {"AB": ["A", "B"], "BC": ["B", "C"]})
+        counts = np.array([[1, 1, 0], [0, 2, 3]])
+        self.assertEqual((counts @ index.incidence_matrix()).tolist(), [[2, 1], [2, 5]])
+
+    def test_draw_counts_matches_list_draw(self):
+        """Count-vector draws pick the same cards as list draws for the same seed"""
+        deck = Deck(20, {"Pot": 2, "Starter": 5, "Other": 13})
+        index = CardIndex(deck.cards)
+        effect = DrawEffect(count=3)
+
+        for seed in range(20):
+            by_list = effect.apply(["Pot"], index.expand(index.vector(deck.cards)),
+                                   EffectContext({}, [], rng=random.Random(seed)))
+            by_counts = effect.apply_counts(index.vector(["Pot"]), index.vector(deck.cards),
+                                            EffectContext({}, [], rng=random.Random(seed), card_index=index))
+            self.assertEqual(index.names_of(by_counts.cards_drawn), by_list.cards_drawn)
+
+    def test_discard_counts_matches_list_discard(self):
+        """Smart discard makes the same choice on count vectors"""
+        subcategory_map = {"quick play": ["QP B", "QP A"]}
+        conditions = [req("QP A")]
+        index = CardIndex(["QP A", "QP B", "Blank"], subcategory_map)
+        effect = ConditionalDiscardEffect(draw_count=0, discard_filter="quick play", discard_count=1)
+        hand = ["QP A", "QP B", "QP A", "Blank"]
+
+        by_list = effect.apply(hand, [], EffectContext(subcategory_map, conditions))
+        by_counts = effect.apply_counts(index.vector(hand), index.vector([]),
+                                        EffectContext(subcategory_map, conditions, card_index=index))
+        self.assertEqual(index.names_of(by_counts.cards_discarded), by_list.cards_discarded)
+        self.assertEqual(index.expand(by_counts.hand), sorted(by_list.hand, key=index.ids.get))
+
+    def test_list_only_effect_falls_back(self):
+        """Effects that only implement the list API still run in the simulation loop"""
+        deck = Deck(10, {"Discarder": 10})
+        sim = Simulator(deck, {}, {"Discarder": DiscardFirstEffect()})
+        result = sim.run(5, 3, [Rule("Discarder", 1, '==')], record_hands=True)
+        self.assertEqual(result.success_count, 5)
+        self.assertEqual(result.hand_records[0].final_hand, ["Discarder"])
+
+
+if __name__ == '__main__':
+    unittest.main()
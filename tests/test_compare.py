@@ -0,0 +1,75 @@
+"""
+Test suite for paired deck comparisons
+"""
+
+import unittest
+import sys
+import os
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect
+
+
+class TestCompare(unittest.TestCase):
+    """Test sequential decisions, equivalence and the /compare endpoint"""
+
+    def setUp(self):
+        self.conditions = [req("Starter") | req("Tenki")]
+        effects = {"Pot": DrawEffect(count=2)}
+        self.two = Simulator(Deck(40, {"Tenki": 2, "Starter": 6, "Pot": 2}), {}, effects)
+        self.three = Simulator(Deck(40, {"Tenki": 3, "Starter": 6, "Pot": 2}), {}, effects)
+        self.bigger = Simulator(Deck(41, {"Tenki": 2, "Starter": 6, "Pot": 2}), {}, effects)
+
+    def test_clear_difference_stops_early(self):
+        """A large gap is decided after the first batch, and the interval covers the exact difference"""
+        result = self.two.compare(self.three, 1_000_000, 5, self.conditions, seed=1)
+        exact = self.two.compare(self.three, 1, 5, self.conditions, engine='exact')
+
+        self.assertEqual(result.decision, 'second')
+        self.assertEqual(exact.decision, 'second')
+        self.assertEqual(result.simulations, 10_000)
+        self.assertLessEqual(result.difference_low, exact.difference)
+        self.assertGreaterEqual(result.difference_high, exact.difference)
+        self.assertEqual(result.first.total_simulations, 10_000)
+
+    def test_equivalent_and_capped_runs(self):
+        """Irrelevant changes are equivalent, and runs never exceed the simulation cap"""
+        with_filler = Simulator(Deck(40, {"Tenki": 2, "Starter": 6, "Pot": 2, "Filler": 3}), {},
+                                self.two.card_effects)
+        equivalent = self.two.compare(with_filler, 1_000_000, 5, self.conditions, tolerance=0.1, seed=2)
+        self.assertEqual(equivalent.decision, 'equivalent')
+        self.assertEqual(equivalent.simulations, 10_000)
+
+        capped = self.two.compare(self.bigger, 2000, 5, self.conditions, tolerance=0.0, seed=2)
+        self.assertEqual(capped.simulations, 2000)
+        self.assertEqual(capped.decision, 'undecided')
+
+    def test_compare_endpoint(self):
+        """/compare uses the config's rules for both decks"""
+        from fastapi.testclient import TestClient
+        from main import app
+
+        config = {
+            "deck_size": 40,
+            "deck_contents": {"Starter": 6},
+            "hand_size": 5,
+            "simulations": 100000,
+            "rules": [[{"card_name": "Starter", "min_count": 1}]],
+            "seed": 4,
+            "second_deck": {"deck_size": 40, "deck_contents": {"Starter": 9}},
+        }
+        with TestClient(app) as client:
+            response = client.post("/compare", json=config)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["decision"], "second")
+        self.assertLess(body["difference_high"], 0)
+        self.assertEqual(body["second"]["total_simulations"], body["simulations"])
+
+
+if __name__ == '__main__':
+    unittest.main()
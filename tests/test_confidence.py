@@ -0,0 +1,98 @@
+"""
+Test suite for confidence intervals and adaptive stopping
+"""
+
+import unittest
+import sys
+import os
+import time
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from deck_sim import Deck, Simulator, req
+from confidence import wilson_interval, z_score, required_trials, difference_interval
+
+
+class TestConfidence(unittest.TestCase):
+    """Test the interval helpers"""
+
+    def test_wilson_interval(self):
+        """Known Wilson interval for 50/100 at 95%"""
+        low, high = wilson_interval(50, 100, 0.95)
+        self.assertAlmostEqual(low, 0.4038, places=3)
+        self.assertAlmostEqual(high, 0.5962, places=3)
+
+    def test_wilson_interval_edges(self):
+        """Intervals stay inside [0, 1] at the extremes"""
+        low, high = wilson_interval(0, 1000)
+        self.assertEqual(low, 0.0)
+        self.assertGreater(high, 0.0)
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+
+    def test_z_score_and_trials(self):
+        """z for 95% is ~1.96 and +/-1% around 50% needs ~9604 trials"""
+        self.assertAlmostEqual(z_score(0.95), 1.96, places=2)
+        self.assertAlmostEqual(required_trials(0.5, 0.01, 0.95), 9604, delta=2)
+        with self.assertRaises(ValueError):
+            z_score(1.5)
+
+    def test_difference_interval(self):
+        """Newcombe's worked example: 56/70 - 48/80 at 95% is 0.2 (0.0524, 0.3339)"""
+        difference, low, high = difference_interval(56, 70, 48, 80, 0.95)
+        self.assertAlmostEqual(difference, 0.2)
+        self.assertAlmostEqual(low, 0.0524, places=3)
+        self.assertAlmostEqual(high, 0.3339, places=3)
+        self.assertEqual(difference_interval(0, 0, 0, 0)[1:], (-1.0, 1.0))
+
+
+class TestAdaptiveStopping(unittest.TestCase):
+    """Test Simulator.run with a target precision or time budget"""
+
+    def setUp(self):
+        self.sim = Simulator(Deck(40, {"Starter": 9}))
+        self.conditions = [req("Starter")]
+
+    def test_fixed_run_reports_interval(self):
+        """Every Monte Carlo run reports its confidence interval"""
+        result = self.sim.run(2000, 5, self.conditions)
+        self.assertEqual(result.confidence, 0.95)
+        self.assertLessEqual(result.ci_low, result.success_rate)
+        self.assertGreaterEqual(result.ci_high, result.success_rate)
+
+    def test_stops_at_target_precision(self):
+        """The run stops well before the cap once the interval is narrow enough"""
+        result = self.sim.run(1_000_000, 5, self.conditions, target_precision=1.0)
+
+        self.assertLess(result.total_simulations, 1_000_000)
+        self.assertLessEqual((result.ci_high - result.ci_low) / 2, 1.0)
+
+    def test_cap_is_respected(self):
+        """An unreachable precision stops at the requested number of simulations"""
+        result = self.sim.run(25_000, 5, self.conditions, target_precision=0.001)
+        self.assertEqual(result.total_simulations, 25_000)
+
+    def test_time_budget(self):
+        """A short time budget ends the run early"""
+        start = time.perf_counter()
+        result = self.sim.run(50_000_000, 5, self.conditions, time_budget=0.3)
+
+        self.assertLess(result.total_simulations, 50_000_000)
+        self.assertLess(time.perf_counter() - start, 5.0)
+
+    def test_seeded_adaptive_run_is_reproducible(self):
+        """Precision-driven runs with a seed are replayable"""
+        first = self.sim.run(1_000_000, 5, self.conditions, target_precision=0.8, seed=11)
+        second = self.sim.run(1_000_000, 5, self.conditions, target_precision=0.8, seed=11)
+
+        self.assertEqual(first.total_simulations, second.total_simulations)
+        self.assertEqual(first.success_count, second.success_count)
+
+    def test_invalid_precision(self):
+        """Non-positive precision targets are rejected"""
+        with self.assertRaises(ValueError):
+            self.sim.run(1000, 5, self.conditions, target_precision=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Test suite for the exact (closed-form) probability engine
+
+Checks the dynamic program against the hypergeometric formula and against a
+brute-force enumeration of every hand in small decks.
+"""
+
+import unittest
+import sys
+import os
+from itertools import combinations
+from math import comb
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from deck_sim import Deck, Simulator, Rule, req
+from card_effects import DrawEffect, ConditionalDiscardEffect
+
+
+def brute_force_successes(sim, hand_size, conditions):
+    """Count successful hands by enumerating every combination of deck positions."""
+    return sum(
+        1 for positions in combinations(range(len(sim.deck.cards)), hand_size)
+        if sim._evaluate_hand([sim.deck.cards[p] for p in positions], conditions)
+    )
+
+
+class TestExactEngine(unittest.TestCase):
+    """Test the exact engine"""
+
+    def test_at_least_one_matches_hypergeometric(self):
+        """P(at least 1 Starter) equals 1 - C(N-K, n) / C(N, n)"""
+        sim = Simulator(Deck(40, {"Starter": 9}))
+        result = sim.calculate(5, [req("Starter")])
+
+        self.assertTrue(result.exact)
+        self.assertEqual(result.total_simulations, comb(40, 5))
+        self.assertEqual(result.brick_count, comb(31, 5))
+        self.assertAlmostEqual(result.success_rate, (1 - comb(31, 5) / comb(40, 5)) * 100.0)
+
+    def test_matches_brute_force(self):
+        """Mixed AND/OR, '==' and subcategory rules agree with full enumeration"""
+        deck = Deck(14, {"Leo": 2, "Tiger": 2, "Poly": 2, "Garnet": 1})
+        subcategory_map = {"Luna": ["Leo", "Tiger"], "Starter": ["Leo", "Poly"]}
+        sim = Simulator(deck, subcategory_map)
+        conditions = [
+            (req("Luna") >= 2) & Rule("Garnet", 0, '=='),
+            req("Poly") & Rule("Starter", 2, '=='),
+            Rule("Tiger", 2, '==') | (req("Garnet") & req("Leo")),
+        ]
+
+        for hand_size in (3, 5):
+            result = sim.calculate(hand_size, conditions)
+            self.assertEqual(result.success_count, brute_force_successes(sim, hand_size, conditions))
+            self.assertEqual(result.total_simulations, comb(14, hand_size))
+
+    def test_empty_group_placeholder(self):
+        """The always-true req(None) >= 0 placeholder makes every hand a success"""
+        sim = Simulator(Deck(40, {"Starter": 3}))
+        result = sim.calculate(5, [req(None) >= 0])
+        self.assertEqual(result.brick_count, 0)
+
+    def test_run_with_exact_engine(self):
+        """Simulator.run(engine='exact') returns the closed-form result"""
+        sim = Simulator(Deck(40, {"Starter": 9}))
+        result = sim.run(1_000_000, 5, [req("Starter")], engine='exact')
+        self.assertTrue(result.exact)
+        self.assertEqual(result.total_simulations, comb(40, 5))
+
+    def test_rejects_custom_conditions(self):
+        """Arbitrary callables are not supported"""
+        deck = Deck(40, {"Pot of Greed": 3, "Starter": 9})
+        with self.assertRaises(ValueError):
+            Simulator(deck).calculate(5, [lambda hand: hand["Starter"] > 0])
+
+
+class TestExactEffectEngine(unittest.TestCase):
+    """Test exact resolution of draw and conditional discard effects"""
+
+    def test_draw_effect_matches_formula(self):
+        """Pot of Greed: P = P(Starter) + P(no Starter, Pot) * P(Starter in 2 from the remaining 35)"""
+        deck = Deck(40, {"Pot of Greed": 3, "Starter": 5})
+        sim = Simulator(deck, {}, {"Pot of Greed": DrawEffect(count=2)})
+        result = sim.calculate(5, [req("Starter")])
+
+        no_starter = comb(35, 5) / comb(40, 5)
+        no_starter_with_pot = (comb(35, 5) - comb(32, 5)) / comb(40, 5)
+        hit_off_pot = 1 - comb(30, 2) / comb(35, 2)
+        expected = (1 - no_starter) + no_starter_with_pot * hit_off_pot
+
+        self.assertTrue(result.exact)
+        self.assertAlmostEqual(result.success_rate, expected * 100.0, places=9)
+
+    def test_unpayable_discard_reverts(self):
+        """A discard filter with no cards always reverts, so the effect never helps"""
+        deck = Deck(40, {"Vision": 3, "Starter": 5})
+        vision = ConditionalDiscardEffect(draw_count=2, discard_filter="quick play", discard_count=1)
+        with_effect = Simulator(deck, {"quick play": ["Missing"]}, {"Vision": vision})
+        without_effect = Simulator(deck)
+
+        self.assertAlmostEqual(with_effect.calculate(5, [req("Starter")]).success_rate,
+                               without_effect.calculate(5, [req("Starter")]).success_rate)
+
+    def test_conditional_discard_matches_monte_carlo(self):
+        """Exact rate for a Vision + Pot deck lies within the Monte Carlo confidence band"""
+        deck = Deck(20, {"Vision": 2, "Pot": 1, "Quick-Play": 4, "Starter": 2, "Leo": 3})
+        subcategory_map = {"quick play": ["Quick-Play", "Vision"], "luna": ["Leo"]}
+        card_effects = {
+            "Pot": DrawEffect(count=2),
+            "Vision": ConditionalDiscardEffect(draw_count=2, discard_filter="quick play", discard_count=1),
+        }
+        conditions = [req("Starter"), (req("luna") >= 2) & req("Quick-Play")]
+        sim = Simulator(deck, subcategory_map, card_effects)
+
+        exact = sim.calculate(5, conditions).success_rate / 100.0
+        simulated = sim.run(20000, 5, conditions).success_rate / 100.0
+        standard_error = (exact * (1 - exact) / 20000) ** 0.5
+        self.assertLess(abs(simulated - exact), 5 * standard_error)
+
+
+if __name__ == '__main__':
+    unittest.main()
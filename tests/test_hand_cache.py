@@ -0,0 +1,66 @@
+"""
+Test suite for the hand outcome cache
+
+Caching must never change a result, only how often the conditions are evaluated.
+"""
+
+import unittest
+import sys
+import os
+from itertools import combinations_with_replacement
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect
+from hand_cache import HandCache
+
+
+class TestHandCache(unittest.TestCase):
+    """Test canonical keys, eviction and the cached simulation loop"""
+
+    def test_keys_are_canonical(self):
+        """Order does not matter, and different multisets never share a key"""
+        cache = HandCache(num_cards=4, hand_size=3)
+        self.assertEqual(cache.key([0, 2, 2]), cache.key([2, 0, 2]))
+
+        keys = {cache.key(list(hand)) for hand in combinations_with_replacement(range(4), 3)}
+        self.assertEqual(len(keys), 20)
+
+    def test_least_recently_used_is_evicted(self):
+        """A full cache drops the hand that was used longest ago"""
+        cache = HandCache(num_cards=3, hand_size=1, max_size=2)
+        cache.put(0, True)
+        cache.put(1, False)
+        cache.get(0)
+        cache.put(2, True)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(1))
+        self.assertTrue(cache.get(0))
+
+    def test_cached_run_matches_uncached(self):
+        """The same seed gives the same result with and without the cache"""
+        deck = Deck(40, {"Pot of Greed": 3, "Starter": 6, "Extender": 8})
+        conditions = [req("Starter") | (req("Extender") >= 2)]
+        effects = {"Pot of Greed": DrawEffect(count=2)}
+
+        cached = Simulator(deck, {}, effects, hand_cache_size=1000)
+        uncached = Simulator(deck, {}, effects, hand_cache_size=0)
+        first = cached.run(5000, 5, conditions, record_hands=True, seed=8)
+        second = uncached.run(5000, 5, conditions, record_hands=True, seed=8)
+
+        self.assertEqual(first.success_count, second.success_count)
+        self.assertEqual(first.hand_records, second.hand_records)
+        self.assertGreater(first.cache_hit_rate, 0)
+        self.assertIsNone(second.cache_hit_rate)
+
+    def test_automatic_cache_for_custom_conditions(self):
+        """By default only conditions that cannot be compiled are cached"""
+        sim = Simulator(Deck(40, {"Starter": 9}))
+        self.assertIsNone(sim.run(1000, 5, [req("Starter")]).cache_hit_rate)
+        self.assertIsNotNone(sim.run(1000, 5, [lambda hand: hand["Starter"] > 0]).cache_hit_rate)
+
+
+if __name__ == '__main__':
+    unittest.main()
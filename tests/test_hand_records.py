@@ -0,0 +1,144 @@
+"""
+Test suite for the columnar hand record store
+"""
+
+import random
+import unittest
+import sys
+import os
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect
+from hand_records import HandRecord, HandRecordStore, RecordFilter, Reservoir
+
+
+class TestHandRecords(unittest.TestCase):
+    """Test record access, merging, filtering, sampling, serialization and the API response"""
+
+    def setUp(self):
+        self.sim = Simulator(Deck(40, {"Starter": 8, "Pot": 3}), {}, {"Pot": DrawEffect(count=2)})
+        self.conditions = [req("Starter")]
+
+    def test_store_reads_like_a_list(self):
+        result = self.sim.run(500, 5, self.conditions, record_hands=True, max_hand_records=200, seed=4)
+        records = result.hand_records
+
+        self.assertIsInstance(records, HandRecordStore)
+        self.assertEqual(len(records), 200)
+        self.assertEqual(len(records[:10]), 10)
+        self.assertEqual(records[-1], list(records)[199])
+        for record in records:
+            self.assertEqual(len(record.initial_hand), 5)
+            self.assertEqual(record.success, "Starter" in record.final_hand)
+            for card in record.cards_drawn:
+                self.assertIn(card, record.final_hand)
+
+    def test_merge_and_widening(self):
+        """Stores merge up to a cap, and card ids widen past 256 distinct cards"""
+        store = HandRecordStore()
+        store.extend([HandRecord(["a"], ["a"], [], [], True), HandRecord(["b"], ["b", "c"], ["c"], [], False)])
+        other = HandRecordStore()
+        other.extend(HandRecord([f"card {i}"], [f"card {i}"], [], [], i % 2 == 0) for i in range(300))
+        store.extend(other, limit=250)
+
+        self.assertEqual(len(store), 250)
+        self.assertEqual(store[1], HandRecord(["b"], ["b", "c"], ["c"], [], False))
+        self.assertEqual(store[249].initial_hand, ["card 247"])
+        self.assertTrue(store[249].success is False)
+        self.assertEqual(store.to_columns()['id_type'], 'uint8')
+        other.extend([HandRecord(["a"], ["a"], [], [], True)])
+        self.assertEqual(other.to_columns()['id_type'], 'uint16')
+        self.assertEqual(other[300].initial_hand, ["a"])
+
+    def test_columns_round_trip(self):
+        result = self.sim.run(300, 5, self.conditions, record_hands=True, seed=2, workers=2)
+        columns = result.hand_records.to_columns()
+        self.assertEqual(columns['count'], 300)
+        self.assertEqual(HandRecordStore.from_columns(columns), result.hand_records)
+
+    def test_reservoir_is_uniform(self):
+        """Every item of the stream is equally likely to be kept, whether offered one by one or in blocks"""
+        rng = random.Random(1)
+        kept = [0] * 40
+        for _ in range(4000):
+            reservoir = Reservoir(4, rng)
+            for item in range(10):
+                slot = reservoir.offer()
+                if slot >= 0:
+                    reservoir.slots[slot] = item
+            for start, size in ((10, 5), (15, 25)):
+                for position, slot in reservoir.select(size):
+                    reservoir.slots[slot] = start + position
+            for item in reservoir.slots:
+                kept[item] += 1
+        # 400 expected per item, with a standard deviation of about 19
+        self.assertLess(max(kept) - min(kept), 160)
+        self.assertEqual(reservoir.matched, 40)
+
+    def test_filtered_sample_over_whole_run(self):
+        """Filtered records only hold matching hands, sampled from the whole run without changing it"""
+        plain = self.sim.run(20_000, 5, self.conditions, seed=6)
+        bricks = self.sim.run(20_000, 5, self.conditions, seed=6, workers=2, max_hand_records=300,
+                              record_hands=RecordFilter(outcome='brick'))
+
+        self.assertEqual(bricks.success_count, plain.success_count)
+        self.assertEqual(len(bricks.hand_records), 300)
+        self.assertEqual(bricks.hand_records.matched, bricks.brick_count)
+        self.assertFalse(any(record.success for record in bricks.hand_records))
+        serial = self.sim.run(20_000, 5, self.conditions, seed=6, max_hand_records=300,
+                              record_hands=RecordFilter(outcome='brick'))
+        self.assertEqual(serial.hand_records, bricks.hand_records)
+
+        effects = self.sim.run(5_000, 5, self.conditions, seed=6, max_hand_records=50,
+                               record_hands=RecordFilter(effects_only=True))
+        self.assertTrue(all(record.cards_drawn for record in effects.hand_records))
+        pots = self.sim.run(5_000, 5, self.conditions, seed=6, record_hands=RecordFilter(card="Pot"))
+        self.assertTrue(all("Pot" in record.initial_hand for record in pots.hand_records))
+        self.assertEqual(len(pots.hand_records), pots.hand_records.matched)
+
+        with self.assertRaises(ValueError):
+            RecordFilter(outcome='draw')
+
+    def test_batch_engine_filters(self):
+        from batch_engine import is_available
+        if not is_available():
+            self.skipTest("NumPy is not installed")
+        sim = Simulator(Deck(40, {"Starter": 8, "Ash": 3}))
+        result = sim.run(30_000, 5, self.conditions, engine='batch', seed=3, max_hand_records=100,
+                         record_hands=RecordFilter(outcome='brick', card="Ash"))
+        self.assertEqual(len(result.hand_records), 100)
+        for record in result.hand_records:
+            self.assertFalse(record.success)
+            self.assertIn("Ash", record.initial_hand)
+
+    def test_simulate_returns_columns(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        client = TestClient(app)
+        response = client.post("/simulate", json={
+            "deck_size": 40,
+            "hand_size": 5,
+            "simulations": 100,
+            "deck_contents": {"Starter": 8},
+            "rules": [[{"card_name": "Starter", "min_count": 1}]],
+            "record_hands": True,
+            "record_filter": {"outcome": "brick"},
+            "seed": 1,
+            "use_cache": False,
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+        self.assertNotIn('hand_records', data)
+        store = HandRecordStore.from_columns(data['hand_record_columns'])
+        self.assertEqual(store.matched, data['brick_count'])
+        self.assertEqual(len(store), data['brick_count'])
+        self.assertFalse(any(r.success for r in store))
+
+
+if __name__ == '__main__':
+    unittest.main()
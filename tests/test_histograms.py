@@ -0,0 +1,106 @@
+"""
+Test suite for in-engine hand histograms
+"""
+
+import unittest
+import sys
+import os
+from collections import Counter
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect
+
+
+class TestHistograms(unittest.TestCase):
+    """Test the histograms against recorded hands, the engines, merging and the API"""
+
+    def setUp(self):
+        self.deck = Deck(40, {"Starter": 8, "Extender": 5, "Ash": 3, "Pot": 3})
+        self.subcategories = {"Engine": ["Starter", "Extender"], "Hand traps": ["Ash"]}
+        self.conditions = [req("Starter") >= 1]
+
+    def test_matches_recorded_hands(self):
+        """Every histogram agrees with the hands of the same run"""
+        sim = Simulator(self.deck, self.subcategories, {"Pot": DrawEffect(count=2)})
+        result = sim.run(3000, 5, self.conditions, seed=1, histograms=True,
+                         record_hands=True, max_hand_records=3000)
+        histograms = result.histograms
+        records = list(result.hand_records)
+
+        starter = histograms.names.index("Starter")
+        self.assertEqual(histograms.initial[starter],
+                         [sum(1 for r in records if r.initial_hand.count("Starter") == c) for c in range(9)])
+        self.assertEqual(histograms.final[starter],
+                         [sum(1 for r in records if r.final_hand.count("Starter") == c) for c in range(9)])
+        # Hands opening without a starter only succeed by drawing one with Pot
+        self.assertEqual(histograms.success[starter][0],
+                         sum(1 for r in records if "Starter" not in r.initial_hand and r.success))
+        self.assertGreater(histograms.success[starter][0], 0)
+        self.assertEqual(sum(histograms.success[starter]), result.success_count)
+
+        engine = histograms.tags.index("Engine")
+        opening_engine = Counter(r.initial_hand.count("Starter") + r.initial_hand.count("Extender") for r in records)
+        self.assertEqual({c: n for c, n in enumerate(histograms.tag_initial[engine]) if n}, dict(opening_engine))
+        self.assertEqual({s: n for s, n in enumerate(histograms.hand_size) if n},
+                         dict(Counter(len(r.final_hand) for r in records)))
+        self.assertEqual({d: n for d, n in enumerate(histograms.drawn) if n},
+                         dict(Counter(len(r.cards_drawn) for r in records)))
+        self.assertEqual(sum(histograms.card_drawn), sum(len(r.cards_drawn) for r in records))
+
+    def test_shards_and_batch(self):
+        sim = Simulator(self.deck, self.subcategories)
+        serial = sim.run(20_000, 5, self.conditions, seed=3, histograms=True)
+        sharded = sim.run(20_000, 5, self.conditions, seed=3, workers=2, histograms=True)
+        self.assertEqual(sharded.histograms, serial.histograms)
+        rates = serial.histograms.success_rates("Starter")
+        self.assertEqual(rates[:2], [0.0, 100.0])
+
+        from batch_engine import is_available
+        if not is_available():
+            self.skipTest("NumPy is not installed")
+        batch = Simulator(self.deck, self.subcategories, {"Pot": DrawEffect(count=2)}).run(
+            20_000, 5, self.conditions, engine='batch', seed=3, histograms=True)
+        python = Simulator(self.deck, self.subcategories, {"Pot": DrawEffect(count=2)}).run(
+            20_000, 5, self.conditions, engine='python', seed=3, histograms=True)
+        for histograms in (batch.histograms, python.histograms):
+            self.assertEqual(histograms.hands, 20_000)
+            self.assertEqual(sum(histograms.tag_final[0]), 20_000)
+            self.assertEqual(sum(histograms.success[0]), histograms.successes)
+            self.assertEqual(sum(histograms.hand_size[5:8]), 20_000)
+        # Both engines sample the same distribution
+        pot = batch.histograms.names.index("Pot")
+        self.assertAlmostEqual(batch.histograms.card_drawn[pot] / 20_000, python.histograms.card_drawn[pot] / 20_000,
+                               delta=0.02)
+
+    def test_simulate_endpoint(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        client = TestClient(app)
+        response = client.post("/simulate", json={
+            "deck_size": 40,
+            "hand_size": 5,
+            "simulations": 2000,
+            "deck_contents": {"Starter": 8, "Ash": 3},
+            "rules": [[{"card_name": "Starter", "min_count": 1}]],
+            "histograms": True,
+            "seed": 1,
+            "use_cache": False,
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+        histograms = data['histograms']
+        self.assertEqual(histograms['cards'], ["Starter", "Ash"])
+        starter = histograms['cards'].index("Starter")
+        self.assertEqual(sum(histograms['card_initial'][starter]), 2000)
+        self.assertEqual(sum(histograms['card_success'][starter]), data['success_count'])
+        self.assertEqual(histograms['hand_size'], [0, 0, 0, 0, 0, 2000])
+        self.assertEqual(histograms['cards_drawn'], [2000])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Test suite for background simulation jobs
+"""
+
+import unittest
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from deck_sim import Deck, Simulator, req
+from streaming import stream_run
+from jobs import JobManager, JobLimitError, COMPLETED, CANCELLED
+
+
+def wait_for(job, condition, timeout=30.0):
+    deadline = time.time() + timeout
+    while not condition(job) and time.time() < deadline:
+        time.sleep(0.01)
+    return condition(job)
+
+
+class TestJobs(unittest.TestCase):
+    """Test job completion, cancellation, limits and the /jobs endpoints"""
+
+    def setUp(self):
+        self.sim = Simulator(Deck(40, {"Starter": 9}))
+        self.conditions = [req("Starter")]
+        self.manager = JobManager(max_workers=1, max_active_jobs=1)
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def submit(self, simulations, interval):
+        return self.manager.submit(
+            lambda executor: stream_run(self.sim, simulations, 5, self.conditions, seed=5,
+                                        interval=interval, executor=executor),
+            lambda result, elapsed: result)
+
+    def test_job_completes_with_seeded_result(self):
+        """A job's result is the seeded stream's result"""
+        job = self.submit(4000, 1000)
+        self.assertTrue(wait_for(job, lambda j: j.finished))
+        self.assertEqual(job.status, COMPLETED)
+
+        expected = list(stream_run(self.sim, 4000, 5, self.conditions, seed=5, interval=1000))[-1]
+        self.assertEqual(job.result.success_count, expected.result.success_count)
+        self.assertEqual(job.progress.completed, 4000)
+
+    def test_cancel_keeps_partial_progress(self):
+        """Cancelling stops the job and frees its slot once its running shard is done"""
+        job = self.submit(10_000_000, 1000)
+        self.assertTrue(wait_for(job, lambda j: j.progress is not None))
+        with self.assertRaises(JobLimitError):
+            self.submit(1000, 1000)
+
+        self.manager.cancel(job.id)
+        self.assertEqual(job.status, CANCELLED)
+        self.assertLess(job.progress.completed, 10_000_000)
+        self.assertIsNone(job.result)
+        self.assertTrue(wait_for(job, lambda j: not j.active))
+        self.assertEqual(self.submit(1000, 1000).status, "queued")
+
+    def test_cancelled_job_holds_slot_until_shards_finish(self):
+        """A cancelled job's running shards still count against max_active_jobs"""
+        def stream(executor):
+            shard = executor.submit(time.sleep, 1.0)
+            yield SimpleNamespace(result=None, completed=0)
+            shard.result()
+            yield SimpleNamespace(result=None, completed=1)
+
+        job = self.manager.submit(stream, lambda result, elapsed: result)
+        self.assertTrue(wait_for(job, lambda j: j.progress is not None))
+        self.manager.cancel(job.id)
+        self.assertEqual(job.status, CANCELLED)
+        self.assertTrue(job.active)
+        with self.assertRaises(JobLimitError):
+            self.submit(1000, 1000)
+
+        self.assertTrue(wait_for(job, lambda j: not j.active))
+        self.assertEqual(self.submit(1000, 1000).status, "queued")
+
+    def test_cancel_is_never_overwritten(self):
+        """A cancel that lands while the driver is mid-update stays cancelled"""
+        converting = threading.Event()
+        release = threading.Event()
+
+        def stream(executor):
+            for completed in range(1, 100):
+                yield SimpleNamespace(result=None, completed=completed)
+            yield SimpleNamespace(result="done", completed=100)
+
+        def finish(result, elapsed):
+            converting.set()
+            release.wait(5)
+            return result
+
+        job = self.manager.submit(stream, finish)
+        self.assertTrue(converting.wait(30))
+        self.manager.cancel(job.id)
+        release.set()
+
+        statuses = []
+        for _ in range(20):
+            statuses.append(job.status)
+            time.sleep(0.01)
+        self.assertEqual(set(statuses), {CANCELLED})
+        self.assertIsNone(job.result)
+        self.assertEqual(job.progress.completed, 99)
+
+    def test_job_endpoints(self):
+        """POST /jobs returns a job id that can be polled until it completes"""
+        from fastapi.testclient import TestClient
+        from main import app
+
+        config = {
+            "deck_size": 40,
+            "deck_contents": {"Starter": 9},
+            "hand_size": 5,
+            "simulations": 2000,
+            "rules": [[{"card_name": "Starter", "min_count": 1}]],
+            "seed": 4,
+            "progress_interval": 1000,
+        }
+        with TestClient(app) as client:
+            created = client.post("/jobs", json=config)
+            self.assertEqual(created.status_code, 202)
+            job_id = created.json()["id"]
+
+            deadline = time.time() + 30
+            status = created.json()
+            while status["status"] not in ("completed", "failed") and time.time() < deadline:
+                time.sleep(0.02)
+                status = client.get(f"/jobs/{job_id}").json()
+
+            self.assertEqual(status["status"], "completed")
+            self.assertEqual(status["result"]["total_simulations"], 2000)
+            self.assertEqual(status["result"]["seed"], 4)
+            self.assertEqual(client.delete(f"/jobs/{job_id}").json()["status"], "completed")
+            self.assertEqual(client.get("/jobs/unknown").status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Test suite for multi-objective counts
+"""
+
+import unittest
+import sys
+import os
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect
+from objectives import ObjectiveCounts, branch_objectives, merge_objectives
+
+
+class TestObjectives(unittest.TestCase):
+    """Test per-objective counts against separate runs, their overlaps, merging and the API"""
+
+    def setUp(self):
+        self.deck = Deck(40, {"Starter": 8, "Extender": 6, "Ash": 3, "Pot": 2})
+        self.conditions = [req("Starter") >= 1, (req("Extender") >= 1) & (req("Ash") >= 1)]
+
+    def test_counts_match_separate_runs(self):
+        """Without effects, every objective counts what its own run on the same seed would"""
+        sim = Simulator(self.deck)
+        objectives = branch_objectives(self.conditions)
+        objectives["Two starters"] = [req("Starter") >= 2]
+        result = sim.run(20_000, 5, self.conditions, seed=3, objectives=objectives)
+
+        for name, conditions in objectives.items():
+            alone = sim.run(20_000, 5, conditions, seed=3)
+            self.assertEqual(result.objectives.count(name), alone.success_count, name)
+
+        counts = result.objectives
+        self.assertEqual(sum(counts.masks.values()), 20_000)
+        self.assertEqual(counts.overlap("Rule 1", "Two starters"), counts.count("Two starters"))
+        # Inclusion-exclusion over the branches gives the run's own successes
+        union = counts.count("Rule 1") + counts.count("Rule 2") - counts.overlap("Rule 1", "Rule 2")
+        self.assertEqual(union, result.success_count)
+        self.assertEqual(sum(hands for _, hands in counts.combinations()), 20_000)
+
+    def test_effects_and_shards(self):
+        """Objectives are checked after effects, and shards merge to the single-process counts"""
+        sim = Simulator(self.deck, {}, {"Pot": DrawEffect(count=2)})
+        objectives = branch_objectives(self.conditions)
+        serial = sim.run(20_000, 5, self.conditions, seed=8, objectives=objectives)
+        sharded = sim.run(20_000, 5, self.conditions, seed=8, workers=2, objectives=objectives)
+
+        self.assertEqual(sharded.objectives, serial.objectives)
+        self.assertEqual(sharded.success_count, serial.success_count)
+        union = sum(hands for mask, hands in serial.objectives.masks.items() if mask)
+        self.assertEqual(union, serial.success_count)
+
+    def test_batch_engine(self):
+        from batch_engine import is_available
+        if not is_available():
+            self.skipTest("NumPy is not installed")
+        sim = Simulator(self.deck)
+        objectives = branch_objectives(self.conditions)
+        result = sim.run(20_000, 5, self.conditions, engine='batch', seed=2, objectives=objectives)
+        union = sum(hands for mask, hands in result.objectives.masks.items() if mask)
+        self.assertEqual(union, result.success_count)
+        self.assertEqual(result.objectives.names, ["Rule 1", "Rule 2"])
+
+    def test_merge_and_invalid(self):
+        first = ObjectiveCounts(["A", "B"], {1: 3, 3: 1})
+        merged = merge_objectives([first, None, ObjectiveCounts(["A", "B"], {0: 2, 3: 4})])
+        self.assertEqual(merged.masks, {0: 2, 1: 3, 3: 5})
+        self.assertEqual(merged.overlaps(), [[8, 5], [5, 5]])
+        self.assertEqual(merged.combinations()[0], (["A", "B"], 5))
+        self.assertIsNone(merge_objectives([None]))
+        with self.assertRaises(ValueError):
+            first.add(ObjectiveCounts(["B", "A"]))
+
+        sim = Simulator(self.deck)
+        with self.assertRaises(ValueError):
+            sim.run(1000, 5, self.conditions, engine='exact', objectives={"A": [req("Ash")]})
+        with self.assertRaises(ValueError):
+            sim.run(1000, 5, self.conditions, sampling='stratified', objectives={"A": [req("Ash")]})
+
+    def test_simulate_endpoint(self):
+        from fastapi.testclient import TestClient
+        from main import app
+
+        client = TestClient(app)
+        payload = {
+            "deck_size": 40,
+            "hand_size": 5,
+            "simulations": 5000,
+            "deck_contents": {"Starter": 8, "Ash": 3},
+            "rules": [[{"card_name": "Starter", "min_count": 1}], [{"card_name": "Ash", "min_count": 1}]],
+            "rule_sets": [{"name": "Both", "rules": [[{"card_name": "Starter", "min_count": 1, "operator": "AND"},
+                                                      {"card_name": "Ash", "min_count": 1}]]}],
+            "branch_counts": True,
+            "seed": 1,
+            "use_cache": False,
+        }
+        response = client.post("/simulate", json=payload)
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()['objectives']
+        self.assertEqual([o['name'] for o in data['objectives']], ["Rule 1", "Rule 2", "Both"])
+        self.assertEqual(data['overlaps'][0][1], data['objectives'][2]['count'])
+        self.assertEqual(sum(c['count'] for c in data['combinations']), 5000)
+
+        payload["rule_sets"][0]["name"] = "Rule 1"
+        self.assertEqual(client.post("/simulate", json=payload).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Test suite for the deck optimizer
+"""
+
+import unittest
+import sys
+import os
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect
+from optimizer import CardLimit
+
+
+class TestOptimizer(unittest.TestCase):
+    """Test the search with exact and sampled screening, limits and the /optimize endpoint"""
+
+    def setUp(self):
+        self.deck = Deck(40, {"Starter": 6, "Extender": 6, "Pot": 1, "Handtrap": 9})
+        self.limits = [CardLimit("Starter", 3, 9), CardLimit("Extender", 0, 9), CardLimit("Handtrap", 6, 12)]
+
+    def test_exact_search_finds_the_best_counts(self):
+        """Maxing both combo pieces wins, and the starting deck is reported for comparison"""
+        sim = Simulator(self.deck, {}, {"Pot": DrawEffect(count=2)})
+        result = sim.optimize(1000, 5, [req("Starter") & req("Extender")], self.limits,
+                              max_deck_size=42, seed=1)
+
+        self.assertTrue(result.exact)
+        self.assertEqual(result.best.values["Starter"], 9)
+        self.assertEqual(result.best.values["Extender"], 9)
+        self.assertEqual(result.best.values["deck_size"], 40)
+        start = [p for p in result.decks if p.values == {"Starter": 6, "Extender": 6, "Handtrap": 9, "deck_size": 40}]
+        self.assertEqual(len(start), 1)
+        self.assertEqual(start[0].difference, 0.0)
+        self.assertGreater(result.best.difference, 20)
+
+    def test_sampled_search(self):
+        """Conditions the exact engine cannot handle are screened with samples"""
+        sim = Simulator(self.deck)
+        result = sim.optimize(5000, 5, [lambda hand: hand["Starter"] > 0 and hand["Extender"] > 0],
+                              self.limits[:2], seed=3, screening_simulations=1000)
+
+        self.assertFalse(result.exact)
+        self.assertGreaterEqual(result.best.values["Starter"] + result.best.values["Extender"], 16)
+        self.assertGreater(result.best.difference_low, 0)
+
+    def test_impossible_limits(self):
+        """Limits that cannot fit in the deck are rejected"""
+        sim = Simulator(self.deck)
+        with self.assertRaises(ValueError):
+            sim.optimize(100, 5, [req("Starter")], [CardLimit("Starter", 30, 35)])
+        with self.assertRaises(ValueError):
+            sim.optimize(100, 5, [req("Starter")], [CardLimit("Starter", 3, 2)])
+
+    def test_optimize_endpoint(self):
+        """/optimize returns the decks best first"""
+        from fastapi.testclient import TestClient
+        from main import app
+
+        config = {
+            "deck_size": 40,
+            "deck_contents": {"Starter": 6, "Extender": 6},
+            "hand_size": 5,
+            "simulations": 1000,
+            "rules": [[{"card_name": "Starter", "min_count": 1}, {"card_name": "Extender", "min_count": 1}]],
+            "card_limits": [{"card_name": "Starter", "min_copies": 3, "max_copies": 9},
+                            {"card_name": "Extender", "min_copies": 3, "max_copies": 9}],
+        }
+        with TestClient(app) as client:
+            response = client.post("/optimize", json=config)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body["exact"])
+        self.assertEqual(body["decks"][0]["card_counts"], {"Starter": 9, "Extender": 9})
+        rates = [deck["result"]["success_rate"] for deck in body["decks"]]
+        self.assertEqual(rates, sorted(rates, reverse=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Test suite for sharded / multi-core simulation
+
+Seeded runs must be reproducible and must not depend on the number of workers.
+"""
+
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from deck_sim import Deck, Simulator, SimulationResult, HandRecord, req
+from card_effects import DrawEffect, ConditionalDiscardEffect
+import batch_engine
+from parallel import derive_seed, shard_sizes, merge_results, run_sharded
+
+
+class TestParallel(unittest.TestCase):
+    """Test sharding, seeding and merging"""
+
+    def setUp(self):
+        deck = Deck(40, {"Pot of Greed": 2, "Vision": 3, "Quick-Play": 4, "Starter": 6})
+        card_effects = {
+            "Pot of Greed": DrawEffect(count=2),
+            "Vision": ConditionalDiscardEffect(draw_count=2, discard_filter="quick play", discard_count=1),
+        }
+        self.sim = Simulator(deck, {"quick play": ["Quick-Play", "Vision"]}, card_effects)
+        self.conditions = [req("Starter") | (req("Quick-Play") >= 2)]
+
+    def test_shard_layout(self):
+        """Shards only depend on the number of simulations"""
+        self.assertEqual(shard_sizes(250, 100), [100, 100, 50])
+        self.assertEqual(shard_sizes(200, 100), [100, 100])
+        self.assertEqual(derive_seed(7, 1), derive_seed(7, 1))
+        self.assertNotEqual(derive_seed(7, 1), derive_seed(7, 2))
+
+    def test_seeded_run_is_reproducible(self):
+        """The same seed gives identical results and records"""
+        first = self.sim.run(3000, 5, self.conditions, record_hands=True, seed=42)
+        second = self.sim.run(3000, 5, self.conditions, record_hands=True, seed=42)
+
+        self.assertEqual(first.success_count, second.success_count)
+        self.assertEqual(first.hand_records, second.hand_records)
+        self.assertEqual(first.seed, 42)
+
+    def test_result_independent_of_workers(self):
+        """A seeded run gives the same result in-process and on a process pool"""
+        serial = run_sharded(self.sim, 3000, 5, self.conditions, record_hands=True,
+                             seed=99, workers=1, shard_size=1000)
+        pooled = run_sharded(self.sim, 3000, 5, self.conditions, record_hands=True,
+                             seed=99, workers=2, shard_size=1000)
+
+        self.assertEqual(serial.total_simulations, 3000)
+        self.assertEqual(serial.success_count, pooled.success_count)
+        self.assertEqual(serial.hand_records, pooled.hand_records)
+
+    @unittest.skipUnless(batch_engine.is_available(), "NumPy is not installed")
+    def test_seeded_batch_run(self):
+        """Seeds also drive the batch engine's random streams"""
+        sim = Simulator(Deck(40, {"Starter": 8}))
+        first = sim.run(50000, 5, [req("Starter")], engine='batch', seed=5)
+        second = sim.run(50000, 5, [req("Starter")], engine='batch', seed=5)
+        self.assertEqual(first.success_count, second.success_count)
+
+    def test_merge_results(self):
+        """Counts add up and hand records are sampled down to the cap, in shard order"""
+        def part(successes, records):
+            return SimulationResult(
+                total_simulations=10, success_count=successes, brick_count=10 - successes,
+                success_rate=successes * 10.0, brick_rate=(10 - successes) * 10.0,
+                hand_records=[HandRecord([name], [name], [], [], True) for name in records],
+            )
+
+        merged = merge_results([part(3, ["a", "b"]), part(7, ["c", "d"])], max_hand_records=3)
+        self.assertEqual(merged.total_simulations, 20)
+        self.assertEqual(merged.success_count, 10)
+        self.assertAlmostEqual(merged.success_rate, 50.0)
+        names = [r.initial_hand[0] for r in merged.hand_records]
+        self.assertEqual(len(names), 3)
+        self.assertEqual(names, sorted(names))
+        self.assertTrue(set(names) <= {"a", "b", "c", "d"})
+        self.assertEqual(merged.hand_records.matched, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Test suite for the content-addressed result cache
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from models import SimulationConfig
+from result_cache import ResultCache, config_key
+
+
+def make_config(**overrides):
+    config = {
+        "deck_size": 40,
+        "deck_contents": {},
+        "card_categories": [
+            {"name": "Starter", "count": 6, "subcategories": ["Engine"]},
+            {"name": "Extender", "count": 8, "subcategories": ["Engine"]},
+            {"name": "Pot", "count": 2},
+        ],
+        "hand_size": 5,
+        "simulations": 1000,
+        "rules": [
+            [{"card_name": "Starter", "min_count": 1}],
+            [{"card_name": "Extender", "min_count": 2, "comparison_operator": "="},
+             {"card_name": "Engine", "min_count": 3}],
+        ],
+        "card_effects": [{"card_name": "Pot", "effect_type": "draw", "parameters": {"count": 2}}],
+    }
+    config.update(overrides)
+    return SimulationConfig(**config)
+
+
+def key_of(config):
+    from main import build_simulation
+    sim, conditions = build_simulation(config)
+    return config_key(sim, conditions, config)
+
+
+class TestResultCache(unittest.TestCase):
+    """Test canonical keys, the LRU/disk store and the cached endpoint"""
+
+    def test_cosmetic_differences_share_a_key(self):
+        """Rule order, '=' vs '==' and settings that never change a result do not matter"""
+        base = make_config()
+        reordered = make_config(rules=[
+            [{"card_name": "Engine", "min_count": 3},
+             {"card_name": "Extender", "min_count": 2, "comparison_operator": "=="}],
+            [{"card_name": "Starter", "min_count": 1}],
+        ], workers=4)
+        shuffled_deck = make_config(card_categories=list(reversed(base.card_categories)))
+        self.assertEqual(key_of(base), key_of(reordered))
+        self.assertEqual(key_of(base), key_of(shuffled_deck))
+
+    def test_result_changing_settings_change_the_key(self):
+        """Seeds, effects, the hand cache size and (for seeded runs) card order are part of the key"""
+        base = make_config()
+        self.assertNotEqual(key_of(base), key_of(make_config(seed=1)))
+        self.assertNotEqual(key_of(base), key_of(make_config(card_effects=[])))
+        self.assertNotEqual(key_of(base), key_of(make_config(hand_size=6)))
+        # The result reports the hand cache's hit rate
+        self.assertNotEqual(key_of(base), key_of(make_config(hand_cache_size=0)))
+
+        seeded = make_config(seed=1)
+        seeded_shuffled = make_config(seed=1, card_categories=list(reversed(base.card_categories)))
+        self.assertNotEqual(key_of(seeded), key_of(seeded_shuffled))
+
+    def test_disk_store_and_eviction(self):
+        """Results survive a new cache instance, and the oldest files are dropped past max_bytes"""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(max_entries=1, directory=directory, max_bytes=200)
+            cache.put("a", {"payload": "x" * 60})
+            cache.put("b", {"payload": "y" * 60})
+            os.utime(os.path.join(directory, "a.json"), (2, 2))
+            os.utime(os.path.join(directory, "b.json"), (1, 1))
+            self.assertEqual(ResultCache(directory=directory).get("a"), {"payload": "x" * 60})
+
+            cache.put("c", {"payload": "z" * 60})
+            fresh = ResultCache(directory=directory)
+            self.assertIsNone(fresh.get("b"))
+            self.assertIsNotNone(fresh.get("a"))
+            self.assertIsNotNone(fresh.get("c"))
+
+    def test_simulate_serves_identical_requests_from_cache(self):
+        """The second identical request is flagged as cached and returns the same result"""
+        from fastapi.testclient import TestClient
+        import main
+
+        original = main.result_cache
+        main.result_cache = ResultCache(directory=None)
+        try:
+            with TestClient(main.app) as client:
+                config = make_config(seed=3).model_dump()
+                first = client.post("/simulate", json=config).json()
+                second = client.post("/simulate", json=config).json()
+                bypass = client.post("/simulate", json={**config, "use_cache": False}).json()
+        finally:
+            main.result_cache = original
+
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertFalse(bypass["cached"])
+        self.assertEqual(first["success_count"], second["success_count"])
+
+
+if __name__ == '__main__':
+    unittest.main()
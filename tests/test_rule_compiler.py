@@ -0,0 +1,90 @@
+"""
+Test suite for the rule compiler
+
+The compiled evaluator must agree with calling the Rule/CompositeRule tree
+directly, while folding away constant leaves and duplicate clauses.
+"""
+
+import unittest
+import sys
+import os
+import pickle
+import random
+from collections import Counter
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from deck_sim import Deck, Simulator, Rule, req
+from rule_compiler import Atom, Node, lower, compile_rules
+
+
+class TestRuleCompiler(unittest.TestCase):
+    """Test lowering, simplification and code generation"""
+
+    def test_lower_flattens_chains(self):
+        """Left-deep AND chains become one n-ary node"""
+        expr = lower(req("A") & req("B") & (req("C") >= 2))
+        self.assertEqual(expr, Node('AND', (Atom("A", '>=', 1), Atom("B", '>=', 1), Atom("C", '>=', 2))))
+
+    def test_placeholder_is_folded(self):
+        """The req(None) >= 0 placeholder of an empty group makes every hand a success"""
+        program = compile_rules([req("A") & (req(None) >= 0), req(None) >= 0])
+        self.assertEqual(program.branches, [True])
+        self.assertTrue(program.evaluate(Counter()))
+
+    def test_impossible_leaves_are_dropped(self):
+        """Leaves needing more copies than the deck holds are removed"""
+        deck_counts = {"A": 1, "B": 3}
+        program = compile_rules([(req("A") >= 2) & req("B"), req("B") >= 2], deck_counts=deck_counts)
+        self.assertEqual(program.branches, [Atom("B", '>=', 2)])
+
+        # Without deck counts nothing is assumed about the hand
+        unbounded = compile_rules([(req("A") >= 2) & req("B")])
+        self.assertTrue(unbounded.evaluate(Counter({"A": 2, "B": 1})))
+
+    def test_duplicates_are_merged(self):
+        """Repeated clauses and redundant thresholds are eliminated"""
+        program = compile_rules([req("A") & (req("A") >= 2), req("B"), req("B")], profile_hands=0)
+        self.assertEqual(program.branches, [Atom("A", '>=', 2), Atom("B", '>=', 1)])
+
+    def test_matches_rule_tree(self):
+        """Compiled and direct evaluation agree on random hands, including '==' and subcategories"""
+        deck = Deck(20, {"Leo": 3, "Tiger": 2, "Poly": 3, "Garnet": 2})
+        subcategory_map = {"Luna": ["Leo", "Tiger"], "Starter": ["Leo", "Poly"]}
+        sim = Simulator(deck, subcategory_map)
+        conditions = [
+            (req("Luna") >= 2) & Rule("Garnet", 0, '=='),
+            req("Poly") & Rule("Starter", 2, '=='),
+            Rule("Tiger", 2, '==') | (req("Garnet") & req("Leo")),
+        ]
+        evaluate = sim._hand_evaluator(conditions, counts=True)
+
+        rng = random.Random(3)
+        for _ in range(3000):
+            hand = deck.draw_hand(5, rng)
+            self.assertEqual(evaluate(sim.card_index.vector(hand)), sim._evaluate_uncompiled(hand, conditions))
+
+    def test_branches_reordered_by_hit_rate(self):
+        """After profiling, the most frequently hit branch is tested first"""
+        program = compile_rules([req("Rare"), req("Common")], profile_hands=10)
+        for _ in range(10):
+            program.evaluate(Counter({"Common": 1}))
+        self.assertEqual(program.branches[0], Atom("Common", '>=', 1))
+        self.assertTrue(program.evaluate(Counter({"Rare": 1})))
+
+    def test_program_is_picklable(self):
+        """Programs survive pickling (process pools) by regenerating their evaluator"""
+        program = pickle.loads(pickle.dumps(compile_rules([req("A") | req("B")])))
+        self.assertTrue(program.evaluate(Counter({"B": 1})))
+        self.assertFalse(program.evaluate(Counter({"C": 1})))
+
+    def test_custom_conditions_fall_back(self):
+        """Arbitrary callables still work through the uncompiled path"""
+        sim = Simulator(Deck(40, {"Starter": 9}))
+        success, _, _, _, _ = sim.check_success(["Starter"], [lambda hand: hand["Starter"] > 0])
+        self.assertTrue(success)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Test suite for the shuffle-prefix deck buffer
+
+Dealing, rewinding and taking cards must keep the buffer a permutation of the
+deck, and simulations that deal effect draws from it must keep the draw
+distribution of the exact engine.
+"""
+
+import unittest
+import sys
+import os
+import random
+from collections import Counter
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect, ConditionalDiscardEffect
+from shuffled_deck import ShuffledDeck
+
+
+class TestShuffledDeck(unittest.TestCase):
+    """Test the deck buffer and the simulations built on it"""
+
+    def test_deal_take_and_rewind(self):
+        """The buffer stays a permutation and the cursor tracks dealt cards"""
+        deck = ShuffledDeck([0, 0, 1, 2, 3])
+        rng = random.Random(1)
+
+        hand = deck.deal(2, rng)
+        mark = deck.mark()
+        deck.deal(2, rng)
+        deck.rewind(mark)
+        self.assertEqual(len(deck), 3)
+        self.assertEqual(deck.positions[:2], hand)
+
+        card = deck.positions[4]
+        deck.take([card])
+        self.assertEqual(deck.positions[2], card)
+        self.assertEqual(sorted(deck.positions), [0, 0, 1, 2, 3])
+        self.assertEqual(deck.deal(10, rng), deck.positions[3:])
+
+    def test_rewound_cards_are_redrawn_uniformly(self):
+        """Cards put back by a rewind are mixed back in, not dealt again in the same order"""
+        deck = ShuffledDeck(range(4))
+        rng = random.Random(7)
+        firsts = Counter()
+        for _ in range(8000):
+            deck.reset()
+            mark = deck.mark()
+            deck.deal(1, rng)
+            deck.rewind(mark)
+            firsts[deck.deal(1, rng)[0]] += 1
+        for card in range(4):
+            self.assertAlmostEqual(firsts[card] / 8000, 0.25, delta=0.03)
+
+    def test_reverting_effects_match_exact_engine(self):
+        """Two discard effects that often revert keep the exact success rate"""
+        deck = Deck(20, {"Vision": 2, "Typhoon": 2, "Pot": 1, "Quick-Play": 3, "Starter": 2})
+        subcategory_map = {"quick play": ["Quick-Play"], "spell": ["Quick-Play", "Starter"]}
+        card_effects = {
+            "Pot": DrawEffect(count=2),
+            "Vision": ConditionalDiscardEffect(draw_count=2, discard_filter="quick play", discard_count=1),
+            "Typhoon": ConditionalDiscardEffect(draw_count=1, discard_filter="spell", discard_count=1),
+        }
+        conditions = [req("Starter"), req("Quick-Play") >= 2]
+        sim = Simulator(deck, subcategory_map, card_effects)
+
+        exact = sim.calculate(5, conditions).success_rate / 100.0
+        simulated = sim.run(40000, 5, conditions, seed=3).success_rate / 100.0
+        standard_error = (exact * (1 - exact) / 40000) ** 0.5
+        self.assertLess(abs(simulated - exact), 5 * standard_error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Test suite for progressive (streamed) simulation runs
+"""
+
+import unittest
+import sys
+import os
+import json
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect
+from parallel import run_sharded
+from streaming import stream_run
+
+
+class TestStreaming(unittest.TestCase):
+    """Test running estimates, early stopping and the SSE endpoint"""
+
+    def setUp(self):
+        deck = Deck(40, {"Pot of Greed": 2, "Starter": 6, "Extender": 8})
+        self.sim = Simulator(deck, {}, {"Pot of Greed": DrawEffect(count=2)})
+        self.conditions = [req("Starter") | (req("Extender") >= 2)]
+
+    def test_final_result_matches_run(self):
+        """A seeded stream ends with the result of the sharded run for the same seed"""
+        updates = list(stream_run(self.sim, 25000, 5, self.conditions, seed=11, interval=10000))
+        final = updates[-1].result
+        expected = run_sharded(self.sim, 25000, 5, self.conditions, seed=11, shard_size=10000)
+
+        self.assertEqual([u.completed for u in updates], [10000, 20000, 25000, 25000])
+        self.assertTrue(all(u.result is None for u in updates[:-1]))
+        self.assertEqual(final.success_count, expected.success_count)
+        self.assertEqual(final.seed, 11)
+        self.assertEqual(final.max_depth_reached_count, expected.max_depth_reached_count)
+
+    def test_target_precision_stops_early(self):
+        """The stream stops once the interval is narrow enough"""
+        updates = list(stream_run(self.sim, 200000, 5, self.conditions, seed=2,
+                                  target_precision=1.0, interval=5000))
+        final = updates[-1]
+        self.assertLess(final.completed, 200000)
+        self.assertLessEqual((final.ci_high - final.ci_low) / 2, 1.0)
+        self.assertEqual(final.result.total_simulations, final.completed)
+
+    def test_invalid_interval(self):
+        """Non-positive intervals are rejected, and the API refuses tiny ones"""
+        with self.assertRaises(ValueError):
+            next(stream_run(self.sim, 1000, 5, self.conditions, interval=0))
+
+        from fastapi.testclient import TestClient
+        from main import app
+
+        config = {
+            "deck_size": 40,
+            "deck_contents": {"Starter": 9},
+            "hand_size": 5,
+            "simulations": 3000,
+            "rules": [[{"card_name": "Starter", "min_count": 1}]],
+        }
+        with TestClient(app) as client:
+            for path in ("/simulate/stream", "/jobs"):
+                response = client.post(path, json={**config, "progress_interval": 1})
+                self.assertEqual(response.status_code, 422)
+
+    def test_sse_endpoint(self):
+        """/simulate/stream sends progress events followed by the result"""
+        from fastapi.testclient import TestClient
+        from main import app
+
+        config = {
+            "deck_size": 40,
+            "deck_contents": {"Starter": 9},
+            "hand_size": 5,
+            "simulations": 3000,
+            "rules": [[{"card_name": "Starter", "min_count": 1}]],
+            "seed": 4,
+            "progress_interval": 1000,
+        }
+        with TestClient(app) as client:
+            response = client.post("/simulate/stream", json=config)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+
+        events = []
+        for message in response.text.strip().split("\n\n"):
+            lines = dict(line.split(": ", 1) for line in message.split("\n"))
+            events.append((lines["event"], json.loads(lines["data"])))
+
+        self.assertEqual([name for name, _ in events], ["progress"] * 3 + ["result"])
+        self.assertEqual(events[-1][1]["total_simulations"], 3000)
+        self.assertEqual(events[-1][1]["seed"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Test suite for parameter sweeps on common random numbers
+"""
+
+import unittest
+import sys
+import os
+
+# Add src and backend to path (backend first: src has its own main module)
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from deck_sim import Deck, Simulator, req
+from card_effects import DrawEffect
+from sweep import SweepAxis, aligned_decks
+from confidence import z_score
+
+
+class TestSweep(unittest.TestCase):
+    """Test aligned layouts, paired differences and the /sweep endpoint"""
+
+    def setUp(self):
+        deck = Deck(40, {"Tenki": 2, "Starter": 6, "Pot": 2})
+        self.sim = Simulator(deck, {}, {"Pot": DrawEffect(count=2)})
+        self.conditions = [req("Starter") | req("Tenki")]
+
+    def test_layouts_only_differ_where_counts_differ(self):
+        """Each card keeps its positions across variants"""
+        two, three = aligned_decks([40, 40], [{"Tenki": 2, "Starter": 6}, {"Tenki": 3, "Starter": 6}])
+        self.assertEqual(len(two.cards), 40)
+        self.assertEqual(len(three.cards), 40)
+        differing = [i for i, (a, b) in enumerate(zip(two.cards, three.cards)) if a != b]
+        self.assertEqual(len(differing), 1)
+        self.assertEqual(three.cards[differing[0]], "Tenki")
+
+    def test_rates_match_exact_and_differences_are_paired(self):
+        """Every point is unbiased, and differences are much tighter than independent runs"""
+        axes = [SweepAxis('card_count', [2, 3], card_name="Tenki"), SweepAxis('hand_size', [5, 6])]
+        sampled = self.sim.sweep(40000, 5, self.conditions, axes, seed=9)
+        exact = self.sim.sweep(1, 5, self.conditions, axes, engine='exact')
+
+        self.assertEqual([p.values for p in sampled.points][1], {"Tenki": 2, "hand_size": 6})
+        for point, truth in zip(sampled.points, exact.points):
+            rate = truth.result.success_rate / 100.0
+            standard_error = (rate * (1 - rate) / 40000) ** 0.5 * 100.0
+            self.assertLess(abs(point.result.success_rate - truth.result.success_rate), 5 * standard_error)
+
+            independent = z_score(0.95) * 2 ** 0.5 * standard_error
+            if point is not sampled.points[0]:
+                self.assertLess((point.difference_high - point.difference_low) / 2, 0.75 * independent)
+                self.assertLessEqual(point.difference_low, truth.difference)
+                self.assertGreaterEqual(point.difference_high, truth.difference)
+
+    def test_effect_parameter_axis(self):
+        """Effect parameters can be swept, and unknown ones are rejected"""
+        axes = [SweepAxis('effect_parameter', [1, 2], card_name="Pot", parameter="count")]
+        points = self.sim.sweep(1, 5, self.conditions, axes, engine='exact').points
+        self.assertGreater(points[1].difference, 0)
+
+        with self.assertRaises(ValueError):
+            self.sim.sweep(100, 5, self.conditions, [SweepAxis('effect_parameter', [1], "Pot", "draws")])
+
+    def test_sweep_endpoint(self):
+        """/sweep returns one point per combination"""
+        from fastapi.testclient import TestClient
+        from main import app
+
+        config = {
+            "deck_size": 40,
+            "deck_contents": {"Starter": 6, "Tenki": 2},
+            "hand_size": 5,
+            "simulations": 2000,
+            "rules": [[{"card_name": "Starter", "min_count": 1, "operator": "OR"},
+                       {"card_name": "Tenki", "min_count": 1}]],
+            "seed": 4,
+            "axes": [{"kind": "card_count", "card_name": "Tenki", "values": [2, 3]}],
+        }
+        with TestClient(app) as client:
+            response = client.post("/sweep", json=config)
+            invalid = client.post("/sweep", json={**config, "axes": [{"kind": "hand_size", "values": []}]})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([p["values"] for p in body["points"]], [{"Tenki": 2}, {"Tenki": 3}])
+        self.assertEqual(body["seed"], 4)
+        self.assertGreaterEqual(body["points"][1]["difference"], 0)
+        self.assertEqual(invalid.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Test suite for stratified and antithetic sampling
+"""
+
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from deck_sim import Deck, Simulator, Rule, req
+from card_effects import DrawEffect
+from variance_reduction import card_classes, strata
+
+
+class TestVarianceReduction(unittest.TestCase):
+    """Test the strata, the estimates against the exact engine and the invalid combinations"""
+
+    def setUp(self):
+        self.deck = Deck(40, {"Ash": 3, "Tenki": 3, "Pot": 2, "Starter": 6, "Extender": 5})
+        self.subcategories = {"Starters": ["Starter", "Tenki"]}
+        self.conditions = [req("Starters") >= 1, (req("Ash") >= 1) & (req("Extender") >= 1)]
+
+    def test_strata_probabilities(self):
+        """Irrelevant cards are pooled, and the strata cover every hand exactly once"""
+        sim = Simulator(self.deck, self.subcategories)
+        classes, rest = card_classes(sim, self.conditions)
+        self.assertEqual(sorted(len(c) for c in classes), [3, 5, 9])
+        self.assertEqual(len(rest), 23)  # 2 Pot + 21 blanks
+
+        chosen, _, compositions, probabilities = strata(sim, self.conditions, 5)
+        self.assertEqual(len(chosen), 3)
+        self.assertAlmostEqual(sum(probabilities), 1.0)
+        self.assertEqual(len(compositions), len(set(compositions)))
+
+    def test_stratified_without_effects_is_exact(self):
+        """Success only depends on the strata, so the estimate matches the exact engine"""
+        sim = Simulator(self.deck, self.subcategories)
+        exact = sim.calculate(5, self.conditions).success_rate
+        result = sim.run(5000, 5, self.conditions, seed=3, sampling='stratified')
+
+        self.assertAlmostEqual(result.success_rate, exact, places=6)
+        # Every stratum's outcome is fixed, so there is no sampling error to report
+        self.assertEqual((result.ci_low, result.ci_high), (result.success_rate, result.success_rate))
+        self.assertIsNone(result.variance_reduction)
+        self.assertTrue(result.warnings)
+        self.assertEqual(result.total_simulations, 5000)
+        self.assertEqual(result.seed, 3)
+
+    def test_stratified_with_effects(self):
+        """With effect draws left random, the interval is tighter than plain sampling and covers the truth"""
+        sim = Simulator(self.deck, self.subcategories, {"Pot": DrawEffect(count=2)})
+        truth = sim.run(200_000, 5, self.conditions, seed=7, workers=2)
+        result = sim.run(20_000, 5, self.conditions, seed=5, sampling='stratified')
+        plain = sim.run(20_000, 5, self.conditions, seed=5)
+
+        self.assertAlmostEqual(result.success_rate, truth.success_rate, delta=0.6)
+        self.assertGreater(result.variance_reduction, 2)
+        self.assertLess(result.ci_high - result.ci_low, (plain.ci_high - plain.ci_low) / 2)
+        # Reproducible for a given seed
+        again = sim.run(20_000, 5, self.conditions, seed=5, sampling='stratified')
+        self.assertEqual(again.success_rate, result.success_rate)
+
+    def test_stratified_rare_condition(self):
+        """Fixed strata add no variance, so a rare rule is not reported as worse than plain sampling"""
+        deck = Deck(40, {"Gold Leo": 3, "Fuwalos": 3, "Pot": 2, "Starter": 8})
+        rare = [Rule("Gold Leo", 3, '==') & (req("Fuwalos") >= 2)]
+        sim = Simulator(deck, {}, {"Pot": DrawEffect(count=2)})
+        result = sim.run(20_000, 5, rare, seed=1, sampling='stratified')
+
+        self.assertEqual(result.total_simulations, 20_000)
+        self.assertGreater(result.variance_reduction, 0.8)
+        self.assertEqual(sim.run(2000, 5, rare, seed=1, sampling='stratified').total_simulations, 2000)
+
+    def test_antithetic(self):
+        """Antithetic pairs give an unbiased estimate over an even number of hands"""
+        sim = Simulator(self.deck, self.subcategories)
+        exact = sim.calculate(5, self.conditions).success_rate
+        result = sim.run(20_001, 5, self.conditions, seed=11, sampling='antithetic')
+
+        self.assertEqual(result.total_simulations, 20_002)
+        self.assertLessEqual(result.ci_low, exact)
+        self.assertGreaterEqual(result.ci_high, exact)
+        self.assertIsNotNone(result.variance_reduction)
+
+    def test_importance_sampling_rare_condition(self):
+        """A rare condition is estimated without bias and far more tightly than plain sampling"""
+        deck = Deck(40, {"Garnet": 3, "A": 1, "B": 1, "C": 1, "Ash": 3})
+        rare = [(req("A") >= 1) & (req("B") >= 1) & (req("C") >= 1) & (req("Ash") >= 1), Rule("Garnet", 3, '==')]
+        sim = Simulator(deck, {}, {"A": DrawEffect(count=1)})
+        truth = sim.calculate(5, rare).success_rate
+        result = sim.run(20_000, 5, rare, seed=2, sampling='importance')
+
+        self.assertLessEqual(result.ci_low, truth)
+        self.assertGreaterEqual(result.ci_high, truth)
+        self.assertGreater(result.variance_reduction, 5)
+        # The pilot's hands are part of the run
+        self.assertEqual(result.total_simulations, 20_000)
+        self.assertEqual(sim.run(5, 5, rare, seed=2, sampling='importance').total_simulations, 5)
+
+    def test_importance_sampling_without_successes(self):
+        """When no hand succeeds, the interval is a valid upper bound"""
+        sim = Simulator(self.deck, self.subcategories)
+        result = sim.run(2000, 5, [req("Ash") >= 4], seed=1, sampling='importance')
+        self.assertEqual(result.success_rate, 0.0)
+        self.assertGreater(result.ci_high, 0.0)
+        self.assertTrue(result.warnings)
+
+    def test_invalid_combinations(self):
+        sim = Simulator(self.deck, self.subcategories)
+        with self.assertRaises(ValueError):
+            sim.run(1000, 5, self.conditions, sampling='quasi')
+        with self.assertRaises(ValueError):
+            sim.run(1000, 5, self.conditions, sampling='stratified', engine='batch')
+        with self.assertRaises(ValueError):
+            sim.run(1000, 5, self.conditions, sampling='antithetic', target_precision=0.5)
+        for sampling in ('stratified', 'antithetic', 'importance'):
+            with self.assertRaises(ValueError):
+                sim.run(3, 5, self.conditions, sampling=sampling)
+
+
+if __name__ == '__main__':
+    unittest.main()